@@ -2,16 +2,18 @@ import argparse
 import sys
 # from errors import Error
 import numpy as np
-import pandas as pd
 from datetime import date, datetime, timedelta
 
-from scipy.optimize import minimize
-from sklearn.metrics import mean_squared_error
 from mcp.tools import *
 from mcp.tools import McpBondPricer as mcp, InsFixedRateBond, McpPortfolio
 
 from multipledispatch import dispatch
 
+from mcp.curve.nss.nss_fit import fit_nss, nss_rates
+from mcp.utils.lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
 
 def nelson_siegel_svensson(points, b0, b1, b2, b3, tau, tau2):
     """
@@ -30,11 +32,7 @@ def nelson_siegel_svensson(points, b0, b1, b2, b3, tau, tau2):
         Array with the rates for the times t in the array called points.
 
     """
-    points = np.array(points)
-    part1 = b0 + b1 * (1 - np.exp(-points / tau)) / (points / tau)
-    part2 = b2 * ((1 - np.exp(-points / tau) / (points / tau)) - np.exp(-points / tau))
-    part3 = b3 * ((1 - np.exp(-points / tau2) / (points / tau2)) - np.exp(-points / tau2))
-    return part1 + part2 + part3
+    return nss_rates(points, [b0, b1, b2, b3, tau, tau2])
 
 
 def optimization_nss(params, points, y):
@@ -61,10 +59,10 @@ def optimization_nss(params, points, y):
     y_pred = nelson_siegel_svensson(points, params[0], params[1],
                                     params[2], params[3], params[4],
                                     params[5])
-    return mean_squared_error(y, y_pred)
+    return np.mean((np.asarray(y, dtype=float) - y_pred) ** 2)
 
 
-def fitNelsonSiegelYld(t, yld, x):
+def fitNelsonSiegelYld(t, yld, x, warm_start=None):
     """
     Function to return Nelson-Siegel-Svensson model result, using t/yld.
     
@@ -76,6 +74,8 @@ def fitNelsonSiegelYld(t, yld, x):
         收益率，float类型
     x : list
         输入的期限，年记的时间，float类型
+    warm_start : list
+        上一次拟合的参数(b0, b1, b2, b3, tau, tau2)，作为第一个起点
         
     Returns
     -------
@@ -83,12 +83,7 @@ def fitNelsonSiegelYld(t, yld, x):
         模型返回的收益率（yield）
 
     """
-    resutls_nss = minimize(optimization_nss,
-                           np.array([0, 0, 0, 0, 1, 1]),
-                           (t, yld),
-                           bounds=((0, np.inf), (-np.inf, np.inf), (-np.inf, np.inf), (-np.inf, np.inf), (0, np.inf),
-                                   (0.0001, np.inf)))
-    return nelson_siegel_svensson(x, *resutls_nss.x)
+    return fit_nss(t, yld, warm_start=warm_start).rates(x)
 
 
 class ParameterCurve:
@@ -101,10 +96,12 @@ class ParameterCurve:
         交易日
     instrument_df ： DataFrame[Code', 'Maturity', 'Coupon', 'ClosePx']
         债券信息和价格
+    warm_start : list
+        上一次拟合的参数(例如前一天的nss_args.x)，作为第一个起点
 
     """
 
-    def __init__(self, valuation_date, maturity_dates, ylds):
+    def __init__(self, valuation_date, maturity_dates, ylds, warm_start=None):
         self.valuation_date = pd.to_datetime(valuation_date)
         # if type(self.valuation_date) != date:
         #     self.valuation_date = self.valuation_date.date()
@@ -114,13 +111,8 @@ class ParameterCurve:
         self.yld = pd.Series(ylds).tolist()
         t = [(date - self.valuation_date).days / 365 for date in self.maturity]
         self.d = []
-        self.nss_args = minimize(optimization_nss, np.array([0, 0, 0, 0, 1, 1]),
-                                 (t,
-                                  self.yld),
-                                 bounds=(
-                                     (0, np.inf), (-np.inf, np.inf), (-np.inf, np.inf), (-np.inf, np.inf),
-                                     (0, np.inf),
-                                     (0.0001, np.inf)))
+        # tau网格多起点 + beta最小二乘，nss_args.x与原来minimize的结果格式相同
+        self.nss_args = fit_nss(t, self.yld, warm_start=warm_start)
 
     def ytm_tenors(self, tenors):
         cal = McpCalendar()
@@ -0,0 +1,250 @@
+"""
+Nelson-Siegel(-Svensson)曲线拟合。
+
+tau固定时收益率是beta的线性函数，beta用最小二乘直接求解；只有tau需要
+非线性搜索: 先在tau网格上求出每组tau的最优beta和残差，取残差最小的几组
+(以及上一次拟合的tau)作为起点，用L-BFGS-B和解析梯度细化:
+
+    fit = fit_nss(t, yld)                       # NssFit，fit.x与minimize的结果相同: b0, b1, b2, b3, tau, tau2
+    fit.rates(x)
+    fit = fit_nss(t, yld, warm_start=prev.x)    # 用前一天的参数热启动
+
+    fitter = NssFitter(model="NSS")             # 按发行人/曲线名称保存上一次的参数
+    fits = fitter.fit_many({"ISSUER1": (t1, y1), "ISSUER2": (t2, y2)})
+
+model="NS"时没有b3/tau2，x为b0, b1, b2, tau。点数不够时降级: NSS少于6个点时拟合NS
+(x仍为6个参数，b3=0，tau2=tau)，少于4个点时tau固定(warm_start的tau或default_tau)，
+只用最小二乘求beta；fit.method为实际使用的方法。
+"""
+
+import numpy as np
+
+from mcp.utils.lazy_import import lazy_attr
+
+minimize = lazy_attr("scipy.optimize", "minimize")
+
+# tau的搜索范围(年)
+tau_min = 0.05
+tau_max = 50.0
+default_tau_grid = np.geomspace(0.1, 30.0, 14)
+# 点数太少、tau不能拟合时使用的tau
+default_tau = 1.0
+
+
+def loadings(t, tau):
+    """
+    :return: (L1, L2, dL1/dtau, dL2/dtau)，L1 = (1 - e) / x，L2 = L1 - e，x = t / tau，e = exp(-x)
+    """
+    t = np.asarray(t, dtype=float)
+    x = t / tau
+    small = x < 1e-8
+    xs = np.where(small, 1.0, x)
+    e = np.exp(-xs)
+    l1 = np.where(small, 1.0, (1.0 - e) / xs)
+    l2 = np.where(small, 0.0, l1 - e)
+    dl1_dx = np.where(small, -0.5, e / xs - (1.0 - e) / xs ** 2)
+    dl2_dx = np.where(small, 1.0, dl1_dx + e)
+    dx_dtau = -x / tau
+    return l1, l2, dl1_dx * dx_dtau, dl2_dx * dx_dtau
+
+
+def design_matrix(t, taus):
+    """列: 1, L1(tau), L2(tau)[, L2(tau2)]"""
+    l1, l2, _, _ = loadings(t, taus[0])
+    columns = [np.ones_like(l1), l1, l2]
+    if len(taus) > 1:
+        columns.append(loadings(t, taus[1])[1])
+    return np.column_stack(columns)
+
+
+def nss_rates(t, x):
+    """x: b0, b1, b2, b3, tau, tau2(NSS)或b0, b1, b2, tau(NS)"""
+    x = np.asarray(x, dtype=float)
+    n_beta = 4 if len(x) == 6 else 3
+    return design_matrix(t, x[n_beta:]) @ x[:n_beta]
+
+
+def solve_betas(t, y, taus, w):
+    """
+    tau固定时的加权最小二乘，b0 >= 0(与原来minimize的bounds相同)
+    :return: (betas, 残差平方和)
+    """
+    a = design_matrix(t, taus) * w[:, None]
+    b = y * w
+    betas = np.linalg.lstsq(a, b, rcond=None)[0]
+    if betas[0] < 0:
+        betas = np.concatenate([[0.0], np.linalg.lstsq(a[:, 1:], b, rcond=None)[0]])
+    r = a @ betas - b
+    return betas, float(r @ r)
+
+
+def tau_objective(taus, t, y, w, scale=1.0):
+    """
+    残差平方和(乘以scale)及其对tau的梯度。betas是tau的最优解，梯度只需要对tau的偏导
+    (包络定理)；b0在下界0上时同样成立。
+    """
+    betas, sse = solve_betas(t, y, taus, w)
+    r = (design_matrix(t, taus) @ betas - y) * w * w
+    _, _, d1, d2 = loadings(t, taus[0])
+    grad = [2.0 * r @ (betas[1] * d1 + betas[2] * d2)]
+    if len(taus) > 1:
+        grad.append(2.0 * r @ (betas[3] * loadings(t, taus[1])[3]))
+    return sse * scale, np.array(grad) * scale
+
+
+class NssFit:
+    """
+    x: 参数，NSS为b0, b1, b2, b3, tau, tau2，NS为b0, b1, b2, tau
+    fun: 加权均方误差，与原来的optimization_nss(mean_squared_error)相同
+    method: "NSS"，"NS"或"fixed tau"(点数不够时的降级)
+    """
+
+    def __init__(self, x, fun, starts, success=True, method=None):
+        self.x = np.asarray(x, dtype=float)
+        self.fun = fun
+        self.starts = starts
+        self.success = success
+        self.method = self.model if method is None else method
+
+    @property
+    def model(self):
+        return "NSS" if len(self.x) == 6 else "NS"
+
+    def rates(self, t):
+        return nss_rates(t, self.x)
+
+    def __repr__(self):
+        return f"NssFit({self.method}, x={self.x.tolist()}, mse={self.fun:.3e})"
+
+
+def _grid_starts(t, y, w, n_taus, tau_grid):
+    """网格上所有tau组合一次批量求解，按残差平方和排序(排序时不考虑b0 >= 0)"""
+    l1, l2 = [], []
+    for tau in tau_grid:
+        a, b, _, _ = loadings(t, tau)
+        l1.append(a)
+        l2.append(b)
+    l1, l2 = np.array(l1), np.array(l2)
+    if n_taus == 1:
+        combos = [(i,) for i in range(len(tau_grid))]
+        columns = [np.ones_like(l1), l1, l2]
+    else:
+        # tau < tau2，避免同一组解出现两次
+        combos = [(i, j) for i in range(len(tau_grid)) for j in range(i + 1, len(tau_grid))]
+        first, second = np.array([c[0] for c in combos]), np.array([c[1] for c in combos])
+        columns = [np.ones_like(l1[first]), l1[first], l2[first], l2[second]]
+    a = np.stack(columns, axis=-1) * w[None, :, None]
+    b = y * w
+    betas = np.linalg.pinv(a) @ b
+    sse = np.sum((np.einsum("mnk,mk->mn", a, betas) - b) ** 2, axis=-1)
+    return [tuple(tau_grid[k] for k in combos[i]) for i in np.argsort(sse, kind="stable")]
+
+
+def fit_nss(t, y, model="NSS", warm_start=None, weights=None, tau_grid=None, n_refine=3):
+    """
+    :param t: 期限(年)
+    :param y: 收益率
+    :param model: "NSS"或"NS"
+    :param warm_start: 上一次拟合的x，其中的tau作为第一个起点
+    :param weights: 每个点的权重，None为等权
+    :param tau_grid: tau网格，默认0.1到30年对数等分
+    :param n_refine: 从网格中取残差最小的n_refine组tau细化
+    :return: NssFit
+    """
+    t = np.asarray(t, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    if len(t) != len(y):
+        raise Exception(f"{len(t)} terms, {len(y)} yields")
+    if model not in ("NSS", "NS"):
+        raise Exception(f"Invalid model: {model}")
+    if len(t) == 0:
+        raise Exception("No points to fit")
+    w = np.ones_like(t) if weights is None else np.sqrt(np.asarray(weights, dtype=float).ravel() / np.mean(weights))
+    if model == "NSS" and len(t) < 6:
+        return _as_nss(_fit_reduced(t, y, w, warm_start, tau_grid, n_refine))
+    if len(t) < 4:
+        return _fit_fixed_tau(t, y, w, warm_start, 1)
+    n_taus = 2 if model == "NSS" else 1
+    tau_grid = default_tau_grid if tau_grid is None else np.asarray(tau_grid, dtype=float)
+
+    starts = []
+    if warm_start is not None:
+        warm_start = np.asarray(warm_start, dtype=float)
+        starts.append(tuple(np.clip(warm_start[-n_taus:], tau_min, tau_max)))
+    starts.extend(_grid_starts(t, y, w, n_taus, tau_grid)[:n_refine])
+
+    best = None
+    bounds = [(tau_min, tau_max)] * n_taus
+    for start in starts:
+        # 收益率的残差平方和很小(1e-8量级)，按起点的值缩放，否则梯度低于L-BFGS-B的收敛阈值
+        scale = 1.0 / max(solve_betas(t, y, start, w)[1], 1e-300)
+        result = minimize(tau_objective, np.array(start), (t, y, w, scale), jac=True, method="L-BFGS-B",
+                          bounds=bounds)
+        taus = result.x if np.isfinite(result.fun) else np.array(start)
+        betas, sse = solve_betas(t, y, taus, w)
+        if best is None or sse < best[0]:
+            best = (sse, np.concatenate([betas, taus]), bool(result.success))
+    sse, x, success = best
+    return NssFit(x, sse / len(t), len(starts), success)
+
+
+def _fit_reduced(t, y, w, warm_start, tau_grid, n_refine):
+    """NSS点数不够(少于6个)时拟合NS，少于4个点时固定tau"""
+    if warm_start is not None and len(warm_start) == 6:
+        warm_start = np.asarray(warm_start, dtype=float)[[0, 1, 2, 4]]
+    if len(t) < 4:
+        return _fit_fixed_tau(t, y, w, warm_start, 1)
+    return fit_nss(t, y, "NS", warm_start, (w * w).tolist(), tau_grid, n_refine)
+
+
+def _fit_fixed_tau(t, y, w, warm_start, n_taus):
+    if warm_start is not None:
+        taus = np.clip(np.asarray(warm_start, dtype=float)[-n_taus:], tau_min, tau_max)
+    else:
+        taus = np.full(n_taus, default_tau)
+    # 点数少于beta个数时lstsq给出范数最小的解
+    betas, sse = solve_betas(t, y, taus, w)
+    return NssFit(np.concatenate([betas, taus]), sse / len(t), 0, True, "fixed tau")
+
+
+def _as_nss(fit):
+    """NS参数 -> NSS参数(b3=0，tau2=tau)"""
+    if len(fit.x) == 6:
+        return fit
+    b0, b1, b2, tau = fit.x
+    return NssFit([b0, b1, b2, 0.0, tau, tau], fit.fun, fit.starts, fit.success, fit.method)
+
+
+class NssFitter:
+    """
+    按名称(发行人、曲线)保存上一次的参数，下一次拟合时热启动。
+    有上一次的参数时只从它和网格上最好的warm_refine组tau细化。
+    """
+
+    def __init__(self, model="NSS", n_refine=3, tau_grid=None, warm_refine=1):
+        self.model = model
+        self.n_refine = n_refine
+        self.warm_refine = warm_refine
+        self.tau_grid = tau_grid
+        self.previous = {}
+
+    def fit(self, name, t, y, weights=None):
+        previous = self.previous.get(name)
+        n_refine = self.n_refine if previous is None else self.warm_refine
+        fit = fit_nss(t, y, self.model, previous, weights, self.tau_grid, n_refine)
+        self.previous[name] = fit.x
+        return fit
+
+    def fit_many(self, curves, weights=None):
+        """
+        :param curves: 名称 -> (期限, 收益率)
+        :param weights: 名称 -> 权重，可以为None
+        :return: 名称 -> NssFit，拟合失败的为错误信息字符串
+        """
+        result = {}
+        for name, (t, y) in curves.items():
+            try:
+                result[name] = self.fit(name, t, y, None if weights is None else weights.get(name))
+            except Exception as e:
+                result[name] = f"{type(e).__name__}: {e}"
+        return result
@@ -1,4 +1,4 @@
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 
 from financepy.products.rates import FinFixedLeg, FinFloatLeg
 from financepy.finutils.FinError import FinError
@@ -13,6 +13,8 @@ from financepy.finutils.FinHelperFunctions import labelToString, checkArgumentTy
 from financepy.finutils.FinGlobalTypes import FinSwapTypes
 from financepy.market.curves.FinDiscountCurve import FinDiscountCurve
 
+pd = lazy_module("pandas")
+
 
 class ExFinFixedLeg(FinFixedLeg):
 
@@ -3,6 +3,7 @@ from datetime import datetime
 import mcp.mcp
 from mcp.utils.excel_utils import FieldName
 from mcp.utils.mcp_utils import mcp_const
+from mcp.utils.root_finder import find_root
 from mcp.wrapper import MOptVolSurface, is_vol_surface, get_volatility
 import mcp.wrapper
 from mcp.forward.fwd_wrapper import *
@@ -31,30 +32,57 @@ class McpBaseCompound():
             maxNumIterations = int(args[FieldName.MaxNumIterations])
         return deltaRHS, tolerance, maxNumIterations
 
+    # Strike of the last successful solve per product, used as warm start,
+    # the oldest entries are dropped beyond guess_warm_start_limit
+    guess_warm_starts = {}
+    guess_warm_start_limit = 1024
+    # strike_from_price arguments that control the solve, not the product
+    guess_control_fields = (FieldName.Price, FieldName.Tolerance, FieldName.DeltaRHS, FieldName.MaxNumIterations,
+                            FieldName.GuessMethod)
+
+    def guess_key(self, args=None):
+        """
+        Warm start key: the product (class, buy/sell, spot, expiry) and the
+        fixed fields of args, e.g. the strike that is not solved for.
+        """
+        key = [type(self).__name__] + [str(getattr(self, name, None)) for name in ("buySell", "spotPx", "expiryDate")]
+        if isinstance(args, dict):
+            key.extend(f"{name}={args[name]}" for name in sorted(args, key=str)
+                       if name not in self.guess_control_fields)
+        return tuple(key)
+
+    def save_warm_start(self, key, strike):
+        starts = McpBaseCompound.guess_warm_starts
+        starts.pop(key, None)
+        starts[key] = strike
+        if len(starts) > McpBaseCompound.guess_warm_start_limit:
+            starts.pop(next(iter(starts)))
+
+    def guess_pricer(self, args):
+        """
+        Return a function strike -> price used by guess_strike, subclasses
+        can override it to avoid building a new object per evaluation.
+        """
+
+        def pricer(strike):
+            return self.copy(args, strike).price(self.pricingMethod)
+
+        return pricer
+
     def guess_strike(self, low, high, price, args):
         print("guess_strike:", low, high, price, args)
-        dt_start = datetime.now()
         deltaRHS, tolerance, maxNumIterations = self.guess_strike_args(args)
-        strike = None
-        d_low = self.copy(args, low).price(self.pricingMethod)
-        d_low -= price
-        d_high = self.copy(args, high).price(self.pricingMethod)
-        d_high -= price
-        for i in range(maxNumIterations):
-            mid = (high + low) / 2
-            d_mid = self.copy(args, mid).price(self.pricingMethod) - price
-            if abs(d_mid) <= tolerance:
-                strike = mid
-                break
-            if d_low * d_mid < 0:
-                high = mid
-                d_high = d_mid
-            else:
-                low = mid
-                d_low = d_mid
-        dt_end = datetime.now()
-        print("guess_strike use %s s, %s" % (dt_end - dt_start, args))
-        return strike
+        method = args.get(FieldName.GuessMethod, "brent") if isinstance(args, dict) else "brent"
+        pricer = self.guess_pricer(args)
+        key = self.guess_key(args)
+        result = find_root(lambda strike: pricer(strike) - price, low, high, tolerance, maxNumIterations,
+                           guess=McpBaseCompound.guess_warm_starts.get(key), method=method)
+        if result.converged:
+            self.save_warm_start(key, result.root)
+        self.guess_info = result.to_dict()
+        print("guess_strike use %.6f s, %s iterations, %s evaluations, %s" % (
+            result.elapsed, result.iterations, result.evaluations, args))
+        return result.root
 
     def strike_from_price(self, args):
         return None
@@ -1,5 +1,9 @@
+import logging
+
 from mcp.utils.excel_utils import FieldName
 from mcp.utils.mcp_utils import *
+from mcp.utils.root_finder import find_root
+from mcp.forward.payoff_grid import SumKernel
 from mcp.wrapper import is_vol_surface, mcp_logging, McpFXVolSurface2
 from mcp.forward.fwd_wrapper import *
 
@@ -65,44 +69,59 @@ class McpBaseCompound(PayoffSpec):
             maxNumIterations = int(args[FieldName.MaxNumIterations])
         return deltaRHS, tolerance, maxNumIterations
 
+    # Strike of the last successful solve per product, used as warm start,
+    # the oldest entries are dropped beyond guess_warm_start_limit
+    guess_warm_starts = {}
+    guess_warm_start_limit = 1024
+    # strike_from_price arguments that control the solve, not the product
+    guess_control_fields = (FieldName.Price, FieldName.Tolerance, FieldName.DeltaRHS, FieldName.MaxNumIterations,
+                            FieldName.GuessMethod)
+
+    def guess_key(self, args=None):
+        """
+        Warm start key: the product (class, buy/sell, spot, expiry) and the
+        fixed fields of args, e.g. the strike that is not solved for.
+        """
+        key = [type(self).__name__] + [str(getattr(self, name, None)) for name in ("buySell", "spotPx", "expiryDate")]
+        if isinstance(args, dict):
+            key.extend(f"{name}={args[name]}" for name in sorted(args, key=str)
+                       if name not in self.guess_control_fields)
+        return tuple(key)
+
+    def save_warm_start(self, key, strike):
+        starts = McpBaseCompound.guess_warm_starts
+        starts.pop(key, None)
+        starts[key] = strike
+        if len(starts) > McpBaseCompound.guess_warm_start_limit:
+            starts.pop(next(iter(starts)))
+
+    def guess_pricer(self, args):
+        """
+        Return a function strike -> price used by guess_strike.  Subclasses
+        can override it to reprice one reusable context instead of building
+        a new object through copy() on every evaluation.
+        """
+
+        def pricer(strike):
+            ins_temp = self.copy(args, strike)
+            value = ins_temp.price()
+            ins_temp.del_ref()
+            return value
+
+        return pricer
+
     def guess_strike(self, low, high, price, args):
-        # print("guess_strike:", low, high, price, args)
-        dt_start = datetime.now()
         deltaRHS, tolerance, maxNumIterations = self.guess_strike_args(args)
-        strike = None
-        ins_temp = self.copy(args, low)
-        d_low = ins_temp.price()
-        ins_temp.del_ref()
-        d_low = price - d_low
-        ins_temp = self.copy(args, high)
-        d_high = ins_temp.price()
-        ins_temp.del_ref()
-        d_high = price - d_high
-        #print(f"low={low},high={high},price={price}")
-        for i in range(maxNumIterations):
-            # try:
-            mid = (high + low) / 2
-            ins_temp = self.copy(args, mid)
-            d_mid = price - ins_temp.price()
-            ins_temp.del_ref()
-            # print(f"{i}: low={low}, mid={mid}, high={high}, d={d_low},{d_mid},{d_high}")
-            if abs(d_mid) <= tolerance:
-                strike = mid
-                break
-            if d_mid * d_high > 0:
-                high = mid
-                d_high = d_mid
-            else:
-                low = mid
-                d_low = d_mid
-                # print("guess_strike:", low, high)
-                # except:
-                #     print(f"guess_strike except: {low}, {high}")
-                #     traceback.print_exc()
-                # raise Exception('guess_strike except')
-        dt_end = datetime.now()
-        # print("guess_strike use %s s, %s" % (dt_end - dt_start, args))
-        return strike
+        method = args.get(FieldName.GuessMethod, "brent") if isinstance(args, dict) else "brent"
+        pricer = self.guess_pricer(args)
+        key = self.guess_key(args)
+        result = find_root(lambda strike: price - pricer(strike), low, high, tolerance, maxNumIterations,
+                           guess=McpBaseCompound.guess_warm_starts.get(key), method=method)
+        if result.converged:
+            self.save_warm_start(key, result.root)
+        self.guess_info = result.to_dict()
+        logging.debug(f"guess_strike: {result}, {args}")
+        return result.root
 
     # def guess_strike2(self, low, high, price, args):
     #     count = 9
@@ -279,6 +298,15 @@ class McpVanillaCompound(McpBaseCompound):
             payoffs.append(payoff)
         return payoffs
 
+    def payoff_kernel(self, pricing_method=None):
+        kernels = []
+        for leg in self.vanillas:
+            kernel = leg.payoff_kernel(pricing_method) if hasattr(leg, "payoff_kernel") else None
+            if kernel is None:
+                return None
+            kernels.append(kernel)
+        return SumKernel(kernels)
+
     def payoff2(self, value_date, spot=None, rg=0.03):
         # all_spots = set()
         # leg_args = []
@@ -1138,6 +1166,35 @@ class McpCustomForward(McpVanillaCompound):
         return McpCustomForward(*args_new)
         # return McpCustomForward(self.key, self.buySell, strikes_dict, self.args)
 
+    def guess_key(self, args=None):
+        return (self.key, str(sorted(self.strikes_dict.items()))) + super().guess_key(args)
+
+    def guess_pricer(self, args):
+        if 'cap seagull' in self.gfd_item.key.lower():
+            return super().guess_pricer(args)
+        # One strikes dict and args list for the whole solve, only the
+        # guessed strikes are overwritten between evaluations
+        std_args = lower_key_dict(args)
+        strikes_dict = dict(self.strikes_dict)
+        guess_keys = []
+        for key in self.gfd_item.lower_strikes:
+            if key in std_args:
+                strikes_dict[key] = std_args[key]
+            else:
+                guess_keys.append(key)
+        args_new = list(self.args)
+        args_new[-2] = strikes_dict
+
+        def pricer(strike):
+            for key in guess_keys:
+                strikes_dict[key] = strike
+            fwd = McpCustomForward(*args_new)
+            value = fwd.price()
+            fwd.del_ref()
+            return value
+
+        return pricer
+
     def copy2(self, spotPx, reference_date):
         # args = [reference_date, spotPx, self.buySell, self.expiryDate, self.volSurface, self.settlementDate,
         #         self.priceSettlementDate, self.calendar, self.notional]
@@ -1263,6 +1320,7 @@ class McpCustomForward(McpVanillaCompound):
 class McpPortfolio():
     def __init__(self, options):
         self.options = options
+        self.ladder_zero_rows = {}
 
     def __del__(self):
         self.del_ref()
@@ -1329,49 +1387,67 @@ class McpPortfolio():
         return df
 
     def spot_ladder(self, spotPx, reference_date, changes, columns, diff=False, price_method=None):
+        """
+        Spot ladder, one row per relative spot change.
+
+        Every instrument is copied once per bump and all requested columns
+        are read from that copy.  The zero-shift row is cached.  Unknown
+        columns are skipped, as before.
+        """
+        key = (spotPx, str(reference_date), tuple(columns), price_method)
+        if key not in self.ladder_zero_rows:
+            self.ladder_zero_rows[key] = self.spot_ladder_row(spotPx, reference_date, 0.0, columns, price_method)
+        zero_row = self.ladder_zero_rows[key]
+
         values = []
-        zero_row = self.spot_ladder_row(spotPx, reference_date, 0.0, columns, price_method)
         for change in changes:
-            raw_row = self.spot_ladder_row(spotPx, reference_date, change, columns, price_method)
-            if diff and abs(change) > 1e-15:
-                row = []
-                for i in range(len(zero_row)):
-                    row.append(raw_row[i] - zero_row[i])
+            if abs(change) <= 1e-15:
+                row = list(zero_row)
             else:
-                row = raw_row
+                row = self.spot_ladder_row(spotPx, reference_date, change, columns, price_method)
+                if diff:
+                    row = [row[i] - zero_row[i] for i in range(len(zero_row))]
             values.append(row)
         return values
 
     def spot_ladder_row(self, spotPx, reference_date, change, columns, price_method):
-        value_row = []
         sub_spot = spotPx * (1 + change)
-        sub_portfolio = self.copy(sub_spot, reference_date)
+        totals = {}
+        for option in self.options:
+            if isinstance(option, McpCustomForward):
+                sub_option = option.copy2(sub_spot, reference_date)
+            else:
+                sub_option = option.copy(sub_spot, reference_date)
+            values = ladder_values(sub_option, columns, price_method)
+            sub_option.del_ref()
+            for column, value in values.items():
+                totals[column] = totals.get(column, 0.0) + value
+        value_row = []
         for column in columns:
             if column == 'Rate':
                 value_row.append(sub_spot)
-            elif column == 'Price':
-                value_row.append(sub_portfolio.price(price_method))
-                # value_row.append(0)
-            elif column == 'Delta(L)':
-                value_row.append(sub_portfolio.delta(False, price_method))
-                # value_row.append(0)
-            elif column == 'Delta(R)':
-                value_row.append(sub_portfolio.delta(True, price_method))
-                # value_row.append(0)
-            elif column == 'Gamma':
-                value_row.append(sub_portfolio.gamma(price_method))
-                # value_row.append(0)
-            elif column == 'Vega':
-                value_row.append(sub_portfolio.vega(price_method))
-                # value_row.append(0)
-            elif column == 'Theta':
-                value_row.append(sub_portfolio.theta(price_method))
-                # value_row.append(0)
-            elif column == 'Rho(L)':
-                value_row.append(sub_portfolio.rho(False, price_method))
-                # value_row.append(0)
-            elif column == 'Rho(R)':
-                value_row.append(sub_portfolio.rho(True, price_method))
-                # value_row.append(0)
-        # sub_portfolio.del_ref()
+            elif column in ladder_methods:
+                value_row.append(totals.get(column, 0.0))
         return value_row
+
+    def clear_ladder_cache(self):
+        self.ladder_zero_rows.clear()
+
+
+# ladder列 -> 计算方法
+ladder_methods = {
+    'Price': lambda option, price_method: option.price(price_method),
+    'Delta(L)': lambda option, price_method: option.delta(False, price_method),
+    'Delta(R)': lambda option, price_method: option.delta(True, price_method),
+    'Gamma': lambda option, price_method: option.gamma(price_method),
+    'Vega': lambda option, price_method: option.vega(price_method),
+    'Theta': lambda option, price_method: option.theta(price_method),
+    'Rho(L)': lambda option, price_method: option.rho(False, price_method),
+    'Rho(R)': lambda option, price_method: option.rho(True, price_method),
+}
+
+
+def ladder_values(option, columns, price_method):
+    """All known ladder columns of one (bumped) instrument, in one pass: column -> value."""
+    return {column: ladder_methods[column](option, price_method) for column in columns if column in ladder_methods}
+
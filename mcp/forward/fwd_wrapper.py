@@ -9,6 +9,7 @@ from mcp.utils.mcp_utils import *
 from mcp.utils.excel_utils import FieldName
 from mcp.wrapper import McpDayCounter, MktDataSide, get_volatility, ForwardUtils, McpMktData, to_mcp_args
 import mcp.wrapper
+from mcp.forward.payoff_grid import PayoffGrid, VanillaKernel, ForwardKernel, DigitalKernel
 
 pricing_method_class_name = PricingMethod().__class__.__name__
 option_expiry_nature_class_name = OptionExpiryNature().__class__.__name__
@@ -118,20 +119,7 @@ class PayoffWrapper:
     def payoff_by_spots(self, value_date, spots):
         if self.payoff_by_spots_impl is not None:
             return self.payoff_by_spots_impl(value_date, spots)
-        pnls = []
-        base_price = self.spec.price()
-        for spot in spots:
-            if is_float(spot):
-                fxv = self.spec.payoff_copy(value_date, spot)
-                underlying_price = fxv.price()
-                pnl = base_price - underlying_price
-                pnls.append(pnl)
-                fxv.del_ref()
-                if self.print_info:
-                    print("payoff_by_spots:", base_price, underlying_price)
-            else:
-                pnls.append("")
-        return pnls
+        return PayoffGrid(self.spec).pnls(value_date, spots)
 
 
 class PctCcyWrapper:
@@ -173,6 +161,11 @@ class PayoffSpec():
     def payoff_copy(self, value_date, spot):
         return self
 
+    def payoff_kernel(self, pricing_method=None):
+        # Analytic (value_date, spots) pricer for PayoffGrid, None if the
+        # product can only be priced through payoff_copy
+        return None
+
     def payoff2(self, value_date, spot=None, rg=0.03):
         return self.payoff_of_mcp(value_date, [])
 
@@ -203,19 +196,7 @@ class PayoffSpec():
                 pnls.append(pnl)
             return pnls
         else:
-            base_price = self.price()
-            for spot in spots:
-                if is_float(spot):
-                    fxv = self.payoff_copy(value_date, spot)
-                    underlying_price = fxv.price()
-                    pnl = base_price - underlying_price
-                    pnls.append(pnl)
-                    # fxv.del_ref()
-                    if self.print_info:
-                        print("payoff_by_spots:", base_price, underlying_price)
-                else:
-                    pnls.append("")
-            return pnls
+            return PayoffGrid(self, dispose_copies=False).pnls(value_date, spots)
 
     def legs(self):
         return [self.get_field_dict()]
@@ -803,6 +784,11 @@ class McpVanillaOption(mcp.wrapper.McpVanillaOption, PayoffSpec):
     def payoff_copy(self, value_date, spot):
         return self.copy(spot, value_date)
 
+    def payoff_kernel(self, pricing_method=None):
+        if VanillaKernel.supports(self, pricing_method):
+            return VanillaKernel(self)
+        return None
+
     # def del_ref(self):
     #     del self.payoff_wrapper.spec
     #     del self.payoff_wrapper
@@ -810,17 +796,7 @@ class McpVanillaOption(mcp.wrapper.McpVanillaOption, PayoffSpec):
     def prices(self, value_dates, spots, pricingMethod=None):
         if pricingMethod is None:
             pricingMethod = self.pricingMethod
-        prices = []
-        for value_date in value_dates:
-            sub_prices = []
-            for spot in spots:
-                fxv = self.copy(spot, value_date)
-                price = fxv.price(pricingMethod)
-                fxv.del_ref()
-                sub_prices.append(price)
-            prices.append(sub_prices)
-        # gc.collect(0)
-        return prices
+        return PayoffGrid(self, pricingMethod).prices(value_dates, spots)
 
     def getPricingMethod(self):
         return self.pricingMethod
@@ -1344,6 +1320,11 @@ class McpFXForward(mcp.mcp.MFXForward, PayoffSpec):
         n_args[1] = spot
         return McpFXForward(*n_args)
 
+    def payoff_kernel(self, pricing_method=None):
+        if ForwardKernel.supports(self):
+            return ForwardKernel(self)
+        return None
+
 
 class McpVanillaBarriers(mcp.mcp.MVanillaBarriers, PayoffSpec):
 
@@ -1587,6 +1568,11 @@ class McpEuropeanDigital(mcp.mcp.MEuropeanDigital, PayoffSpec):
         new_args[3] = spot
         return McpEuropeanDigital(*new_args)
 
+    def payoff_kernel(self, pricing_method=None):
+        if DigitalKernel.supports(self):
+            return DigitalKernel(self)
+        return None
+
     def payoff_strikes(self):
         return self.strikes
 
@@ -0,0 +1,216 @@
+"""
+Payoff / scenario grid pricing.
+
+PayoffGrid prices one product over value_dates x spots.  Products that
+can describe themselves analytically return a kernel from
+payoff_kernel(): the market data (rates, volatility, strike) is read once
+from the priced object and only the spot and the time to expiry vary, so
+a whole row of spots is priced by one numpy call.  Before a kernel is
+trusted it is checked against the library price at the base point, and
+each value date is checked at one grid point of its row; a row whose
+check fails (different day count, premium date, smile adjustment...) is
+priced by the exact object-per-point loop.
+"""
+
+import math
+
+import numpy as np
+
+from mcp.utils.bs_engine import bs_prices, norm_cdf
+from mcp.utils.enums import DigitalType, FxFwdPricingMethod, OptionExpiryNature, PricingMethod
+from mcp.utils.mcp_utils import is_float
+from mcp.wrapper import McpDayCounter
+
+
+class PayoffKernel:
+    """
+    Analytic price of one product as a function of (value_date, spots).
+    Time fractions are computed once per value date.
+    """
+
+    def __init__(self, reference_date, expiry_date, day_counter, settlement_date=None):
+        self.reference_date = reference_date
+        self.expiry_date = expiry_date
+        self.settlement_date = settlement_date
+        self.day_counter = McpDayCounter(day_counter)
+        self.times = {}
+
+    def time_to(self, value_date):
+        key = str(value_date)
+        if key not in self.times:
+            t_expiry = self.day_counter.YearFraction(value_date, self.expiry_date)
+            if self.settlement_date is None:
+                t_settle = t_expiry
+            else:
+                t_settle = self.day_counter.YearFraction(value_date, self.settlement_date)
+            self.times[key] = (max(t_expiry, 0.0), max(t_settle, 0.0))
+        return self.times[key]
+
+    def prices(self, value_date, spots):
+        return np.zeros(len(spots))
+
+
+class VanillaKernel(PayoffKernel):
+
+    def __init__(self, spec):
+        super().__init__(spec.referenceDate, spec.expiryDate, spec.dayCounter)
+        self.strike = spec.strikePx
+        self.dom_rate = spec.domesticRate
+        self.for_rate = spec.foreignRate
+        self.vol = spec.volatility
+        self.call_put = spec.callPut
+        self.amount = spec.buySell * spec.faceAmount
+
+    @staticmethod
+    def supports(spec, pricing_method=None):
+        if pricing_method is None or pricing_method == 0:
+            pricing_method = spec.pricingMethod
+        args = getattr(spec, "args", None)
+        return (args is not None and len(args) == 21 and args[-1] == 1
+                and spec.optionExpiryNature == OptionExpiryNature.EUROPEAN
+                and pricing_method == PricingMethod.BLACKSCHOLES)
+
+    def prices(self, value_date, spots):
+        t, _ = self.time_to(value_date)
+        return self.amount * bs_prices(spots, self.strike, t, self.dom_rate, self.for_rate, self.vol, self.call_put)
+
+
+class ForwardKernel(PayoffKernel):
+
+    def __init__(self, spec):
+        super().__init__(spec.referenceDate, spec.expiryDate, spec.dayCounter, spec.settlementDate)
+        self.strike = spec.strikePx
+        self.acc_rate = spec.accRate
+        self.und_rate = spec.undRate
+        self.fixed_forward = spec.act_forward if spec.pricing_method == FxFwdPricingMethod.MARKETFWD else None
+        self.amount = spec.buySell * spec.leverage
+
+    @staticmethod
+    def supports(spec):
+        return len(spec.args) == 13
+
+    def prices(self, value_date, spots):
+        t, t_settle = self.time_to(value_date)
+        spots = np.asarray(spots, dtype=float)
+        if self.fixed_forward is None:
+            fwd = spots * math.exp((self.acc_rate - self.und_rate) * t)
+        else:
+            fwd = np.full(spots.shape, float(self.fixed_forward))
+        return self.amount * (fwd - self.strike) * math.exp(-self.acc_rate * t_settle)
+
+
+class DigitalKernel(PayoffKernel):
+
+    def __init__(self, spec):
+        super().__init__(spec.referenceDate, spec.expiryDate, spec.dayCounter, spec.settlementDate)
+        self.strike = spec.strikePx
+        self.acc_rate = spec.accRate
+        self.und_rate = spec.undRate
+        self.vol = spec.volatility
+        self.sign = 1.0 if spec.digitalType == DigitalType.CASH_OR_NOTHING_CALL else -1.0
+        self.amount = spec.buySell * spec.payoff_arg
+
+    @staticmethod
+    def supports(spec):
+        return spec.digitalType in (DigitalType.CASH_OR_NOTHING_CALL, DigitalType.CASH_OR_NOTHING_PUT)
+
+    def prices(self, value_date, spots):
+        t, t_settle = self.time_to(value_date)
+        spots = np.asarray(spots, dtype=float)
+        if t <= 0:
+            itm = self.sign * (spots - self.strike) > 0
+            return self.amount * itm.astype(float)
+        vol_t = self.vol * math.sqrt(t)
+        d2 = (np.log(spots / self.strike) + (self.acc_rate - self.und_rate - 0.5 * self.vol * self.vol) * t) / vol_t
+        return self.amount * math.exp(-self.acc_rate * t_settle) * norm_cdf(self.sign * d2)
+
+
+class SumKernel(PayoffKernel):
+    """Kernel of a compound product, the sum of its leg kernels."""
+
+    def __init__(self, kernels):
+        self.kernels = kernels
+
+    def prices(self, value_date, spots):
+        total = np.zeros(len(spots))
+        for kernel in self.kernels:
+            total = total + kernel.prices(value_date, spots)
+        return total
+
+
+class PayoffGrid:
+
+    def __init__(self, spec, pricing_method=None, dispose_copies=True, rel_tol=1e-6):
+        self.spec = spec
+        self.dispose_copies = dispose_copies
+        self.pricing_method = pricing_method
+        self.rel_tol = rel_tol
+        self.kernel = None
+        self.base_checked = None
+        # str(value_date) -> whether the kernel matched the library on that date
+        self.checked_dates = {}
+        kernel_fc = getattr(spec, "payoff_kernel", None)
+        if kernel_fc is not None:
+            try:
+                self.kernel = kernel_fc(pricing_method)
+            except Exception:
+                self.kernel = None
+
+    def spec_price(self, spec):
+        if self.pricing_method is None:
+            return spec.price()
+        return spec.price(self.pricing_method)
+
+    def copy_price(self, value_date, spot):
+        obj = self.spec.payoff_copy(value_date, spot)
+        price = self.spec_price(obj)
+        if self.dispose_copies and obj is not self.spec:
+            obj.del_ref()
+        return price
+
+    def close(self, a, b):
+        return abs(a - b) <= self.rel_tol * max(1.0, abs(a), abs(b))
+
+    def check_base(self):
+        if self.base_checked is None:
+            self.base_checked = False
+            if self.kernel is not None:
+                try:
+                    base = self.kernel.prices(self.spec.referenceDate, [self.spec.spotPx])[0]
+                    self.base_checked = self.close(base, self.spec_price(self.spec))
+                except Exception:
+                    self.base_checked = False
+        return self.base_checked
+
+    def check_kernel(self, value_date, spot):
+        # The kernel must reproduce the library at the base point and at one
+        # point of every value date, otherwise that row is priced point by point
+        if not self.check_base():
+            return False
+        key = str(value_date)
+        if key not in self.checked_dates:
+            try:
+                point = self.kernel.prices(value_date, [spot])[0]
+                self.checked_dates[key] = self.close(point, self.copy_price(value_date, spot))
+            except Exception:
+                self.checked_dates[key] = False
+        return self.checked_dates[key]
+
+    def row_prices(self, value_date, spots):
+        values = [float(spot) for spot in spots if is_float(spot)]
+        if len(values) > 0 and self.check_kernel(value_date, values[-1]):
+            priced = self.kernel.prices(value_date, np.asarray(values, dtype=float)).tolist()
+        else:
+            priced = [self.copy_price(value_date, spot) for spot in values]
+        result = []
+        it = iter(priced)
+        for spot in spots:
+            result.append(next(it) if is_float(spot) else "")
+        return result
+
+    def prices(self, value_dates, spots):
+        return [self.row_prices(value_date, spots) for value_date in value_dates]
+
+    def pnls(self, value_date, spots):
+        base_price = self.spec_price(self.spec)
+        return [base_price - price if price != "" else "" for price in self.row_prices(value_date, spots)]
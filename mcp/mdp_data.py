@@ -1,7 +1,10 @@
 import re
 import time
 
-from mdp.ws.quote_client import md_client
+from mcp.utils.lazy_import import lazy_module, lazy_globals
+
+# 行情客户端在订阅时才导入(导入时会建立连接)
+quote_client = lazy_module("mdp.ws.quote_client")
 
 # ATM,25DC,25DP，10DC,10DP,25DR,25DB,10DR,10DB
 
@@ -29,11 +32,11 @@ class MdpDataWrapper():
             for vt in default_vol_types:
                 for tenor in default_tenors:
                     topic = pair + "." + vt + "." + tenor
-                    md_client.subscribeMarketPrice(topic, self.mp_vol_callback)
+                    quote_client.md_client.subscribeMarketPrice(topic, self.mp_vol_callback)
             for rt in default_rate_types:
                 for tenor in default_tenors:
                     topic = pair + ".FXS." + rt + "." + tenor
-                    md_client.subscribeMarketPrice(topic, self.mp_rate_callback)
+                    quote_client.md_client.subscribeMarketPrice(topic, self.mp_rate_callback)
 
     def get_default_tenors(self):
         return default_tenors;
@@ -88,7 +91,7 @@ class MdpDataWrapper():
         return item
 
     def mp_rate_callback(self, data):
-        image = md_client.getCacheImage(data)
+        image = quote_client.md_client.getCacheImage(data)
         data = image["Data"]
         pair: str = std_pair(data["UN_SYMBOL"])
         tenor: str = data["TENOR"]
@@ -107,7 +110,7 @@ class MdpDataWrapper():
         # print("rate:", data)
 
     def mp_vol_callback(self, data):
-        image = md_client.getCacheImage(data)
+        image = quote_client.md_client.getCacheImage(data)
         data = image["Data"]
         pair: str = std_pair(data["UN_SYMBOL"])
         tenor: str = data["TENOR"]
@@ -126,8 +129,14 @@ class MdpDataWrapper():
         # print("vol:", data)
 
 
-mdp_data_wrapper = MdpDataWrapper()
-mdp_data_wrapper.init_data()
+def create_mdp_data_wrapper():
+    wrapper = MdpDataWrapper()
+    wrapper.init_data()
+    return wrapper
+
+
+# mdp_data_wrapper第一次访问时才创建并订阅行情，导入本模块没有副作用
+__getattr__ = lazy_globals(__name__, {"mdp_data_wrapper": create_mdp_data_wrapper})
 
 # time.sleep(2)
 #
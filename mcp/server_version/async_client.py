@@ -0,0 +1,225 @@
+"""
+asyncio client for the McpService batch endpoints.
+
+McpAsyncClient sends many requests concurrently (bounded by a semaphore),
+splits long identifier lists into chunks, and coalesces per-identifier
+calls made in the same event-loop tick into one batch request per
+(class, endpoint, arguments).  McpBatchClient is the synchronous facade
+used by the Excel functions:
+
+    client = McpBatchClient(node, concurrency=8, chunk_size=200)
+    results = client.risk_metrics("FixedRateBond", {bond: [f"FrbDurationCHN|{yld}"] ...})
+
+HTTP goes through mcp_server.safe_post_request, i.e. the shared pooled
+transport, on a thread pool sized to the concurrency limit.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp.server_version import mcp_server
+
+
+class McpAsyncClient:
+
+    def __init__(self, node, concurrency=8, chunk_size=200, timeout=10):
+        self.node = node
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._semaphore = None
+        self._pending = {}
+        self.request_count = 0
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def post(self, class_name, endpoint, payload, timeout=None):
+        url = f"{self.node.node_url}/{class_name}/{endpoint}"
+        headers = {"X-Signature": mcp_server.ensureAuthorized(class_name)}
+        if timeout is None:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        async with self.semaphore():
+            self.request_count += 1
+            response = await loop.run_in_executor(
+                self._executor, lambda: mcp_server.safe_post_request(url, json=payload, headers=headers,
+                                                                     timeout=timeout))
+        response_data = response.json()
+        if response_data["status"] != "success":
+            raise Exception(f"Error from server: {response_data.get('error')}")
+        return response_data
+
+    def chunks(self, identifiers):
+        size = self.chunk_size if self.chunk_size and self.chunk_size > 0 else len(identifiers)
+        return [identifiers[i:i + size] for i in range(0, len(identifiers), max(size, 1))]
+
+    async def batch(self, class_name, endpoint, identifiers, result_key, extra=None, timeout=None):
+        """
+        POST {"identifiers": chunk, **extra} for every chunk concurrently and
+        merge the result_key part of the responses (dicts are updated,
+        lists are concatenated in identifier order).
+        """
+        identifiers = list(identifiers)
+        if len(identifiers) == 0:
+            return {}
+        tasks = []
+        for chunk in self.chunks(identifiers):
+            payload = {"identifiers": chunk}
+            if extra is not None:
+                payload.update(extra)
+            tasks.append(self.post(class_name, endpoint, payload, timeout))
+        responses = await asyncio.gather(*tasks)
+        return merge_results([resp if result_key is None else resp[result_key] for resp in responses])
+
+    async def risk_metrics(self, class_name, requests, timeout=None):
+        """
+        requests: {identifier: [metric_name, ...]}.  Identifiers asking for
+        the same metrics share batch requests.
+        :return: {identifier: {metric_name: value}}
+        """
+        groups = {}
+        for identifier, metric_names in requests.items():
+            groups.setdefault(tuple(metric_names), []).append(identifier)
+        parts = await self.grouped_risk_metrics(class_name, groups, timeout)
+        result = {}
+        for part in parts.values():
+            for identifier, values in part.items():
+                result.setdefault(identifier, {}).update(values)
+        return result
+
+    async def grouped_risk_metrics(self, class_name, groups, timeout=None):
+        """
+        groups: {(metric_name, ...): [identifier, ...]}.  Results stay
+        separate per group, so the same identifier can be asked for the
+        same metric with different arguments (e.g. two yields).
+        :return: {(metric_name, ...): {identifier: {metric_name: value}}}
+        """
+        names_list = list(groups.keys())
+        parts = await asyncio.gather(*[
+            self.batch(class_name, "batch_risk_metrics", list(dict.fromkeys(groups[names])), "results",
+                       {"metric_names": list(names)}, timeout)
+            for names in names_list])
+        return dict(zip(names_list, parts))
+
+    async def risk_metric(self, class_name, identifier, metric_names):
+        """
+        One identifier, coalesced with every other risk_metric call for the
+        same class and metrics issued in the same event-loop tick.
+        """
+        return await self.coalesce(class_name, "batch_risk_metrics", "results", identifier,
+                                   {"metric_names": list(metric_names)})
+
+    async def get_data(self, class_name, identifier):
+        return await self.coalesce(class_name, "batch_get_raw_data", "raw_datas", identifier)
+
+    async def get_vol_data(self, class_name, identifier):
+        return await self.coalesce(class_name, "batch_get_vol_data", "raw_datas", identifier)
+
+    async def coalesce(self, class_name, endpoint, result_key, identifier, extra=None):
+        key = (class_name, endpoint, result_key, repr(sorted(extra.items())) if extra else "")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if key not in self._pending:
+            self._pending[key] = (extra, [])
+            loop.call_soon(lambda: asyncio.ensure_future(self.flush(key)))
+        self._pending[key][1].append((identifier, future))
+        return await future
+
+    async def flush(self, key):
+        extra, waiters = self._pending.pop(key)
+        class_name, endpoint, result_key, _ = key
+        identifiers = list(dict.fromkeys(identifier for identifier, _ in waiters))
+        try:
+            result = await self.batch(class_name, endpoint, identifiers, result_key, extra)
+        except Exception as e:
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for identifier, future in waiters:
+            if not future.done():
+                future.set_result(result.get(identifier) if isinstance(result, dict) else result)
+
+
+def merge_results(parts):
+    if len(parts) == 0:
+        return {}
+    if all(isinstance(part, dict) for part in parts):
+        merged = {}
+        for part in parts:
+            merged.update(part)
+        return merged
+    if all(isinstance(part, list) for part in parts):
+        merged = []
+        for part in parts:
+            merged.extend(part)
+        return merged
+    return parts
+
+
+def run_sync(coro):
+    """Run a coroutine to completion, also when called from a thread that already runs a loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class McpBatchClient:
+    """Synchronous facade of McpAsyncClient."""
+
+    def __init__(self, node, concurrency=8, chunk_size=200, timeout=10):
+        self.node = node
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def run(self, func):
+        async def main():
+            client = McpAsyncClient(self.node, self.concurrency, self.chunk_size, self.timeout)
+            try:
+                return await func(client)
+            finally:
+                client.close()
+
+        return run_sync(main())
+
+    def batch(self, class_name, endpoint, identifiers, result_key, extra=None, timeout=None):
+        return self.run(lambda c: c.batch(class_name, endpoint, identifiers, result_key, extra, timeout))
+
+    def risk_metrics(self, class_name, requests, timeout=None):
+        return self.run(lambda c: c.risk_metrics(class_name, requests, timeout))
+
+    def grouped_risk_metrics(self, class_name, groups, timeout=None):
+        return self.run(lambda c: c.grouped_risk_metrics(class_name, groups, timeout))
+
+    def get_data(self, class_name, identifiers):
+        return self.batch(class_name, "batch_get_raw_data", identifiers, "raw_datas")
+
+    def get_vol_data(self, class_name, identifiers):
+        return self.batch(class_name, "batch_get_vol_data", identifiers, "raw_datas")
+
+    def create_objects(self, class_name, identifiers):
+        return self.batch(class_name, "batch_create", identifiers, "instances")
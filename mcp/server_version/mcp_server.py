@@ -1,13 +1,14 @@
 import copy
+import gzip
+import json as json_module
 import math
 import os
+import threading
 import traceback
 from datetime import datetime
 from typing import Any, Dict, List
 
 import numpy as np
-import pandas as pd
-import requests
 import urllib3
 from urllib3.exceptions import InsecureRequestWarning
 
@@ -15,6 +16,7 @@ from urllib3.exceptions import InsecureRequestWarning
 urllib3.disable_warnings(InsecureRequestWarning)
 
 from mcp import wrapper
+from mcp.server_version.svr_cache import SvrCache, ObjectDataMap, cache_key, estimate_size
 from mcp.mcp import MBillCurveData, MVanillaSwapCurveData, MFixedRateBondCurveData
 from mcp.tool.tools_main import (McpFixedRateBond, McpYieldCurve, McpVanillaSwap, McpBondCurve, McpSwapCurve, \
                                  McpYieldCurve2, McpFXForwardPointsCurve2, McpMktVolSurface2, McpParametricCurve,
@@ -23,15 +25,33 @@ from mcp.tool.tools_main import (McpFixedRateBond, McpYieldCurve, McpVanillaSwap
                                  McpVolSurface, McpFXForwardPointsCurve, McpFXVolSurface, McpHistVols)
 from mcp.tools import McpCalendar
 from mcp.utils.enums import *
+from mcp.utils.lazy_import import lazy_module
 from mcp.utils.mcp_utils import excel_date_to_string
 from mcp.wrapper import McpRateConvention
 
+pd = lazy_module("pandas")
+requests = lazy_module("requests")
+
 # default_url = "http://127.0.0.1:5000"
 default_url = 'https://fxo.mathema.com.cn/McpService'
 node = None
 
-all_cache = {}
-object_data_cache = {}
+# 日内会更新的市场数据(曲线、波动率曲面、互换、行情)，缓存键中没有行情时间，只短时间缓存，
+# 合并同一次重算中的重复请求
+market_ttl = 60
+market_classes = [
+    'BondCurve', 'ParametricCurve', 'SwapCurve', 'VanillaSwap', 'BondMKT',
+    'VolSurface', 'VolSurface2_Future', 'VolSurface2_BTC', 'VolSurface2_Equity',
+    'VolSurface_Future', 'VolSurface_BTC', 'McpFXVolSurfaceByName', 'McpFXVolSurface2ByName',
+]
+
+# 构造好的对象(内存)，键为cache_key(...)或旧的"{class_name}_{id}"字符串
+all_cache = SvrCache(ttl=8 * 3600, max_bytes=256 * 1024 * 1024,
+                     class_ttl={name: market_ttl for name in market_classes})
+# 服务端返回的原始数据，configure_cache(persist_dir=...)后当天落盘
+data_cache = SvrCache(ttl=8 * 3600, max_bytes=128 * 1024 * 1024,
+                      class_ttl={name: market_ttl for name in market_classes})
+object_data_cache = ObjectDataMap()
 
 
 class McpNode:
@@ -51,11 +71,11 @@ def create_McpNode(url=default_url):
 def ensureAuthorized(className: str) -> str:
     return "valid-signature"  # 假设已实现
 
-def create_no_proxy_session():
+def create_no_proxy_session(pool_size=10):
     """创建绕过VPN代理的requests session"""
-    # 完全清除所有代理设置
+    # 只清除代理环境变量，保留REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE等证书设置
     proxy_vars = [
-        'HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 
+        'HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy',
         'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy',
         'FTP_PROXY', 'ftp_proxy', 'SOCKS_PROXY', 'socks_proxy'
     ]
@@ -63,7 +83,6 @@ def create_no_proxy_session():
         if var in os.environ:
             del os.environ[var]
 
-    # 创建完全无代理的session
     session = requests.Session()
     session.proxies = {
         'http': '',
@@ -71,41 +90,111 @@ def create_no_proxy_session():
         'ftp': '',
         'socks': ''
     }
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
     return session
 
-def safe_post_request(url, json=None, headers=None, timeout=5):
-    """安全的POST请求，自动绕过VPN代理"""
-    session = create_no_proxy_session()
-    
-    try:
-        # 尝试使用certifi证书验证
-        response = session.post(url, json=json, headers=headers, timeout=timeout, verify=True)
-        return response
-    except requests.exceptions.SSLError:
+
+class HttpTransport:
+    """
+    连接池复用的HTTP传输层，整个进程共用一个keep-alive session，避免每次请求重新建立TCP/TLS连接。
+
+    pool_size: 每个host的连接池大小
+    compress: 请求响应压缩(Accept-Encoding: gzip)，超过compress_min_size字节的请求体也用gzip压缩
+    """
+
+    def __init__(self, pool_size=10, compress=True, compress_min_size=None):
+        self.pool_size = pool_size
+        self.compress = compress
+        # 请求体压缩需要服务端支持Content-Encoding: gzip，默认关闭
+        self.compress_min_size = compress_min_size
+        self._session = None
+        self._http = None
+        self._lock = threading.Lock()
+
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = create_no_proxy_session(self.pool_size)
+                    if self.compress:
+                        session.headers['Accept-Encoding'] = 'gzip, deflate'
+                    self._session = session
+        return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._http is not None:
+                self._http.clear()
+                self._http = None
+
+    def _body(self, json_data, headers):
+        request_headers = dict(headers) if headers else {}
+        request_headers['Content-Type'] = 'application/json'
+        body = json_module.dumps(json_data).encode('utf-8') if json_data is not None else None
+        if body is not None and self.compress_min_size is not None and len(body) >= self.compress_min_size:
+            body = gzip.compress(body)
+            request_headers['Content-Encoding'] = 'gzip'
+        return body, request_headers
+
+    def post(self, url, json=None, headers=None, timeout=5):
+        session = self.session()
+        body, request_headers = self._body(json, headers)
         try:
-            # 尝试禁用SSL验证
-            response = session.post(url, json=json, headers=headers, timeout=timeout, verify=False)
-            return response
-        except requests.exceptions.RequestException:
-            # 最后尝试使用urllib3直接连接
-            import json as json_module
-            http = urllib3.PoolManager()
-            
-            request_headers = dict(headers) if headers else {}
-            request_headers['Content-Type'] = 'application/json'
-            
-            response = http.request('POST', url, 
-                                  body=json_module.dumps(json).encode('utf-8') if json else None,
-                                  headers=request_headers,
-                                  timeout=timeout)
-            
-            # 转换为requests Response对象
-            from requests.models import Response
-            req_response = Response()
-            req_response.status_code = response.status
-            req_response._content = response.data
-            req_response.headers = dict(response.headers)
-            return req_response
+            return session.post(url, data=body, headers=request_headers, timeout=timeout, verify=True)
+        except requests.exceptions.SSLError:
+            try:
+                # 与原来相同，只对这一次请求禁用SSL验证
+                return session.post(url, data=body, headers=request_headers, timeout=timeout, verify=False)
+            except requests.exceptions.RequestException:
+                return self._post_urllib3(url, body, request_headers, timeout)
+
+    def _post_urllib3(self, url, body, request_headers, timeout):
+        # 最后尝试使用urllib3直接连接
+        if self._http is None:
+            self._http = urllib3.PoolManager(maxsize=self.pool_size)
+        response = self._http.request('POST', url, body=body, headers=request_headers, timeout=timeout)
+        # 转换为requests Response对象
+        from requests.models import Response
+        req_response = Response()
+        req_response.status_code = response.status
+        req_response._content = response.data
+        req_response.headers = dict(response.headers)
+        return req_response
+
+
+_transport = HttpTransport()
+
+
+def get_transport():
+    return _transport
+
+
+def set_transport(transport):
+    """
+    替换传输层，transport需要提供post(url, json=None, headers=None, timeout=5)，返回带json()方法的响应，
+    例如测试时指向本地模拟服务。返回原来的transport。
+    """
+    global _transport
+    old = _transport
+    _transport = transport
+    return old
+
+
+def configure_transport(pool_size=10, compress=True, compress_min_size=None):
+    old = set_transport(HttpTransport(pool_size, compress, compress_min_size))
+    if isinstance(old, HttpTransport):
+        old.close()
+    return _transport
+
+
+def safe_post_request(url, json=None, headers=None, timeout=5):
+    """安全的POST请求，自动绕过VPN代理，复用连接池"""
+    return _transport.post(url, json=json, headers=headers, timeout=timeout)
 
 class McpObject:
     _cache = {}  # 类级缓存，避免重复构造
@@ -266,6 +355,86 @@ class McpObject:
             raise Exception(f"Error from server: {response_data['error']}")
         return response_data["raw_datas"]
 
+batch_concurrency = 8
+batch_chunk_size = 200
+
+
+def batch_client():
+    """并发批量请求客户端(同步接口)，见mcp.server_version.async_client"""
+    from mcp.server_version.async_client import McpBatchClient
+    global node
+    if node is None:
+        node = create_McpNode()
+    return McpBatchClient(node, batch_concurrency, batch_chunk_size)
+
+
+def configure_cache(ttl=8 * 3600, max_bytes=256 * 1024 * 1024, data_max_bytes=128 * 1024 * 1024,
+                    persist_dir=None, market_data_ttl=None):
+    """
+    ttl: 过期秒数(对象和原始数据)，None表示不过期
+    max_bytes/data_max_bytes: 对象/原始数据的内存预算
+    persist_dir: 原始数据落盘目录，None表示不落盘
+    market_data_ttl: market_classes(曲线、曲面...)的过期秒数，None时为market_ttl
+    """
+    global all_cache, data_cache
+    class_ttl = {name: market_ttl if market_data_ttl is None else market_data_ttl for name in market_classes}
+    all_cache = SvrCache(ttl=ttl, max_bytes=max_bytes, class_ttl=class_ttl)
+    data_cache = SvrCache(ttl=ttl, max_bytes=data_max_bytes, persist_dir=persist_dir, class_ttl=class_ttl)
+
+
+def cached_fetch(class_name, ids, fetch, reference_date='', args=None):
+    """
+    按标识缓存服务端原始数据，只请求缓存中没有的标识。
+    fetch(missing_ids) -> {identifier: raw_data}
+    :return: {identifier: raw_data}，每次返回副本，调用方可以修改
+    """
+    results = {}
+    missing = []
+    for identifier in ids:
+        data = data_cache.get(cache_key(class_name, identifier, reference_date, args))
+        if data is None:
+            missing.append(identifier)
+        else:
+            results[identifier] = data
+    if len(missing) > 0:
+        fetched = fetch(missing)
+        for identifier in missing:
+            if identifier in fetched:
+                data = fetched[identifier]
+                data_cache.put(cache_key(class_name, identifier, reference_date, args), data, persist=True)
+                results[identifier] = data
+    return copy.deepcopy(results)
+
+
+def cached_object(key, raw_data, builder):
+    """对象缓存: 命中时直接返回，否则用builder()构造并登记原始数据"""
+    obj = all_cache.get(key)
+    if obj is None:
+        obj = builder()
+        all_cache.put(key, obj, size=estimate_size(raw_data))
+        object_data_cache[obj] = raw_data
+    return obj
+
+
+def invalidate_cache(class_name=None, identifier=None):
+    """删除class_name/identifier对应的对象和原始数据，均为None时全部清空"""
+    return all_cache.invalidate(class_name, identifier) + data_cache.invalidate(class_name, identifier)
+
+
+def McpSvrCacheStats():
+    rows = [['Cache', 'Items', 'Bytes', 'Hits', 'DiskHits', 'Misses', 'HitRate', 'Evictions', 'Expirations']]
+    for name, cache in (('Object', all_cache), ('Data', data_cache)):
+        stats = cache.stats()
+        rows.append([name, stats['items'], stats['bytes'], stats['hits'], stats['disk_hits'], stats['misses'],
+                     stats['hit_rate'], stats['evictions'], stats['expirations']])
+    return rows
+
+
+def McpSvrCacheClear(class_name='', identifier=''):
+    count = invalidate_cache(class_name if class_name else None, identifier if identifier else None)
+    return f'已清除{count}条缓存'
+
+
 def SetNode(url: str) -> str:
     global default_url
     default_url = url
@@ -419,41 +588,32 @@ def McpBatchCreateObjects(identifiers, class_name=''):
             all_cache[keys] = frb
     return result
 
+def frb_args(instance):
+    return {
+        'ValueDate': instance["ValueDate"],
+        'MaturityDate': instance["MaturityDate"],
+        'Coupon': instance["Coupon"],
+        'Frequency': instance["Frequency"],
+        'CouponType': instance["CouponType"],
+        'IssuePrice': instance["IssuePrice"],
+        'SettlementDate': instance["SettlementDate"],
+    }
+
+
 def McpFixedRateBonds_(identifiers):
     ids = identifiers.split(",")
     class_name = "FixedRateBond"
     result = []
-    # ids_no_cache = []
-    # global all_cache
-    # for i in ids:
-    #     keys = f"{class_name}_{i}"
-    #     if keys in all_cache:
-    #         result.append(all_cache[keys])
-    #     else:
-    #         ids_no_cache.append(i)
     global node
     if node is None:
         node = create_McpNode()
-        # if len(ids_no_cache) > 0:
-    objects = McpObject.batch_create_objects(node, class_name, ids)
+    instances = cached_fetch(class_name, ids,
+                             lambda missing: McpObject.batch_create_objects(node, class_name, missing)["instances"],
+                             args=('batch_create',))
     for id in ids:
-        keys = f"{class_name}_{id}"
-        row = []
-        instance = objects["instances"][id]
-        args = {
-            'ValueDate': instance["ValueDate"],
-            'MaturityDate': instance["MaturityDate"],
-            'Coupon': instance["Coupon"],
-            'Frequency': instance["Frequency"],
-            'CouponType': instance["CouponType"],
-            'IssuePrice': instance["IssuePrice"],
-            'SettlementDate': instance["SettlementDate"],
-        }
-        frb = McpFixedRateBond(args)
-        row.append(frb)
-        result.append(row)
-        all_cache[keys] = frb
-        object_data_cache[frb] = args
+        args = frb_args(instances[id])
+        frb = cached_object(cache_key(class_name, id), args, lambda: McpFixedRateBond(args))
+        result.append([frb])
     return result
 
 def McpFixedRateBonds(identifiers, settlement_date=None):
@@ -467,25 +627,14 @@ def McpFixedRateBonds(identifiers, settlement_date=None):
     global node
     if node is None:
         node = create_McpNode()
-    objects = McpObject.create_object(node, class_name, ids, [f'{settlement_date}'])
+    instances = cached_fetch(class_name, ids,
+                             lambda missing: McpObject.create_object(node, class_name, missing,
+                                                                     [f'{settlement_date}'])["instances"],
+                             settlement_date, ('create_object',))
     for id in ids:
-        keys = f"{class_name}_{id}"
-        row = []
-        instance = objects["instances"][id]
-        args = {
-            'ValueDate': instance["ValueDate"],
-            'MaturityDate': instance["MaturityDate"],
-            'Coupon': instance["Coupon"],
-            'Frequency': instance["Frequency"],
-            'CouponType': instance["CouponType"],
-            'IssuePrice': instance["IssuePrice"],
-            'SettlementDate': instance["SettlementDate"],
-        }
-        frb = McpFixedRateBond(args)
-        row.append(frb)
-        result.append(row)
-        all_cache[keys] = frb
-        object_data_cache[frb] = args
+        args = frb_args(instances[id])
+        frb = cached_object(cache_key(class_name, id, settlement_date), args, lambda: McpFixedRateBond(args))
+        result.append([frb])
     return result
 
 
@@ -495,9 +644,11 @@ def McpBond(identifier, settlement_date=None):
     global node
     if node is None:
         node = create_McpNode()
-    objects = McpObject.create_object(node, class_name, [identifier], [f'{settlement_date}'])
-    keys = f"{class_name}_{identifier}"
-    instance = objects["instances"][identifier]
+    instances = cached_fetch(class_name, [identifier],
+                             lambda missing: McpObject.create_object(node, class_name, missing,
+                                                                     [f'{settlement_date}'])["instances"],
+                             settlement_date, ('create_object',))
+    instance = instances[identifier]
     args = {
         'SettlementDate': instance["SettlementDate"],
         'MaturityDate': instance["MaturityDate"],
@@ -509,10 +660,8 @@ def McpBond(identifier, settlement_date=None):
         'DayCounter': DayCounter.ActActXTR,
     }
     # 直接调用tool_def.tool_create避免函数名冲突
-    frb = McpFixedRateBond(args)
-    all_cache[keys] = frb
-    object_data_cache[frb] = args
-    return frb
+    return cached_object(cache_key(class_name, identifier, settlement_date, ('Bond',)), args,
+                         lambda: McpFixedRateBond(args))
 
 def McpFixedRateBondsData(mcpFixedRateBond, flag=False):
     obj = object_data_cache[mcpFixedRateBond]
@@ -525,21 +674,13 @@ def McpBondCurves(identifiers):
     global node
     if node is None:
         node = create_McpNode()
-    results = McpObject.batch_get_data(node, class_name, ids)
-    # result = []
-    # for curve_data in results.values():
-    #     bond_curve = McpBondCurve(curve_data)
-    #     result.append(bond_curve)
-    #     object_data_cache[bond_curve] = curve_data
-    # return result
+    results = cached_fetch(class_name, ids, lambda missing: McpObject.batch_get_data(node, class_name, missing),
+                           args=('batch_get_raw_data',))
     deep_copied_list = copy.deepcopy(results)
     for curve_name in ids:
-        keys = f"{class_name}_{curve_name}"
         arg = results[curve_name]
-        frb = McpBondCurve(arg)
-        all_cache[keys] = frb
-        object_data_cache[frb] = deep_copied_list[curve_name]
-        return frb
+        return cached_object(cache_key(class_name, curve_name), deep_copied_list[curve_name],
+                             lambda: McpBondCurve(arg))
 
 def McpBondCurvesData(mcpBondCurve, flag=False):
     obj = object_data_cache[mcpBondCurve]
@@ -552,16 +693,14 @@ def McpParametricCurves(identifiers):
     global node
     if node is None:
         node = create_McpNode()
-    results = McpObject.batch_get_data(node, class_name, ids)
+    results = cached_fetch(class_name, ids, lambda missing: McpObject.batch_get_data(node, class_name, missing),
+                           args=('batch_get_raw_data',))
 
     deep_copied_list = copy.deepcopy(results)
     for curve_name in ids:
-        keys = f"{class_name}_{curve_name}"
         arg = results[curve_name]
-        frb = McpParametricCurve(arg)
-        all_cache[keys] = frb
-        object_data_cache[frb] = deep_copied_list[curve_name]
-        return frb
+        return cached_object(cache_key(class_name, curve_name), deep_copied_list[curve_name],
+                             lambda: McpParametricCurve(arg))
 
 def McpParametricCurvesData(mcpParametricCurve, flag=False):
     obj = object_data_cache[mcpParametricCurve]
@@ -621,38 +760,23 @@ def get_result(ids, results, flag):
 def McpCalenders(ccy):
     ids = ccy.split(",")
     class_name = "Calender"
-    result = []
-    # ids_no_cache = []
-    # global all_cache
-    # for i in ids:
-    #     keys = f"{class_name}_{i}"
-    #     if keys in all_cache:
-    #         result.append(all_cache[keys])
-    #     else:
-    #         ids_no_cache.append(i)
     global node
     if node is None:
         node = create_McpNode()
-    # if len(ids_no_cache) > 0:
-    results = McpObject.batch_get_data(node, class_name, ids)
+    results = cached_fetch(class_name, ids, lambda missing: McpObject.batch_get_data(node, class_name, missing),
+                           args=('batch_get_raw_data',))
     currencys = []
     holidays = []
     for name in ids:
-        keys = f"{class_name}_{name}"
         currency = results[name]['currency']
         holiday = results[name]['holidays']
         currencys.append(currency)
         holidays.append(holiday)
 
-    cal = McpCalendar(currencys, holidays)
-    # result.append(cal)
-    all_cache[ccy] = cal
-    results={}
+    results = {}
     results['currency'] = currencys
     results['holidays'] = holidays
-    object_data_cache[cal] = results
-    # calendar_cal = McpCalendar(currencys, holidays)
-    return cal
+    return cached_object(cache_key(class_name, ccy), results, lambda: McpCalendar(currencys, holidays))
 
 def McpCalendersData(mcpCalender, flag=False):
     obj = object_data_cache[mcpCalender]
@@ -668,11 +792,19 @@ def McpVanillaSwaps2(identifiers, enddate='', swaprate='', point='0'):
     global node
     if node is None:
         node = create_McpNode()
-    objects = McpObject.create_object(node, class_name, ids, [f'{swaprate}|{enddate}|{point}'])
+    params = f'{swaprate}|{enddate}|{point}'
+    instances = cached_fetch(class_name, ids,
+                             lambda missing: McpObject.create_object(node, class_name, missing, [params])["instances"],
+                             enddate, ('create_object', params))
     for id in ids:
         row = []
-        keys = f"{class_name}_{id}"
-        aa = objects["instances"][id]
+        keys = cache_key(class_name, id, enddate, (params,))
+        value = all_cache.get(keys)
+        if value is not None:
+            row.append(value)
+            result.append(row)
+            continue
+        aa = instances[id]
         args = {
             'ReferenceDate': aa["ReferenceDate"],
             'StartDate': aa["StartDate"],
@@ -789,6 +921,7 @@ def McpVanillaSwaps2(identifiers, enddate='', swaprate='', point='0'):
         frb = McpVanillaSwap(args)
         row.append(frb)
         result.append(row)
+        all_cache.put(keys, frb, size=estimate_size(instances[id]))
         object_data_cache[frb] = aa
     return result
 
@@ -796,23 +929,21 @@ def McpVanillaSwaps(identifiers):
     ids = identifiers.split(",")
     class_name = "VanillaSwap"
     result = []
-    # ids_no_cache = []
-    # global all_cache
-    # for i in ids:
-    #     keys = f"{class_name}_{i}"
-    #     if keys in all_cache:
-    #         result.append(all_cache[keys])
-    #     else:
-    #         ids_no_cache.append(i)
     global node
     if node is None:
         node = create_McpNode()
-    # if len(ids_no_cache) > 0:
-    objects = McpObject.batch_create_objects(node, class_name, ids)
+    instances = cached_fetch(class_name, ids,
+                             lambda missing: McpObject.batch_create_objects(node, class_name, missing)["instances"],
+                             args=('batch_create',))
     for id in ids:
         row = []
-        keys = f"{class_name}_{id}"
-        aa = objects["instances"][id]
+        keys = cache_key(class_name, id)
+        value = all_cache.get(keys)
+        if value is not None:
+            row.append(value)
+            result.append(row)
+            continue
+        aa = instances[id]
         args = {
             'ReferenceDate': aa["ReferenceDate"],
             'StartDate': aa["StartDate"],
@@ -926,7 +1057,7 @@ def McpVanillaSwaps(identifiers):
         frb = McpVanillaSwap(args)
         row.append(frb)
         result.append(row)
-        all_cache[keys] = frb
+        all_cache.put(keys, frb, size=estimate_size(instances[id]))
         object_data_cache[frb] = aa
     return result
 
@@ -945,7 +1076,13 @@ def McpVolSurfaces(identifiers):
     if node is None:
         node = create_McpNode()
 
-    results = McpObject.batch_get_data(node, class_name, ids)
+    keys = cache_key(class_name, ids[0])
+    value = all_cache.get(keys)
+    if value is not None:
+        return value
+
+    results = cached_fetch(class_name, ids, lambda missing: McpObject.batch_get_data(node, class_name, missing),
+                           args=('batch_get_raw_data',))
     deep_copied_list = copy.deepcopy(results)
     for vol_name in ids:
         data = results[vol_name]
@@ -996,6 +1133,7 @@ def McpVolSurfaces(identifiers):
             'Calendar': calendar_cal2
         }
         frb = McpFXVolSurface2(var_args)
+        all_cache.put(cache_key(class_name, vol_name), frb, size=estimate_size(deep_copied_list[vol_name]))
         object_data_cache[frb] = deep_copied_list[vol_name]
         return frb
     return 'fail'
@@ -1011,8 +1149,9 @@ def McpHistory(identifiers, reference_date, count, periods):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1035,8 +1174,9 @@ def McpBondMarketData(identifiers, key):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1058,8 +1198,9 @@ def McpBondMarketArgs(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1089,8 +1230,9 @@ def McpSwapCurves(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1180,8 +1322,9 @@ def McpVolSurface2ByName(identifiers, flag=False):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1218,8 +1361,9 @@ def McpVolSurface2Equity(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1256,8 +1400,9 @@ def McpVolSurfaceByName(identifiers, flag=False):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1295,8 +1440,9 @@ def McpFXVolSurfaceByName(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1352,8 +1498,9 @@ def McpFXVolSurface2ByName(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -1449,6 +1596,41 @@ def check_list_type(lst):
     else:
         return False
 
+# 字段名(小写) -> 枚举类，decode2/decode把枚举值显示为名称
+decode2_enums = {
+    "daycounter": DayCounter,
+    "frequency": Frequency,
+    "buysell": BuySell,
+    "side": Side,
+    "callput": CallPut,
+    "calculatetarget": CalculateTarget,
+    "interpolationmethod": InterpolationMethod,
+    "model": HistVolsModel,
+    "returnmethod": HistVolsReturnMethod,
+    "method": InterpolationMethod,
+    "variable": InterpolationVariable,
+    "interpolationvariable": InterpolationVariable,
+    "interpolatedvariable": InterpolatedVariable,
+}
+decode_enums = dict(decode2_enums, **{
+    "variable": InterpolatedVariable,
+    "iroptionquotation": IROptionQuotation,
+    "capvolpaymenttype": CapVolPaymentType,
+    "strippingmethod": StrippingMethod,
+})
+# SwapCurveData列表中各位置的枚举类
+swap_curve_data_enums = {
+    1: DayCounter,
+    3: DateAdjusterRule,
+    4: DateAdjusterRule,
+    6: Frequency,
+    7: Frequency,
+    8: DayCounter,
+    9: DayCounter,
+    12: ResetRateMethod,
+}
+
+
 def decode2(obj, flag=False):
     result = []
     isList = False
@@ -1465,46 +1647,9 @@ def decode2(obj, flag=False):
             if field in obj:
                 row = [field]
                 value = obj.get(field)
-                if "DayCounter".lower() == field.lower():
-                    # 创建反向映射字典
-                    enum_map = {v: k for k, v in DayCounter.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "Frequency".lower() == field.lower():
-                    enum_map = {v: k for k, v in Frequency.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "BuySell".lower() == field.lower():
-                    enum_map = {v: k for k, v in BuySell.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "Side".lower() == field.lower():
-                    enum_map = {v: k for k, v in Side.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "CallPut".lower() == field.lower():
-                    enum_map = {v: k for k, v in CallPut.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "CalculateTarget".lower() == field.lower():
-                    enum_map = {v: k for k, v in CalculateTarget.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "InterpolationMethod".lower() == field.lower():
-                    enum_map = {v: k for k, v in InterpolationMethod.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "Model".lower() == field.lower():
-                    enum_map = {v: k for k, v in HistVolsModel.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "ReturnMethod".lower() == field.lower():
-                    enum_map = {v: k for k, v in HistVolsReturnMethod.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "Method".lower() == field.lower():
-                    enum_map = {v: k for k, v in InterpolationMethod.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "Variable".lower() == field.lower():
-                    enum_map = {v: k for k, v in InterpolationVariable.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "InterpolationVariable".lower() == field.lower():
-                    enum_map = {v: k for k, v in InterpolationVariable.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
-                elif "InterpolatedVariable".lower() == field.lower():
-                    enum_map = {v: k for k, v in InterpolatedVariable.__dict__.items() if not k.startswith('__')}
-                    value = enum_map.get(value, value)
+                enum_cls = decode2_enums.get(str(field).lower())
+                if enum_cls is not None:
+                    value = enum_wrapper.reverse_map(enum_cls).get(value, value)
                 if isinstance(value, float) and math.isnan(value):
                     row.append("#N/A")
                 else:
@@ -1593,91 +1738,24 @@ def decode(obj: Union[List, Dict], flag: bool = False) -> np.ndarray:
         for field in obj:
             value = obj[field]
 
-            if "DayCounter".lower() == field.lower():
-                # 创建反向映射字典
-                enum_map = {v: k for k, v in DayCounter.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "Frequency".lower() == field.lower():
-                if is_int(value):
+            field_lower = str(field).lower()
+            enum_cls = decode_enums.get(field_lower)
+            if enum_cls is not None:
+                if enum_cls is Frequency and is_int(value):
                     value = int(value)
-                enum_map = {v: k for k, v in Frequency.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "BuySell".lower() == field.lower():
-                enum_map = {v: k for k, v in BuySell.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "Side".lower() == field.lower():
-                enum_map = {v: k for k, v in Side.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "CallPut".lower() == field.lower():
-                enum_map = {v: k for k, v in CallPut.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "CalculateTarget".lower() == field.lower():
-                enum_map = {v: k for k, v in CalculateTarget.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "InterpolationMethod".lower() == field.lower():
-                enum_map = {v: k for k, v in InterpolationMethod.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "Model".lower() == field.lower():
-                enum_map = {v: k for k, v in HistVolsModel.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "ReturnMethod".lower() == field.lower():
-                enum_map = {v: k for k, v in HistVolsReturnMethod.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "Method".lower() == field.lower():
-                enum_map = {v: k for k, v in InterpolationMethod.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "Variable".lower() == field.lower():
-                enum_map = {v: k for k, v in InterpolatedVariable.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "InterpolatedVariable".lower() == field.lower():
-                enum_map = {v: k for k, v in InterpolatedVariable.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "InterpolationVariable".lower() == field.lower():
-                enum_map = {v: k for k, v in InterpolationVariable.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "IROptionQuotation".lower() == field.lower():
-                enum_map = {v: k for k, v in IROptionQuotation.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "CapVolPaymentType".lower() == field.lower():
-                enum_map = {v: k for k, v in CapVolPaymentType.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "StrippingMethod".lower() == field.lower():
-                enum_map = {v: k for k, v in StrippingMethod.__dict__.items() if not k.startswith('__')}
-                value = enum_map.get(value, value)
-            elif "BillCurveData".lower() == field.lower():
+                value = enum_wrapper.reverse_map(enum_cls).get(value, value)
+            elif field_lower == "billcurvedata":
                 data_list = []
                 for idx,item in enumerate(value):
                     if idx == 1:
                         item = "Act365Fixed"
                     data_list.append(item)
                 value = data_list
-            elif "SwapCurveData".lower() == field.lower():
+            elif field_lower == "swapcurvedata":
                 data_list = []
                 for idx, item in enumerate(value):
-                    if idx == 1:
-                        enum_map = {v: k for k, v in DayCounter.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 3:
-                        enum_map = {v: k for k, v in DateAdjusterRule.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 4:
-                        enum_map = {v: k for k, v in DateAdjusterRule.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 6:
-                        enum_map = {v: k for k, v in Frequency.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 7:
-                        enum_map = {v: k for k, v in Frequency.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 8:
-                        enum_map = {v: k for k, v in DayCounter.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 9:
-                        enum_map = {v: k for k, v in DayCounter.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
-                    if idx == 12:
-                        enum_map = {v: k for k, v in ResetRateMethod.__dict__.items() if not k.startswith('__')}
-                        item = enum_map.get(item, value)
+                    if idx in swap_curve_data_enums:
+                        item = enum_wrapper.reverse_map(swap_curve_data_enums[idx]).get(item, value)
                     data_list.append(item)
                 value = data_list
             # 处理 NaN 值
@@ -2529,12 +2607,18 @@ def McpFIPortDurations(bondlist, amountlist, yieldlist):
     total_sum = 0
     total_amount = 0
     class_name = "FixedRateBond"
+    global node
+    if node is None:
+        node = create_McpNode()
+    # 相同收益率的债券合并到同一个批量请求，不同收益率的请求并发发送；
+    # 结果按(收益率, 债券)查找，同一债券不同收益率的持仓各自取值
+    groups = {}
+    for bond_id, yld in zip(bondlist, yieldlist):
+        groups.setdefault((f'FrbDurationCHN|{yld}',), []).append(bond_id)
+    results = batch_client().grouped_risk_metrics(class_name, groups)
     for bond_id, amount, yld in zip(bondlist, amountlist, yieldlist):
-        global node
-        if node is None:
-            node = create_McpNode()
-        results = McpObject.batch_get_risk_metrics(node, class_name, [bond_id], [f'FrbDurationCHN|{yld}'])
-        total_sum = total_sum + float(results[bond_id]['FrbDurationCHN']) * amount
+        duration = results[(f'FrbDurationCHN|{yld}',)][bond_id]['FrbDurationCHN']
+        total_sum = total_sum + float(duration) * amount
         total_amount = total_amount + amount
     result = total_sum / total_amount
     return result
@@ -2556,7 +2640,8 @@ def McpFIPortKRDs(bondlist, amountlist, tenors, curvename):
     if node is None:
         node = create_McpNode()
     tn = ','.join(tenors)
-    results = McpObject.batch_get_risk_metrics(node, class_name, bondlist, [f'KeyRateDuration|{curvename},{tn}'])
+    metric_names = [f'KeyRateDuration|{curvename},{tn}']
+    results = batch_client().risk_metrics(class_name, {bond_id: metric_names for bond_id in bondlist})
     for bond_id, amount in zip(bondlist, amountlist):
         total_amount = total_amount + amount
         i = 0
@@ -2627,8 +2712,9 @@ def McpCapVolSurface(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -2780,8 +2866,9 @@ def McpSwaptionCubes(identifiers):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -2849,8 +2936,9 @@ def McpFXForwardPointsCurves(identifiers,refdate=""):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
@@ -2886,8 +2974,9 @@ def McpFXForwardPointsCurves2(identifiers,refdate=""):
     global all_cache
     for i in ids:
         keys = f"{class_name}_{i}"
-        if keys in all_cache:
-            return all_cache[keys]
+        value = all_cache.get(keys)
+        if value is not None:
+            return value
 
     global node
     if node is None:
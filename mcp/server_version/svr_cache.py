@@ -0,0 +1,331 @@
+"""
+服务端数据/对象缓存。
+
+SvrCache按(class, identifier, reference date, args)缓存，带TTL过期、
+内存预算下的LRU淘汰、按类/标识失效以及命中统计。mcp_server中有两层:
+
+    object_cache  构造好的Mcp对象(曲线、债券、波动率曲面...)，只在内存中
+    data_cache    服务端返回的原始数据，可选落盘(persist_dir)，当天重新
+                  打开工作簿时直接从磁盘读取，不再重复下载
+
+ObjectDataMap保存对象 -> 原始数据(McpXxxData函数使用)，以弱引用为键，
+对象被释放后数据随之释放。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date
+
+
+def cache_key(class_name, identifier, reference_date='', args=None):
+    if args is None:
+        args = ()
+    elif isinstance(args, (list, tuple)):
+        args = tuple(str(arg) for arg in args)
+    else:
+        args = (str(args),)
+    return str(class_name), str(identifier), str(reference_date or ''), args
+
+
+def estimate_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        pass
+    try:
+        return len(pickle.dumps(value))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class SvrCache:
+    """
+    ttl: 过期秒数，None表示不过期
+    class_ttl: 类名 -> 过期秒数，覆盖ttl(曲线、曲面等日内会更新的市场数据用较短的时间)
+    max_bytes: 内存预算(按估算大小)，超出后淘汰最久未使用的条目
+    max_items: 条目数上限，None表示不限
+    persist_dir: 落盘目录，None表示不落盘，按日期分子目录，只读取当天的数据
+    """
+
+    def __init__(self, ttl=3600, max_bytes=256 * 1024 * 1024, max_items=None, persist_dir=None, class_ttl=None):
+        self.ttl = ttl
+        self.class_ttl = dict(class_ttl) if class_ttl else {}
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.persist_dir = persist_dir
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def ttl_of(self, key):
+        """key的过期秒数: 元组键按类名，字符串键按"{class_name}_"前缀"""
+        if isinstance(key, tuple):
+            return self.class_ttl.get(key[0], self.ttl)
+        for class_name, ttl in self.class_ttl.items():
+            if str(key).startswith(f"{class_name}_"):
+                return ttl
+        return self.ttl
+
+    def _expired(self, key, entry):
+        ttl = self.ttl_of(key)
+        return ttl is not None and time.time() - entry[1] > ttl
+
+    def _remove(self, key):
+        value, _, size = self._items.pop(key)
+        self.size -= size
+        return value
+
+    def _lookup(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+        if self._expired(key, entry):
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._items.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            value = self._load(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._store(key, value, None)
+                return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value, size=None, persist=False):
+        with self._lock:
+            self._store(key, value, size)
+            if persist:
+                self._save(key, value)
+        return value
+
+    def _store(self, key, value, size):
+        if key in self._items:
+            self._remove(key)
+        if size is None:
+            size = estimate_size(value)
+        self._items[key] = (value, time.time(), size)
+        self.size += size
+        self._evict()
+
+    def _evict(self):
+        while len(self._items) > 1 and (
+                (self.max_bytes is not None and self.size > self.max_bytes)
+                or (self.max_items is not None and len(self._items) > self.max_items)):
+            self._remove(next(iter(self._items)))
+            self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            if self._lookup(key) is not None:
+                return True
+            self.misses += 1
+        return False
+
+    def __getitem__(self, key):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                raise KeyError(key)
+            self.hits += 1
+            self._items.move_to_end(key)
+            return entry[0]
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __len__(self):
+        return len(self._items)
+
+    def invalidate(self, class_name=None, identifier=None):
+        """
+        删除class_name/identifier匹配的条目(内存和当天的落盘数据)，两者都为None时清空。
+        字符串键按"{class_name}_{identifier}"前缀匹配。
+        :return: 删除的内存条目数
+        """
+        with self._lock:
+            removed = [key for key in self._items if self._match(key, class_name, identifier)]
+            for key in removed:
+                self._remove(key)
+            if self.persist_dir is not None:
+                for path, key in self._disk_entries():
+                    if self._match(key, class_name, identifier):
+                        os.remove(path)
+        return len(removed)
+
+    @staticmethod
+    def _match(key, class_name, identifier):
+        if class_name is None and identifier is None:
+            return True
+        if isinstance(key, tuple):
+            return ((class_name is None or key[0] == class_name)
+                    and (identifier is None or key[1] == identifier))
+        prefix = f"{class_name}_" if class_name is not None else ""
+        key = str(key)
+        if not key.startswith(prefix):
+            return False
+        return identifier is None or key[len(prefix):] == identifier
+
+    def clear(self):
+        self.invalidate()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.disk_hits = self.evictions = self.expirations = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                'items': len(self._items),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / total if total > 0 else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    # 落盘: {persist_dir}/{yyyymmdd}/{sha1(key)}.json，只读写当天的目录；
+    # 日期目录中有marker_name文件，清理时只删除带这个文件的目录
+    marker_name = '.svr_cache'
+
+    def _day_dir(self):
+        return os.path.join(self.persist_dir, date.today().strftime('%Y%m%d'))
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self._day_dir(), f"{digest}.json")
+
+    def _save(self, key, value):
+        if self.persist_dir is None:
+            return
+        try:
+            day_dir = self._day_dir()
+            if not os.path.isdir(day_dir):
+                self._prune()
+                os.makedirs(day_dir, exist_ok=True)
+                open(os.path.join(day_dir, self.marker_name), 'w').close()
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': list(key) if isinstance(key, tuple) else key, 'value': value}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"svr cache: persist failed: {e}")
+
+    def _load(self, key):
+        if self.persist_dir is None:
+            return None
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        ttl = self.ttl_of(key)
+        if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['value']
+        except Exception:
+            return None
+
+    def _disk_entries(self):
+        day_dir = self._day_dir()
+        if not os.path.isdir(day_dir):
+            return []
+        entries = []
+        for name in os.listdir(day_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(day_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    key = json.load(f)['key']
+            except Exception:
+                continue
+            if isinstance(key, list):
+                key = tuple(tuple(k) if isinstance(k, list) else k for k in key)
+            entries.append((path, key))
+        return entries
+
+    def _prune(self):
+        # 删除之前日期的落盘数据，只删除缓存自己创建的目录
+        if not os.path.isdir(self.persist_dir):
+            return
+        today = os.path.basename(self._day_dir())
+        for name in os.listdir(self.persist_dir):
+            path = os.path.join(self.persist_dir, name)
+            if name != today and name.isdigit() and os.path.isfile(os.path.join(path, self.marker_name)):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class ObjectDataMap:
+    """
+    对象 -> 原始数据。对象可弱引用时以弱引用为键，对象释放后自动删除；
+    否则退化为普通字典。
+    """
+
+    def __init__(self):
+        self._weak = weakref.WeakKeyDictionary()
+        self._strong = {}
+
+    def __setitem__(self, obj, data):
+        try:
+            self._weak[obj] = data
+        except TypeError:
+            self._strong[id(obj)] = (obj, data)
+
+    def __getitem__(self, obj):
+        try:
+            return self._weak[obj]
+        except TypeError:
+            pass
+        except KeyError:
+            pass
+        entry = self._strong.get(id(obj))
+        if entry is None or entry[0] is not obj:
+            raise KeyError(obj)
+        return entry[1]
+
+    def __contains__(self, obj):
+        try:
+            self[obj]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, obj, default=None):
+        try:
+            return self[obj]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        return len(self._weak) + len(self._strong)
+
+    def clear(self):
+        self._weak.clear()
+        self._strong.clear()
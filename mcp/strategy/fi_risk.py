@@ -0,0 +1,326 @@
+"""
+固定收益组合的利率风险汇总。
+
+每个持仓(McpFixedRateBond/McpVanillaSwap)的现金流只取一次，同一条曲线上的
+所有现金流日期只向曲线取一次贴现因子，关键期限的曲线移动按零息利率三角形
+权重直接作用在贴现因子上，所有持仓的所有情景用一次矩阵运算重新定价:
+
+    book = RiskBook()
+    book.add_bond(bond, bond_curve, amount=1000000, name="200006.IB")
+    book.add_swap(swap, swap_curve, amount=1, name="FR007-5Y")
+    result = book.key_rate_risk(["1Y", "2Y", "3Y", "5Y", "7Y", "10Y"])
+    result.krd              # 持仓 x 期限的关键期限久期
+    result.kr_dv01          # 持仓 x 期限，利率上升1bp的价值变化(已乘持仓数量)
+    result.dv01, result.duration, result.pv
+    result.portfolio_krd()  # 按数量加权的组合关键期限久期
+
+关键期限的权重在相邻期限之间线性变化，第一个期限之前和最后一个期限之后
+为1，所有期限的权重之和为1，关键期限久期之和等于有效久期。
+book.check_bonds()用native的KeyRateDuration核对全组合中均匀选取的样本债券，
+容差只允许数值误差，不一致时调用方应该逐个债券调用native。
+"""
+
+import json
+
+import numpy as np
+
+from mcp.utils.date_array import to_datetime64
+from mcp.utils.curve_grid import curve_grid
+from mcp.utils.holiday_index import tenor_dates
+
+default_bump = 0.0001
+days_of_year = 365.0
+
+
+def _json_list(value):
+    """native的腿明细返回JSON字符串，wrapper中的已经解析为列表"""
+    if isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return list(value)
+
+
+def key_rate_weights(times, pillar_times):
+    """
+    times: 现金流期限(年)，pillar_times: 关键期限(年，递增)
+    :return: len(times) x len(pillar_times)的三角形权重，每行之和为1
+    """
+    times = np.asarray(times, dtype=float)
+    pillar_times = np.asarray(pillar_times, dtype=float)
+    if np.any(np.diff(pillar_times) <= 0):
+        raise Exception("Key rate tenors must be increasing")
+    weights = np.zeros((len(times), len(pillar_times)))
+    if len(pillar_times) == 1:
+        weights[:, 0] = 1.0
+        return weights
+    t = np.clip(times, pillar_times[0], pillar_times[-1])
+    right = np.clip(np.searchsorted(pillar_times, t, side="right"), 1, len(pillar_times) - 1)
+    left = right - 1
+    w_right = (t - pillar_times[left]) / (pillar_times[right] - pillar_times[left])
+    rows = np.arange(len(times))
+    weights[rows, left] = 1.0 - w_right
+    weights[rows, right] += w_right
+    return weights
+
+
+class Position:
+
+    def __init__(self, name, kind, instrument, curve, amount):
+        self.name = name
+        self.kind = kind
+        self.instrument = instrument
+        self.curve = curve
+        self.amount = amount
+        # 固定现金流: (日期, 金额)
+        self.fixed_dates = []
+        self.fixed_amounts = []
+        # 浮动现金流 N * (DF(开始) / DF(结束) - 1) * DF(支付): (开始, 结束, 支付, N)
+        self.float_flows = []
+
+
+class CurveGroup:
+    """同一条曲线上的持仓及其现金流日期"""
+
+    def __init__(self, curve, reference_date):
+        self.curve = curve
+        self.reference_date = reference_date
+        self.positions = []
+        self.dates = None
+        self.discount_factors = None
+
+    def date_index(self):
+        dates = []
+        for pos in self.positions:
+            dates.extend(pos.fixed_dates)
+            for start, end, pay, _ in pos.float_flows:
+                dates.extend([start, end, pay])
+        if len(dates) == 0:
+            return np.array([], dtype="datetime64[D]")
+        return np.unique(np.array(dates, dtype="datetime64[D]"))
+
+    def load_discount_factors(self):
+        """每个日期向曲线取一次贴现因子"""
+        self.dates = self.date_index()
+        self.discount_factors = curve_grid(self.curve).discount_factors(self.dates)
+
+    def times(self):
+        return (self.dates - self.reference_date).astype(np.int64) / days_of_year
+
+    def scenario_values(self, scenarios):
+        """
+        scenarios: 日期 x 情景的贴现因子
+        :return: 持仓 x 情景的价值(每单位数量)
+        """
+        values = np.zeros((len(self.positions), scenarios.shape[1]))
+        for row, pos in enumerate(self.positions):
+            if len(pos.fixed_dates) > 0:
+                idx = np.searchsorted(self.dates, np.array(pos.fixed_dates, dtype="datetime64[D]"))
+                values[row] += np.asarray(pos.fixed_amounts, dtype=float) @ scenarios[idx]
+            if len(pos.float_flows) > 0:
+                start, end, pay, notional = zip(*pos.float_flows)
+                s = scenarios[np.searchsorted(self.dates, np.array(start, dtype="datetime64[D]"))]
+                e = scenarios[np.searchsorted(self.dates, np.array(end, dtype="datetime64[D]"))]
+                p = scenarios[np.searchsorted(self.dates, np.array(pay, dtype="datetime64[D]"))]
+                values[row] += np.asarray(notional, dtype=float) @ ((s / e - 1.0) * p)
+        return values
+
+
+class RiskResult:
+    """
+    names: 持仓名称，tenors: 关键期限
+    pv: 持仓价值(已乘数量)
+    krd: 持仓 x 期限的关键期限久期，价值为0的持仓(如平价互换)为nan
+    kr_dv01: 持仓 x 期限，利率上升1bp的价值变化的相反数(已乘数量)
+    dv01/duration: 平行移动的结果
+    """
+
+    def __init__(self, names, tenors, amounts, pv, kr_dv01, dv01):
+        self.names = names
+        self.tenors = list(tenors)
+        self.amounts = amounts
+        self.pv = pv
+        self.kr_dv01 = kr_dv01
+        self.dv01 = dv01
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.krd = np.where(pv[:, None] != 0, kr_dv01 / (pv[:, None] * default_bump), np.nan)
+            self.duration = np.where(pv != 0, dv01 / (pv * default_bump), np.nan)
+
+    def portfolio_krd(self, mask=None):
+        """按数量加权的关键期限久期(与CallObj.call_portfolio_krd相同)，忽略krd为nan的持仓"""
+        rows = np.all(np.isfinite(self.krd), axis=1)
+        if mask is not None:
+            rows &= np.asarray(mask, dtype=bool)
+        total_amount = self.amounts[rows].sum()
+        if total_amount == 0:
+            return np.full(len(self.tenors), np.nan)
+        return (self.krd[rows] * self.amounts[rows, None]).sum(axis=0) / total_amount
+
+    def portfolio_duration(self):
+        """按价值加权的久期"""
+        total_pv = self.pv.sum()
+        return self.dv01.sum() / (total_pv * default_bump) if total_pv != 0 else np.nan
+
+    def portfolio_dv01(self):
+        return self.dv01.sum()
+
+    def portfolio_kr_dv01(self):
+        return self.kr_dv01.sum(axis=0)
+
+    def to_rows(self):
+        """Excel区域: 表头 + 每个持仓一行(名称、价值、DV01、久期、各期限的KRD)"""
+        rows = [["Name", "PV", "DV01", "Duration"] + self.tenors]
+        for i, name in enumerate(self.names):
+            rows.append([name, self.pv[i], self.dv01[i], self.duration[i]] + self.krd[i].tolist())
+        return rows
+
+
+class RiskBook:
+    """
+    reference_date: 计算日，None时取第一条曲线的GetRefDate()
+    """
+
+    def __init__(self, reference_date=None):
+        self.reference_date = None if reference_date is None else to_datetime64([reference_date])[0]
+        self.positions = []
+        # id(curve) -> CurveGroup
+        self.groups = {}
+
+    def _group(self, curve):
+        group = self.groups.get(id(curve))
+        if group is None:
+            if self.reference_date is None:
+                self.reference_date = to_datetime64([curve.GetRefDate()])[0]
+            group = CurveGroup(curve, self.reference_date)
+            self.groups[id(curve)] = group
+        return group
+
+    def _add(self, pos):
+        pos.name = pos.name if pos.name is not None else f"{pos.kind}{len(self.positions) + 1}"
+        self._group(pos.curve).positions.append(pos)
+        self.positions.append(pos)
+        return pos
+
+    def _future(self, dates):
+        return dates > self.reference_date
+
+    def add_bond(self, bond, curve, amount=1.0, name=None):
+        """bond: McpFixedRateBond，curve: 贴现曲线(与bond.Price(curve)相同)"""
+        pos = Position(name, "Bond", bond, curve, float(amount))
+        self._group(curve)
+        dates = to_datetime64(_json_list(bond.PaymentDates()))
+        amounts = np.asarray(_json_list(bond.Payments()), dtype=float)
+        if len(dates) != len(amounts):
+            raise Exception(f"{pos.name}: {len(dates)} payment dates, {len(amounts)} payments")
+        keep = self._future(dates)
+        pos.fixed_dates = dates[keep].tolist()
+        pos.fixed_amounts = amounts[keep].tolist()
+        return self._add(pos)
+
+    def add_swap(self, swap, curve, amount=1.0, name=None, tolerance=1e-6):
+        """
+        swap: McpVanillaSwap，curve: 贴现和预测曲线(单曲线)。
+        固定腿取native的现金流；浮动腿还没有定盘的期间按曲线的远期重新计算，
+        已经定盘的期间取native的现金流。两条腿的方向(以及浮动腿是否交换
+        本金)按native的腿NPV确定，都对不上时抛出异常。
+        """
+        pos = Position(name, "Swap", swap, curve, float(amount))
+        self._group(curve)
+
+        fixed_dates = to_datetime64(_json_list(swap.FixedLegPaymentDates()))
+        fixed_amounts = np.asarray(_json_list(swap.FixedLegPayments()), dtype=float)
+        keep = self._future(fixed_dates)
+        fixed_dates, fixed_amounts = fixed_dates[keep], fixed_amounts[keep]
+
+        pay = to_datetime64(_json_list(swap.FloatingLegPaymentDates()))
+        start = to_datetime64(_json_list(swap.FloatingLegAccrStartDates()))
+        end = to_datetime64(_json_list(swap.FloatingLegAccrEndDates()))
+        reset = to_datetime64(_json_list(swap.FloatingLegResetDates()))
+        notionals = np.abs(np.asarray(_json_list(swap.FloatingLegNotionals()), dtype=float))
+        payments = np.asarray(_json_list(swap.FloatingLegPayments()), dtype=float)
+        keep = self._future(pay)
+        projected = keep & (reset > self.reference_date)
+        known = keep & ~projected
+        exchange = [] if len(start) == 0 else [(start[0], -notionals[0]), (end[-1], notionals[-1])]
+        exchange = [(d, n) for d, n in exchange if d > self.reference_date]
+
+        def discount(dates):
+            return curve_grid(curve).discount_factors(np.asarray(dates, dtype="datetime64[D]"))
+
+        fixed_pv = fixed_amounts @ discount(fixed_dates)
+        float_pv = (notionals[projected] * (discount(start[projected]) / discount(end[projected]) - 1.0)) \
+            @ discount(pay[projected]) + payments[known] @ discount(pay[known])
+        exchange_pv = sum(n * discount([d])[0] for d, n in exchange)
+
+        def match(value, native):
+            return abs(value - native) <= tolerance * max(1.0, abs(native), notionals.max(initial=0.0))
+
+        native_fixed, native_float = swap.FixedLegNPV(), swap.FloatingLegNPV()
+        fixed_sign = next((s for s in (1.0, -1.0) if match(s * fixed_pv, native_fixed)), None)
+        float_sign, with_exchange = next(((s, x) for x in (False, True) for s in (1.0, -1.0)
+                                          if match(s * (float_pv + (exchange_pv if x else 0.0)), native_float)),
+                                         (None, None))
+        if fixed_sign is None or float_sign is None:
+            raise Exception(f"{pos.name}: cash flows do not reproduce native leg NPVs "
+                            f"({fixed_pv}/{native_fixed}, {float_pv}/{native_float}), curve may not be the swap's curve")
+        # 腿的NPV带方向，互换的NPV是两条腿之和
+        pos.fixed_dates = fixed_dates.tolist() + pay[known].tolist()
+        pos.fixed_amounts = (fixed_sign * fixed_amounts).tolist() + (float_sign * payments[known]).tolist()
+        if with_exchange:
+            pos.fixed_dates += [d for d, _ in exchange]
+            pos.fixed_amounts += [float_sign * n for _, n in exchange]
+        pos.float_flows = list(zip(start[projected].tolist(), end[projected].tolist(), pay[projected].tolist(),
+                                   (float_sign * notionals[projected]).tolist()))
+        return self._add(pos)
+
+    def key_rate_risk(self, tenors, bump=default_bump):
+        """
+        每条曲线: 一次取全部贴现因子，情景 = 基准 + 每个关键期限上下移动 + 平行上下移动，
+        中心差分。
+        :return: RiskResult，持仓顺序与加入的顺序相同
+        """
+        if len(self.positions) == 0:
+            raise Exception("Empty risk book")
+        n_tenors = len(tenors)
+        pillar_times = (tenor_dates(self.reference_date, tenors) - self.reference_date).astype(np.int64) / days_of_year
+        pv = np.zeros(len(self.positions))
+        kr_dv01 = np.zeros((len(self.positions), n_tenors))
+        dv01 = np.zeros(len(self.positions))
+        row_of = {id(pos): i for i, pos in enumerate(self.positions)}
+        for group in self.groups.values():
+            if len(group.positions) == 0:
+                continue
+            group.load_discount_factors()
+            times = group.times()
+            # 日期 x (期限 + 平行)
+            shifts = np.hstack([key_rate_weights(times, pillar_times), np.ones((len(times), 1))]) * times[:, None]
+            base = group.discount_factors[:, None]
+            scenarios = np.hstack([base, base * np.exp(-bump * shifts), base * np.exp(bump * shifts)])
+            values = group.scenario_values(scenarios)
+            up, down = values[:, 1:n_tenors + 2], values[:, n_tenors + 2:]
+            # 利率上升1bp的价值损失
+            sensitivity = (down - up) / 2.0 * (default_bump / bump)
+            rows = [row_of[id(pos)] for pos in group.positions]
+            amounts = np.array([pos.amount for pos in group.positions])
+            pv[rows] = values[:, 0] * amounts
+            kr_dv01[rows] = sensitivity[:, :n_tenors] * amounts[:, None]
+            dv01[rows] = sensitivity[:, n_tenors] * amounts
+        return RiskResult([pos.name for pos in self.positions], tenors,
+                          np.array([pos.amount for pos in self.positions]), pv, kr_dv01, dv01)
+
+    def check_bonds(self, result, sample_size=5, rtol=1e-6, atol=1e-8):
+        """
+        用native的KeyRateDuration核对sample_size个债券的KRD，样本在全部债券中均匀选取(包括首尾)。
+        容差只允许数值误差，native的移动方式与这里的三角形权重不同时不会通过。
+        :return: 是否一致
+        """
+        bonds = [i for i, pos in enumerate(self.positions) if pos.kind == "Bond"]
+        if len(bonds) == 0:
+            return True
+        picks = np.unique(np.linspace(0, len(bonds) - 1, min(sample_size, len(bonds))).round().astype(int))
+        for k in picks:
+            i = bonds[k]
+            pos = self.positions[i]
+            native = np.asarray(pos.instrument.KeyRateDuration(pos.curve, result.tenors), dtype=float)
+            if native.shape != result.krd[i].shape or not np.allclose(result.krd[i], native, rtol=rtol, atol=atol):
+                print(f"RiskBook check {pos.name} failed: {result.krd[i].tolist()} != {native.tolist()}")
+                return False
+        return True
@@ -1,6 +1,7 @@
 from mcp.utils.enums import ExchangePrincipal, ResidualType, AmortisationType, DateAdjusterRule
 from mcp.mcp import MVanillaSwap, MFixedRateBond, MCalendar
 from mcp.tool.tools_main import McpVanillaSwap, McpFixedRateBond
+from mcp.strategy.fi_risk import RiskBook
 from mcp.xscript.utils import SttUtils
 
 
@@ -90,10 +91,15 @@ class CallObj:
             result = result + single_val[0]
         return result
 
-    def call_portfolio_krd(self, obj: FIPortfolioDef, yld_list, curve, tenors):
+    def call_portfolio_krd(self, obj: FIPortfolioDef, yld_list, curve, tenors, batch=False):
+        """
+        batch: True时先尝试call_portfolio_krd_batch(样本与native核对一致时使用)，默认逐个债券调用native
+        """
+        if batch:
+            weighted_average_krd = self.call_portfolio_krd_batch(obj, curve, tenors)
+            if weighted_average_krd is not None:
+                return [weighted_average_krd]
         result = []
-        sum = None
-        total_sum = 0
         total_amount = 0
         # 初始化一个空的汇总KRD字典
         aggregated_krd = {}
@@ -109,16 +115,28 @@ class CallObj:
                 aggregated_krd[i] += krd_value * amount
                 i = i + 1
         weighted_average_krd = [value / total_amount for timepoint, value in aggregated_krd.items()]
-            # if sum is None:
-            #     sum = single_val[0]
-            # else:
-            #     for x, y in zip(sum, single_val[0]):
-            #         total_sum = total_sum + x * amount + y * amount
-            #     sum = [x + y for x, y in zip(sum, single_val[0])]
-        # result.append(sum)
         result.append(weighted_average_krd)
         return result
 
+    def call_portfolio_krd_batch(self, obj: FIPortfolioDef, curve, tenors):
+        """
+        全部是债券时用RiskBook一次计算所有债券的KRD，样本债券与native的
+        KeyRateDuration不一致时返回None，由调用方逐个债券计算
+        """
+        if any(assetid.count('-') > 0 for assetid in obj.assetid_list):
+            return None
+        try:
+            book = RiskBook()
+            for assetid, amount in zip(obj.assetid_list, obj.amount_list):
+                book.add_bond(self.create_bond(cache.get_contract_def(assetid)), curve, amount, assetid)
+            risk = book.key_rate_risk(tenors)
+            if not book.check_bonds(risk):
+                return None
+        except Exception as e:
+            print(f'call_portfolio_krd_batch except: {e}')
+            return None
+        return risk.portfolio_krd().tolist()
+
     def call(self, args):
         assetid = args[0]
         params = cache.get_contract_def(assetid)
@@ -156,10 +174,13 @@ class CallObj:
                     break
         return result
 
-    def call_bond(self, params, methods, m_param):
+    def create_bond(self, params):
         args = {}
         args.update(params)
-        frb: MFixedRateBond = McpFixedRateBond(args)
+        return McpFixedRateBond(args)
+
+    def call_bond(self, params, methods, m_param):
+        frb: MFixedRateBond = self.create_bond(params)
         method = methods
         if method == 'KRDS':
             return self.call_bond_krds(frb, m_param)
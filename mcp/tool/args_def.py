@@ -1,10 +1,13 @@
+import hashlib
 import json
+import os
 import traceback
 
 import mcp.tool.tool_utils as utils
 import mcp.wrapper
 from mcp.utils.enums import *
 from mcp.utils.excel_utils import mcp_kv_wrapper, pf_nd_arrary_or_list, parse_dict_list
+from mcp.utils.lazy_import import LazyDict
 from mcp.forward.custom import general_fwd_register
 from mcp.utils.mcp_utils import as_array
 from mcp.wrapper import McpCalendar, create_object_instance, McpRounder, to_mcp_args, McpAdjustmentTable, \
@@ -52,6 +55,9 @@ class ItemDef:
         self.kv_const_dict = {}
 
         self.field_type_dict = None
+        # init_kv_list编译后的KvSchema列表，第一次创建对象时生成
+        self.kv_schemas = None
+        self.instance_target = None
 
     def find_match_kv_list(self, count, vals):
         for kv in self.init_kv_list:
@@ -148,18 +154,29 @@ class ItemDef:
             fmt = d["fmt"]
         return has_fmt, fmt
 
-    def create_instance(self, args_list, fmt, data_fields):
-        kvs_list = self.init_kv_list
+    def get_kv_schemas(self):
+        if self.kv_schemas is None:
+            self.kv_schemas = mcp_kv_wrapper.compile_kv_list(self.init_kv_list)
+        return self.kv_schemas
+
+    def get_instance_target(self):
+        if self.instance_target is None:
+            self.instance_target = self.mcp_or_wrapper()
+        return self.instance_target
+
+    def create_instance(self, args_list, fmt, data_fields, args_dict=None):
+        kvs_list = self.get_kv_schemas()
         # kvs = kvs_list[0]
         # other_kvs = kvs_list[1:]
         # if data_fields is None:
         #     data_fields = self.init_data["data_fields"]
         # result, lack_keys = mcp_kv_wrapper.valid_parse_kv_list(self.key, args_list, fmt,
         #                                                        data_fields, kvs, other_kvs)
-        if data_fields is None:
-            data_fields = self.init_data["data_fields"]
-        result, lack_keys = mcp_kv_wrapper.process_kv_list(args_list, fmt,
-                                                           data_fields, kvs_list)
+        if args_dict is None:
+            if data_fields is None:
+                data_fields = self.init_data["data_fields"]
+            args_dict = mcp_kv_wrapper.args_parser.parse_all(args_list, fmt, data_fields, True)
+        result, lack_keys = mcp_kv_wrapper.parse_args_dict(args_dict, kvs_list)
         if len(lack_keys) > 0:
             if len(self.init_func) > 0:
                 for f in self.init_func:
@@ -171,7 +188,7 @@ class ItemDef:
                         break
             if len(lack_keys) > 0:
                 raise Exception("Missing fields: " + str(lack_keys))
-        is_wrapper, name, pkg = self.mcp_or_wrapper()
+        is_wrapper, name, pkg = self.get_instance_target()
         if tool_def.is_debug:
             print("create_instance:", self.key, pkg, name, result["vals"])
         # print("create_instance:", self.key, pkg, name, result["vals"])
@@ -191,28 +208,94 @@ class ItemDef:
                     msg = str(e)
                     print(f"create_instance Exception: {self.key}, {msg}")
                     print(f"{self.key}, vals: {vals}")
-                    print(f"{self.key}, args: {args_list}")
+                    print(f"{self.key}, args: {args_list if args_list is not None else args_dict}")
                     traceback.print_exc()
                     return msg
 
 
+def item_key(item_class):
+    return item_class.__name__.replace("DefMcp", "Mcp")
+
+
 class ArgsDef:
 
     def __init__(self):
-        self.item_dict = {}
+        # key -> ItemDef，register_item注册的定义在第一次使用时才创建
+        self.item_dict = LazyDict()
         self.is_debug = False
         self.key_word_dict = {}
         self.raise_except = False
+        # key -> ItemDef，get_item的模糊匹配结果
+        self.item_cache = {}
 
     def add_item(self, item):
         # key = str(item.key).lower()
         self.item_dict[item.key] = item
+        self.item_cache = {}
+
+    def register_item(self, item_class):
+        self.item_dict.register(item_key(item_class), item_class)
+        self.item_cache = {}
+
+    def register_items(self, item_classes):
+        for item_class in item_classes:
+            self.register_item(item_class)
 
     def generate_key_word_dict(self):
         self.key_word_dict = utils.generate_key_word_dict(self.item_dict)
+        self.item_cache = {}
         # print("ArgsDef key_word_dict:", self.key_word_dict)
 
+    def snapshot_signature(self):
+        # 定义代码或注册的键变化后快照失效
+        h = hashlib.sha1()
+        for path in (__file__, utils.__file__):
+            with open(path, "rb") as f:
+                h.update(f.read())
+        h.update(json.dumps(list(self.item_dict)).encode("utf-8"))
+        return h.hexdigest()
+
+    def save_snapshot(self, path):
+        """
+        保存启动时需要的索引(键、关键字匹配表)。ItemDef本身含有native对象
+        和函数，仍在第一次使用时创建。
+        """
+        snapshot = {
+            "signature": self.snapshot_signature(),
+            "keys": list(self.item_dict),
+            "key_word_dict": self.key_word_dict,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path):
+        """快照存在且与当前定义一致时直接使用，返回是否成功"""
+        if path is None or not os.path.isfile(path):
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot["signature"] != self.snapshot_signature() or snapshot["keys"] != list(self.item_dict):
+                return False
+            self.key_word_dict = {kw: [tuple(item) for item in items]
+                                  for kw, items in snapshot["key_word_dict"].items()}
+        except Exception as e:
+            print(f"args_def: load snapshot failed: {e}")
+            return False
+        self.item_cache = {}
+        return True
+
     def get_item(self, key) -> ItemDef:
+        if key in self.item_cache:
+            return self.item_cache[key]
+        item = self.find_item(key)
+        if item is not None:
+            self.item_cache[key] = item
+        return item
+
+    def find_item(self, key) -> ItemDef:
         result = utils.find_key_word(key, self.key_word_dict, self.item_dict.keys())
         match_len = len(result)
         if match_len >= 1:
@@ -317,6 +400,11 @@ class ArgsDef:
         item_def = self.get_item(key)
         if item_def is not None and item_def.custom_instance_func_raw is not None:
             return item_def.custom_instance_func_raw(*args, key=key)
+        if (item_def is not None and len(args) == 1 and isinstance(args[0], dict)
+                and str(fmt).upper().split("|")[0] == "VP"):
+            # 单个dict参数: 与parse_all结果相同，直接生成args_dict
+            args_dict = {str(k): v for k, v in args[0].items()}
+            return item_def.create_instance(None, fmt, data_fields, args_dict)
         args_list = args
         temp_list = pf_nd_arrary_or_list(args_list)
         args_list = [parse_dict_list(item) for item in temp_list]
@@ -454,10 +542,10 @@ class DefMcpYieldCurve(ItemDef):
         })
 
         def ZeroRates(obj, dates):
-            return [obj.ZeroRate(date) for date in dates]
+            return obj.ZeroRateArray(dates).tolist()
 
         def DiscountFactors(obj, dates):
-            return [obj.DiscountFactor(date) for date in dates]
+            return obj.DiscountFactorArray(dates).tolist()
 
         self.add_method_def({
             "method": "ZeroRates",
@@ -880,10 +968,10 @@ class DefMcpSwapCurve(ItemDef):
             ]
         })
         def ZeroRates(obj, dates):
-            return [obj.ZeroRate(date) for date in dates]
+            return obj.ZeroRateArray(dates).tolist()
 
         def DiscountFactors(obj, dates):
-            return [obj.DiscountFactor(date) for date in dates]
+            return obj.DiscountFactorArray(dates).tolist()
 
         self.add_method_def({
             "method": "ZeroRates",
@@ -5140,54 +5228,59 @@ class DefMcpHistVols(ItemDef):
             ]
         ]
 tool_def = ArgsDef()
-tool_def.add_item(DefMcpYieldCurve())
-tool_def.add_item(DefMcpYieldCurve2())
-tool_def.add_item(DefMcpSwapCurve())
-tool_def.add_item(DefMcpVolSurface())
-tool_def.add_item(DefMcpMktVolSurface())
-tool_def.add_item(DefMcpMktVolSurface2())
-tool_def.add_item(DefMcpFXVolSurface())
-tool_def.add_item(DefMcpFXVolSurface2())
-tool_def.add_item(DefMcpVanillaOption())
-tool_def.add_item(DefMcpVanillaStrategy())
-tool_def.add_item(DefMcpFXForward())
-tool_def.add_item(DefMcpFXForward2())
-tool_def.add_item(DefMcpAsianOption())
-tool_def.add_item(DefMcpFixedRateBond())
-tool_def.add_item(DefMcpVanillaSwap())
-tool_def.add_item(DefMcpSchedule())
-tool_def.add_item(DefMcpCustomForwardDefine())
-tool_def.add_item(DefMcpCustomForward())
-tool_def.add_item(DefMcpSwaptionCube())
-tool_def.add_item(DefMcpBlack76Swaption())
-tool_def.add_item(DefMcpCapVolStripping())
-tool_def.add_item(DefMcpCapFloor())
-tool_def.add_item(DefMcpCalendar())
-tool_def.add_item(DefMcpParametricCurve())
-tool_def.add_item(DefMcpBondCurve())
-tool_def.add_item(DefMcpRounder())
-tool_def.add_item(DefMcpEuropeanDigital())
-tool_def.add_item(DefMcpVanillaBarriers())
-tool_def.add_item(DefMcpFXForwardPointsCurve())
-tool_def.add_item(DefMcpFXForwardPointsCurve2())
-tool_def.add_item(DefMcpOvernightRateCurveData())
-tool_def.add_item(DefMcpBillCurveData())
-tool_def.add_item(DefMcpBillFutureCurveData())
-tool_def.add_item(DefMcpVanillaSwapCurveData())
-tool_def.add_item(DefMcpFixedRateBondCurveData())
-tool_def.add_item(DefMcpHestonModel())
-tool_def.add_item(DefMcpOptionData())
-tool_def.add_item(DefMcpVolSurface2())
-tool_def.add_item(DefMcpForwardCurve2())
-tool_def.add_item(DefMcpForwardCurve())
-tool_def.add_item(DefMcpLocalVol())
-tool_def.add_item(DefMcpCurrencySwapLeg())
-tool_def.add_item(DefMcpXCurrencySwap())
-tool_def.add_item(DefMcpSingleCumulative())
-tool_def.add_item(DefMcpDoubleCumulative())
-tool_def.add_item(DefMcpEFXForward())
-tool_def.add_item(DefMcpEFXSwap())
-tool_def.add_item(DefMcpHistVols())
-tool_def.generate_key_word_dict()
+tool_def.register_items([
+    DefMcpYieldCurve,
+    DefMcpYieldCurve2,
+    DefMcpSwapCurve,
+    DefMcpVolSurface,
+    DefMcpMktVolSurface,
+    DefMcpMktVolSurface2,
+    DefMcpFXVolSurface,
+    DefMcpFXVolSurface2,
+    DefMcpVanillaOption,
+    DefMcpVanillaStrategy,
+    DefMcpFXForward,
+    DefMcpFXForward2,
+    DefMcpAsianOption,
+    DefMcpFixedRateBond,
+    DefMcpVanillaSwap,
+    DefMcpSchedule,
+    DefMcpCustomForwardDefine,
+    DefMcpCustomForward,
+    DefMcpSwaptionCube,
+    DefMcpBlack76Swaption,
+    DefMcpCapVolStripping,
+    DefMcpCapFloor,
+    DefMcpCalendar,
+    DefMcpParametricCurve,
+    DefMcpBondCurve,
+    DefMcpRounder,
+    DefMcpEuropeanDigital,
+    DefMcpVanillaBarriers,
+    DefMcpFXForwardPointsCurve,
+    DefMcpFXForwardPointsCurve2,
+    DefMcpOvernightRateCurveData,
+    DefMcpBillCurveData,
+    DefMcpBillFutureCurveData,
+    DefMcpVanillaSwapCurveData,
+    DefMcpFixedRateBondCurveData,
+    DefMcpHestonModel,
+    DefMcpOptionData,
+    DefMcpVolSurface2,
+    DefMcpForwardCurve2,
+    DefMcpForwardCurve,
+    DefMcpLocalVol,
+    DefMcpCurrencySwapLeg,
+    DefMcpXCurrencySwap,
+    DefMcpSingleCumulative,
+    DefMcpDoubleCumulative,
+    DefMcpEFXForward,
+    DefMcpEFXSwap,
+    DefMcpHistVols,
+])
+# 可选的索引快照，MCP_ARGS_DEF_SNAPSHOT指定路径，与当前定义不一致时重新生成
+snapshot_path = os.environ.get("MCP_ARGS_DEF_SNAPSHOT")
+if not tool_def.load_snapshot(snapshot_path):
+    tool_def.generate_key_word_dict()
 
 mcp_wrapper_utils.tool_def = tool_def
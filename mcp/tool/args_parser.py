@@ -1,4 +1,4 @@
-from pandas import DataFrame
+from mcp.utils.lazy_import import is_instance, LazyDict
 
 from mcp.utils.enums import *
 from mcp.utils.excel_utils import mcp_kv_wrapper, pf_nd_arrary_or_list
@@ -45,13 +45,17 @@ mcp_args_type = McpArgsType()
 class McpArgsDef:
 
     def __init__(self):
-        self.args_def_dict = {}
+        self.args_def_dict = LazyDict()
 
     def add_def(self, method, kvs_list):
         self.args_def_dict[method] = {
             "kvs_list": kvs_list,
         }
 
+    def register_def(self, method, kvs_list_func):
+        """kvs_list_func()在第一次使用method时才调用"""
+        self.args_def_dict.register(method, lambda: {"kvs_list": kvs_list_func()})
+
     def get_def(self, method):
         if method in self.args_def_dict:
             return self.args_def_dict[method]
@@ -69,7 +73,7 @@ class McpArgsDef:
             for key in args:
                 result.append([key, args[key]])
             return result
-        elif isinstance(args, DataFrame):
+        elif is_instance(args, "pandas", "DataFrame"):
             result = []
             cols = args.columns.tolist()
             for col in cols:
@@ -108,16 +112,12 @@ class McpArgsDefImpl(McpArgsDef):
 
     def __init__(self):
         super().__init__()
-        self.McpCalendar()
-        self.McpYieldCurve()
-        self.McpVanillaOption()
-        self.McpAsianOption()
-        self.McpFixedRateBond()
-        self.McpVanillaSwap()
-        self.McpSchedule()
+        for method in ["McpCalendar", "McpYieldCurve", "McpVanillaOption", "McpAsianOption", "McpFixedRateBond",
+                       "McpVanillaSwap", "McpSchedule"]:
+            self.register_def(method, getattr(self, method))
 
     def McpCalendar(self):
-        self.add_def("McpCalendar", [
+        return [
             [
                 ("Ccys", "objectlist"),
                 ("Path", "str"),
@@ -128,10 +128,10 @@ class McpArgsDefImpl(McpArgsDef):
                 ("Dates", "objectlist"),
                 ("IsFile", "bool", False),
             ],
-        ])
+        ]
 
     def McpVanillaOption(self):
-        self.add_def("McpVanillaOption", [
+        return [
             [
                 ("CallPut", "const"),
                 ("ReferenceDate", "str"),
@@ -187,10 +187,10 @@ class McpArgsDefImpl(McpArgsDef):
                 ("VolSurface", "object"),
                 ("NumSimulation", "int", 1000),
             ]
-        ])
+        ]
 
     def McpAsianOption(self):
-        self.add_def("McpAsianOption", [
+        return [
             [
                 ("CallPut", "const"),
                 ("ReferenceDate", "str"),
@@ -243,10 +243,10 @@ class McpArgsDefImpl(McpArgsDef):
                 ("TimeStep", "int", 10),
                 ("NumSimulation", "int", 10000),
             ],
-        ])
+        ]
 
     def McpYieldCurve(self):
-        self.add_def("McpYieldCurve", [
+        return [
             [
                 ("ReferenceDate", "str"),
                 ("Dates", "objectlist"),
@@ -264,11 +264,11 @@ class McpArgsDefImpl(McpArgsDef):
                 ("Method", "const", InterpolationMethod.LINEARINTERPOLATION, "LINEARINTERPOLATION"),
                 ("Calendar", "object", McpCalendar("", "", "")),
             ]
-        ])
+        ]
 
     def McpFixedRateBond(self):
         rounder = McpRounder(0, 8)
-        self.add_def("McpFixedRateBond", [
+        return [
             [("Calendar", "object", McpCalendar("", "", "")),
              ("ValuationDate", "str"),
              ("MaturityDate", "str"),
@@ -294,10 +294,10 @@ class McpArgsDefImpl(McpArgsDef):
              ("ApplyDayCount", "bool", False),
              ("DateAdjuster", "const", DateAdjusterRule.Actual, "Actual"),
              ]
-        ])
+        ]
 
     def McpVanillaSwap(self):
-        self.add_def("McpVanillaSwap", [
+        return [
             [
                 ("ReferenceDate", "str"),
                 ("StartDate", "str"),
@@ -440,10 +440,10 @@ class McpArgsDefImpl(McpArgsDef):
                 ("FloatPayType", "const", PaymentType.InArrears, "InArrears")
             ],
 
-        ])
+        ]
 
     def McpSchedule(self):
-        self.add_def("McpSchedule", [
+        return [
             [
                 ("StartDate", "str"),
                 ("EndDate", "str"),
@@ -459,11 +459,11 @@ class McpArgsDefImpl(McpArgsDef):
                 ("StubDate", "str"),
                 ("bothStub", "bool", False, False),
             ],
-        ])
+        ]
 
     def McpTest(self):
-        self.add_def("McpTest", [
-        ])
+        return [
+        ]
 
 
 mcp_args_def = McpArgsDefImpl()
@@ -4,7 +4,7 @@ import mcp.forward.compound
 import mcp.forward.custom
 import mcp.wrapper
 import numpy as np
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 
 from mcp.utils.excel_utils import pf_nd_arrary_or_list
 import mcp.tool.args_parser as args_parser
@@ -12,6 +12,8 @@ import mcp.tool.args_def as args_def
 
 from mcp.tool.tools_main import *
 
+pd = lazy_module("pandas")
+
 
 # for key in args_def.tool_def.item_dict:
 #     item_def = args_def.tool_def.get_item(key)
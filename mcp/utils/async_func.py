@@ -1,12 +1,11 @@
 import datetime
-import logging
 import threading
 import time
-import traceback
 
 from pyxll import RTD
 
 from mcp.utils.async_process import process_pool
+from mcp.utils.job_executor import JobExecutor, async_execute_enabled
 
 
 class AsyncProcessRtd(RTD):
@@ -16,6 +15,7 @@ class AsyncProcessRtd(RTD):
         self.mcp_object = mcp_object
         self.method = method
         self.args = args;
+        self.job = None
 
     def connect(self):
         print("AsyncProcessRtd connect:", self.method)
@@ -23,7 +23,12 @@ class AsyncProcessRtd(RTD):
             self.value = process_pool.sync_execute(self.mcp_object, self.method, self.args)
         else:
             self.value = ""
-            process_pool.execute_job(self.mcp_object, self.method, self.args, self.callback)
+            self.job = process_pool.execute_job(self.mcp_object, self.method, self.args, self.callback)
+
+    def disconnect(self):
+        if self.job is not None:
+            process_pool.cancel(self.job, self.callback)
+            self.job = None
 
     def callback(self, data):
         self.value = data
@@ -35,6 +40,8 @@ class AsyncFuncRtd(RTD):
         print("AsyncFuncRtd __init__", self)
         # self.func = f
         self.id = ""
+        self.key = None
+        self.job = None
         self.is_connected = False
 
     # def execute(self, data=None):
@@ -52,6 +59,10 @@ class AsyncFuncRtd(RTD):
     def disconnect(self):
         # print("AsyncFuncRtd disconnect", self)
         self.is_connected = False
+        async_func_manager.remove_rtd(self)
+
+    def callback(self, val):
+        async_func_manager.set_value((val, self.id))
 
 
 class ThreadFuncRtd(RTD):
@@ -104,196 +115,84 @@ class ThreadFuncRtd(RTD):
 #     def execute(self, data=None):
 #         pass
 
-class MultiTimer(threading.Thread):
+class AsyncFuncManager:
     """
-    timer类
+    RTD函数的执行。is_sync_execute时在Excel计算线程中直接执行，否则交给
+    JobExecutor的工作线程，key相同的请求合并执行，RTD断开时取消还没开始的任务。
     """
 
-    def __init__(self, id):
-        self._thread = threading.Thread(target=self.run)
-        self.log = logging.getLogger(__name__)
-        self.id = id
-        self.is_running = False
-        self.check_interval = 0.1
-        self.execute_delay = 0.01
-        self.item_dict = {}
-        self.item_key_seed = 0
-        self.is_execute_delay = True
-
-    def start(self):
-        self.is_running = True
-        self._thread.start()
-
-    def _item_id(self):
-        self.item_key_seed += 1
-        return str(self.item_key_seed)
-
-    def add_delay_execute(self, delay_seconds, f, data=None):
-        """
-        延迟delay_seconds秒执行
-        :param delay_seconds:
-        :param f:
-        :param data:
-        :return:
-        """
-        dt = datetime.datetime.now() + datetime.timedelta(seconds=delay_seconds)
-        return self.add_execute(dt, f, data)
-
-    def add_delay_execute_ms(self, ms, f, data=None):
-        """
-        延迟ms毫秒执行
-        :param ms:
-        :param f:
-        :param data:
-        :return:
-        """
-        dt = datetime.datetime.now() + datetime.timedelta(microseconds=ms * 1000)
-        return self.add_execute(dt, f, data)
-
-    def add_interval_execute(self, interval, f, data=None):
-        """
-        周期性执行
-        :param interval:
-        :param f:
-        :param data:
-        :return:
-        """
-        item_id = self._item_id()
-        self.item_dict[item_id] = {
-            "dt": datetime.datetime.now(),
-            "interval": interval / 1000.0,
-            "f": f,
-            "data": data
-        }
-        return item_id
-
-    def add_execute(self, dt, f, data=None):
-        """
-        指定时间执行
-        :param dt:
-        :param f:
-        :param data:
-        :return:
-        """
-        item_id = self._item_id()
-        self.item_dict[item_id] = {
-            "dt": dt,
-            "interval": 0,
-            "f": f,
-            "data": data
-        }
-        # print("add_execute:", item_id, dt, str(f))
-        return item_id
-
-    def cancel_execute(self, item_id):
-        if item_id in self.item_dict:
-            del self.item_dict[item_id]
-            return True
-        else:
-            return False
-
-    def run(self):
-        self.log.info("MultiTimer initialize: %s", self.id)
-        self.initialize()
-        self.log.info("MultiTimer run: %s", self.id)
-        while self.is_running:
-            try:
-                time.sleep(self.check_interval)
-                # print("MultiTimer execute:", self.id)
-                keys = list(self.item_dict.keys())
-                cur_time = datetime.datetime.now()
-                for key in keys:
-                    if key not in self.item_dict:
-                        continue
-                    item = self.item_dict[key]
-                    if item["interval"] > 0:
-                        # 周期性执行
-                        td = cur_time - item["dt"]
-                        if td.total_seconds() > item["interval"]:
-                            f = item["f"]
-                            f(item["data"])
-                            item["dt"] = datetime.datetime.now()
-                            if self.is_execute_delay:
-                                time.sleep(self.execute_delay)
-                    else:
-                        # 指定时间执行
-                        if item["dt"] <= cur_time:
-                            # print("execute:", str(item))
-                            del self.item_dict[key]
-                            f = item["f"]
-                            f(item["data"])
-                            if self.is_execute_delay:
-                                time.sleep(self.execute_delay)
-            except:
-                traceback.print_exc()
-        self.log.info("MultiTimer dispose: %s", self.id)
-        self.dispose()
-        self.log.info("MultiTimer exit: %s", self.id)
-
-    def initialize(self):
-        pass
-
-    def dispose(self):
-        pass
-
-
-class AsyncFuncManager:
-
-    def __init__(self, thread_count, is_sync_execute=False):
-        self.thread_group = []
+    def __init__(self, thread_count, is_sync_execute=False, dispatch="least_loaded"):
         self.func_dict = {}
         self.rtd_dict = {}
-        self.count = 1
+        self.thread_count = thread_count
+        self.dispatch = dispatch
         self.is_sync_execute = is_sync_execute
-        if not is_sync_execute:
-            for i in range(thread_count):
-                t = MultiTimer("AFM.thread" + str(i + 1))
-                t.is_execute_delay = False
-                self.thread_group.append(t)
-                t.start()
+        self.executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, is_sync_execute=None, thread_count=None, dispatch=None):
+        if is_sync_execute is not None:
+            self.is_sync_execute = is_sync_execute
+        if thread_count is not None:
+            self.thread_count = thread_count
+        if dispatch is not None:
+            self.dispatch = dispatch
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def get_executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = JobExecutor("thread", self.thread_count, self.dispatch)
+            return self.executor
 
     def add_rtd(self, rtd):
-        # if self.is_sync_execute:
-        #     return
-        # self.count += 1
-        # index = self.count % len(self.thread_group)
         print("add_rtd:", rtd.id)
         id = rtd.id
+        f = self.func_dict.pop(id, None)
+        if f is None:
+            return
         if self.is_sync_execute:
-            if id in self.func_dict:
-                f = self.func_dict[id]
-                del self.func_dict[id]
-                val = f()
-                data = (val, id)
-                self.set_value(data)
-        else:
-            self.thread_group[0].add_delay_execute_ms(0, self.execute, rtd.id)
-
-    def execute(self, id):
-        print("execute:", id)
-        if id in self.func_dict:
-            f = self.func_dict[id]
-            del self.func_dict[id]
-            time.sleep(0.05)
             val = f()
-            self.thread_group[1].add_delay_execute_ms(0, self.set_value, (val, id))
-            time.sleep(0.05)
-            # self.set_value((val, id))
+            data = (val, id)
+            self.set_value(data)
+        else:
+            rtd.job = self.get_executor().submit(f, rtd.callback, key=rtd.key)
+
+    def remove_rtd(self, rtd):
+        self.func_dict.pop(rtd.id, None)
+        self.rtd_dict.pop(rtd.id, None)
+        if rtd.job is not None and self.executor is not None:
+            self.executor.cancel(rtd.job, rtd.callback)
+        rtd.job = None
 
     def set_value(self, data):
         val, id = data
         print("set_value:", id)
-        if id in self.rtd_dict:
-            rtd = self.rtd_dict[id]
-            del self.rtd_dict[id]
+        rtd = self.rtd_dict.pop(id, None)
+        if rtd is not None:
+            rtd.job = None
             rtd.value = val
 
-    def create(self, func):
+    def create(self, func, key=None):
+        """
+        :param func: 无参数函数，返回值写入RTD
+        :param key: 相同key的请求在执行中时合并，None表示不合并
+        """
         rtd = AsyncFuncRtd()
         rtd.id = str(rtd)
+        rtd.key = key
         self.func_dict[rtd.id] = func
         self.rtd_dict[rtd.id] = rtd
         return rtd
 
+    def stats(self):
+        if self.executor is None:
+            return {"is_sync_execute": self.is_sync_execute}
+        return dict(self.executor.stats(), is_sync_execute=self.is_sync_execute)
+
 
-async_func_manager = AsyncFuncManager(2, True)
+# MCP_ASYNC_EXECUTE=1时在后台线程执行
+async_func_manager = AsyncFuncManager(2, not async_execute_enabled())
@@ -1,10 +1,12 @@
-import threading
+import json
 import traceback
 from datetime import datetime
-from multiprocessing import Process, Pool, Pipe
 
 from os import path
 
+from mcp.utils import object_graph
+from mcp.utils.job_executor import JobExecutor, async_execute_enabled
+from mcp.utils.warm_workers import warm_pool
 from mcp.wrapper import create_object, trace_args
 
 
@@ -57,7 +59,7 @@ class AsyncProcessLog():
 process_log = AsyncProcessLog()
 
 
-def wrapper_process(id, wrapper, method, args, conn):
+def wrapper_process(id, wrapper, method, args):
     try:
         process_log.write_line("%s, %s start" % (id, method))
         print(id, "start", id)
@@ -70,68 +72,62 @@ def wrapper_process(id, wrapper, method, args, conn):
         ms = (t2 - t1).total_seconds()
         print(id, "finish: time=", ms)
         process_log.write_line("%s, %s finish=%s, time=%s" % (id, method, data, ms))
-        conn.send({
-            "id": id,
-            "data": data,
-        })
+        return data
     except:
-        traceback.print_exc(None, process_log.file)
+        traceback.print_exc()
         process_log.write_line("%s, %s except" % (id, method))
-        conn.send({
-            "id": id,
-            "data": method + " Fail: " + str(args),
-        })
+        return method + " Fail: " + str(args)
+
+
+def graph_process(id, data, method, args):
+    """data: object_graph序列化的对象，子进程中缓存已经创建的对象"""
+    try:
+        print(id, "start", id)
+        t1 = datetime.now()
+        mcp_object = object_graph.loads(data)
+        t2 = datetime.now()
+        f = getattr(mcp_object, method)
+        result = f(*args)
+        t3 = datetime.now()
+        print(id, "finish: load=", (t2 - t1).total_seconds(), "time=", (t3 - t2).total_seconds())
+        process_log.write_line("%s, %s finish=%s, time=%s" % (id, method, result, (t3 - t2).total_seconds()))
+        return result
+    except:
+        traceback.print_exc()
+        process_log.write_line("%s, %s except" % (id, method))
+        return method + " Fail: " + str(args)
 
 
 class ProcessPool:
+    """
+    在进程池中执行对象方法。对象用object_graph序列化后发送给子进程，子进程按
+    内容哈希缓存已经创建的对象；不能序列化的对象退回trace_args JSON。
+    相同的(对象, 方法, 参数)在执行中时合并为一个任务。
+    预热工作进程(warm_pool)已经启动时交给它执行，已发布的市场对象不再发送。
+    """
 
     def __init__(self, process_count):
         self.process_count = process_count
-        self.pool = None
-        self.main_conn = None
-        self.sub_conn = None
+        self.executor = None
         self.job_id_seed = 0
-        self.func_dict = {}
         self.is_running = False
-        self._thread = None
         self.is_sync_execute = False
 
     def initialize(self):
         print("ProcessPool initialize start")
         if not self.is_sync_execute:
-            self.pool = Pool(self.process_count)
-            self.main_conn, self.sub_conn = Pipe()
-            self.job_id_seed = 0
-            self.func_dict = {}
+            self.executor = JobExecutor("process", self.process_count)
             self.is_running = True
-            self._thread = threading.Thread(target=self.recv_thread)
-            self._thread.start()
         print("ProcessPool initialize end")
 
-    def recv_thread(self):
-        print("ProcessPool recv_thread start")
-        while (self.is_running):
-            try:
-                obj = self.main_conn.recv()
-                print("ProcessPool recv:", obj)
-                id = obj["id"]
-                data = obj["data"]
-                if id in self.func_dict:
-                    cb = self.func_dict[id]
-                    del self.func_dict[id]
-                    cb["func"](data)
-            except:
-                traceback.print_exc()
-        print("ProcessPool recv_thread stop")
-
     def dispose(self):
         print("ProcessPool dispose")
         self.is_running = False
-        self.pool.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
         print("ProcessPool pool close")
         process_log.dispose()
-        # self.pool.join()
-        # print("ProcessPool pool join")
 
     def get_job_id(self):
         self.job_id_seed += 1
@@ -144,22 +140,38 @@ class ProcessPool:
 
     def execute_job(self, mcp_object, method, args, f):
         print("execute_job:", method)
+        if warm_pool.is_running:
+            try:
+                return warm_pool.submit(mcp_object, method, args, f)
+            except Exception as e:
+                print("execute_job: warm worker failed, use process pool:", e)
         if not self.is_running:
             self.initialize()
         job_id = self.get_job_id()
-        self.func_dict[job_id] = {
-            "func": f,
-        }
-        wrapper = trace_args(mcp_object)
-        print("execute_job:", method, job_id, wrapper)
-        self.pool.apply_async(func=wrapper_process, kwds={
-            "id": job_id,
-            "wrapper": wrapper,
-            "method": method,
-            "args": args,
-            "conn": self.sub_conn,
-        })
+        try:
+            digest, data = object_graph.encode(mcp_object)
+        except Exception as e:
+            print("execute_job: object graph failed, use trace_args:", e)
+            wrapper = trace_args(mcp_object)
+            key = (method, json.dumps(wrapper, sort_keys=True, default=str), repr(args))
+            print("execute_job:", method, job_id, wrapper)
+            return self.executor.submit(wrapper_process, f, args=(job_id, wrapper, method, args), key=key)
+        key = (method, digest, repr(args))
+        print("execute_job:", method, job_id, digest, len(data))
+        return self.executor.submit(graph_process, f, args=(job_id, data, method, args), key=key)
+
+    def cancel(self, job, f):
+        if job.id.startswith("warm_"):
+            warm_pool.cancel(job, f)
+        elif self.executor is not None:
+            self.executor.cancel(job, f)
+
+    def stats(self):
+        if self.executor is None:
+            return {"is_sync_execute": self.is_sync_execute}
+        return dict(self.executor.stats(), is_sync_execute=self.is_sync_execute)
 
 
 process_pool = ProcessPool(6)
-process_pool.is_sync_execute = True
+# MCP_ASYNC_EXECUTE=1时在进程池执行
+process_pool.is_sync_execute = not async_execute_enabled()
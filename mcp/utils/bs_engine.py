@@ -0,0 +1,274 @@
+"""
+Vectorized Black-Scholes / Black-76 pricing engine.
+
+All functions accept scalars, lists or numpy arrays and broadcast them
+against each other, so a whole option blotter is priced in one pass:
+
+    from mcp.utils.bs_engine import bs_prices, bs_greeks
+    prices = bs_prices(S, K, T, r, q, sigma, ["call", "put", ...])
+    greeks = bs_greeks(S, K, T, r, q, sigma, "call")
+
+Model "bs" is Black-Scholes-Merton with a continuous dividend yield q,
+model "black76" prices options on futures/forwards (S is the forward F
+and q is ignored).
+"""
+
+import numpy as np
+from scipy.special import ndtr
+
+from mcp.utils.enums import CallPut
+
+Model_BS = "bs"
+Model_Black76 = "black76"
+
+Greek_Fields = ["Price", "Delta", "Gamma", "Vega", "Theta", "Rho"]
+
+_min_time = 1e-10
+_min_vol = 1e-10
+_inv_sqrt_2pi = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x):
+    return _inv_sqrt_2pi * np.exp(-0.5 * x * x)
+
+
+def norm_cdf(x):
+    return ndtr(x)
+
+
+def _is_call(item):
+    if isinstance(item, str):
+        s = item.strip().lower()
+        if s in ("call", "c"):
+            return True
+        if s in ("put", "p"):
+            return False
+        raise ValueError(f"Unknown option type: {item}")
+    if isinstance(item, (bool, np.bool_)):
+        return bool(item)
+    return int(item) == CallPut.Call
+
+
+def parse_call_put(call_put):
+    """
+    Convert option types to a boolean array (True for call).
+
+    Accepts "call"/"c"/"put"/"p" (case-insensitive), CallPut enum values
+    or booleans, as a scalar or any (nested) sequence.
+    """
+    if isinstance(call_put, np.ndarray) and call_put.dtype == bool:
+        return call_put
+    arr = np.asarray(call_put, dtype=object)
+    if arr.ndim == 0:
+        return np.asarray(_is_call(arr.item()))
+    flat = [_is_call(item) for item in arr.ravel()]
+    return np.asarray(flat, dtype=bool).reshape(arr.shape)
+
+
+def _carry(model, r, q):
+    model = str(model).lower()
+    if model == Model_BS:
+        return r - q
+    elif model == Model_Black76:
+        return np.zeros_like(r)
+    raise ValueError(f"Unknown model: {model}")
+
+
+def _prepare(S, K, T, r, q, sigma, call_put, model):
+    S, K, T, r, q, sigma = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (S, K, T, r, q, sigma)])
+    is_call = parse_call_put(call_put)
+    S, K, T, r, q, sigma, is_call = np.broadcast_arrays(S, K, T, r, q, sigma, is_call)
+    T = np.maximum(T, _min_time)
+    sigma = np.maximum(sigma, _min_vol)
+    b = _carry(model, r, q)
+    sqrt_t = np.sqrt(T)
+    vol_t = sigma * sqrt_t
+    d1 = (np.log(S / K) + (b + 0.5 * sigma * sigma) * T) / vol_t
+    d2 = d1 - vol_t
+    carry_df = np.exp((b - r) * T)
+    df = np.exp(-r * T)
+    sign = np.where(is_call, 1.0, -1.0)
+    return {
+        "S": S, "K": K, "T": T, "r": r, "b": b, "sigma": sigma,
+        "sqrt_t": sqrt_t, "d1": d1, "d2": d2,
+        "carry_df": carry_df, "df": df, "sign": sign,
+    }
+
+
+def _price(c):
+    sign = c["sign"]
+    return sign * (c["S"] * c["carry_df"] * norm_cdf(sign * c["d1"])
+                   - c["K"] * c["df"] * norm_cdf(sign * c["d2"]))
+
+
+def bs_prices(S, K, T, r, q, sigma, call_put="call", model=Model_BS):
+    """
+    Price European options.
+
+    Args:
+        S: spot price (forward price for black76)
+        K: strike price
+        T: time to expiry in years
+        r: risk-free rate (continuous compounding)
+        q: dividend/foreign rate (continuous compounding), ignored for black76
+        sigma: volatility
+        call_put: option type(s), see parse_call_put
+        model: "bs" or "black76"
+
+    Returns:
+        numpy.ndarray: option prices, broadcast shape of the inputs
+    """
+    return _price(_prepare(S, K, T, r, q, sigma, call_put, model))
+
+
+def bs_greeks(S, K, T, r, q, sigma, call_put="call", model=Model_BS):
+    """
+    Price European options and compute Greeks in one pass.
+
+    Theta is per year and Vega/Rho are per 1.0 (100%) change of the
+    volatility/rate, the same units as the analytic formulas.
+
+    Returns:
+        dict: {"Price", "Delta", "Gamma", "Vega", "Theta", "Rho"} -> numpy.ndarray
+    """
+    c = _prepare(S, K, T, r, q, sigma, call_put, model)
+    S, K, T, r, b, sigma = c["S"], c["K"], c["T"], c["r"], c["b"], c["sigma"]
+    sign, d1, d2 = c["sign"], c["d1"], c["d2"]
+    carry_df, df, sqrt_t = c["carry_df"], c["df"], c["sqrt_t"]
+
+    nd1 = norm_pdf(d1)
+    cdf_d1 = norm_cdf(sign * d1)
+    cdf_d2 = norm_cdf(sign * d2)
+    price = sign * (S * carry_df * cdf_d1 - K * df * cdf_d2)
+
+    delta = sign * carry_df * cdf_d1
+    gamma = carry_df * nd1 / (S * sigma * sqrt_t)
+    vega = S * carry_df * nd1 * sqrt_t
+    theta = (-S * carry_df * nd1 * sigma / (2.0 * sqrt_t)
+             - sign * (b - r) * S * carry_df * cdf_d1
+             - sign * r * K * df * cdf_d2)
+    if str(model).lower() == Model_Black76:
+        rho = -T * price
+    else:
+        rho = sign * K * T * df * cdf_d2
+    return {
+        "Price": price,
+        "Delta": delta,
+        "Gamma": gamma,
+        "Vega": vega,
+        "Theta": theta,
+        "Rho": rho,
+    }
+
+
+def black76_prices(F, K, T, r, sigma, call_put="call"):
+    return bs_prices(F, K, T, r, 0.0, sigma, call_put, Model_Black76)
+
+
+def black76_greeks(F, K, T, r, sigma, call_put="call"):
+    return bs_greeks(F, K, T, r, 0.0, sigma, call_put, Model_Black76)
+
+
+def greeks_table(greeks, fields=None, with_header=True):
+    """
+    Convert the bs_greeks result to a 2d list (one row per option) for Excel.
+    """
+    if fields is None:
+        fields = Greek_Fields
+    cols = [np.ravel(greeks[field]) for field in fields]
+    rows = np.column_stack(cols).tolist() if len(cols) > 0 else []
+    if with_header:
+        return [list(fields)] + rows
+    return rows
+
+
+def _implied_vol_guess(call_price, fwd, strike, sqrt_t):
+    """
+    Corrado-Miller initial guess on undiscounted-to-spot terms, with the
+    Brenner-Subrahmanyam ATM approximation where the square root is negative.
+    """
+    half = 0.5 * (fwd - strike)
+    excess = call_price - half
+    disc = excess * excess - (fwd - strike) ** 2 / np.pi
+    cm = np.sqrt(2.0 * np.pi) / (fwd + strike) * (excess + np.sqrt(np.maximum(disc, 0.0))) / sqrt_t
+    bs = np.sqrt(2.0 * np.pi) * call_price / (fwd * sqrt_t)
+    return np.where((disc >= 0) & np.isfinite(cm) & (cm > 0), cm, bs)
+
+
+def implied_vols(price, S, K, T, r, q, call_put="call", model=Model_BS,
+                 tol=1e-8, max_iter=50, vol_min=1e-6, vol_max=5.0):
+    """
+    Solve implied volatilities for a whole strike/expiry grid at once.
+
+    Each element starts from a Corrado-Miller guess and takes Newton steps;
+    a step is replaced by bisection whenever vega is too small or the step
+    leaves the current [low, high] bracket, so every element converges as
+    long as its price lies inside the no-arbitrage bounds.  Only the
+    unconverged elements are repriced on each iteration.
+
+    Args:
+        price: option prices
+        S, K, T, r, q, call_put, model: as in bs_prices
+        tol: absolute price tolerance
+        max_iter: maximum number of vector iterations
+        vol_min, vol_max: initial volatility bracket
+
+    Returns:
+        tuple: (vols, converged, iterations) - vols is NaN where the price is
+        outside the bounds or the solver did not converge
+    """
+    c = _prepare(S, K, T, r, q, 0.2, call_put, model)
+    price = np.broadcast_to(np.asarray(price, dtype=float), c["S"].shape)
+    S, K, T, r, b = c["S"], c["K"], c["T"], c["r"], c["b"]
+    shape = S.shape
+    S, K, T, r, b, sign = [np.ravel(x) for x in (S, K, T, r, b, c["sign"])]
+    price = np.ravel(price)
+    fwd = S * np.ravel(c["carry_df"])
+    strike = K * np.ravel(c["df"])
+    sqrt_t = np.sqrt(T)
+
+    # Work on call prices only, puts are mapped through put-call parity
+    target = np.where(sign > 0, price, price + fwd - strike)
+    lower_bound = np.maximum(fwd - strike, 0.0)
+    valid = np.isfinite(target) & (target > lower_bound) & (target < fwd)
+
+    n = S.size
+    vols = np.full(n, np.nan)
+    converged = np.zeros(n, dtype=bool)
+    low = np.full(n, float(vol_min))
+    high = np.full(n, float(vol_max))
+    vol = np.clip(_implied_vol_guess(target, fwd, strike, sqrt_t), vol_min, vol_max)
+
+    active = np.nonzero(valid)[0]
+    iterations = 0
+    while len(active) > 0 and iterations < max_iter:
+        iterations += 1
+        v = vol[active]
+        st = sqrt_t[active]
+        vt = v * st
+        d1 = (np.log(fwd[active] / strike[active]) + 0.5 * vt * vt) / vt
+        call = fwd[active] * norm_cdf(d1) - strike[active] * norm_cdf(d1 - vt)
+        diff = call - target[active]
+
+        done = np.abs(diff) < tol
+        idx_done = active[done]
+        vols[idx_done] = v[done]
+        converged[idx_done] = True
+
+        above = diff > 0
+        high[active] = np.where(above, v, high[active])
+        low[active] = np.where(above, low[active], v)
+
+        vega = fwd[active] * norm_pdf(d1) * st
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = v - diff / vega
+        lo, hi = low[active], high[active]
+        use_newton = (vega > 1e-12) & (newton > lo) & (newton < hi)
+        vol[active] = np.where(use_newton, newton, 0.5 * (lo + hi))
+        active = active[~done]
+
+    return vols.reshape(shape), converged.reshape(shape), iterations
+
+
+def black76_implied_vols(price, F, K, T, r, call_put="call", tol=1e-8, max_iter=50):
+    return implied_vols(price, F, K, T, r, 0.0, call_put, Model_Black76, tol, max_iter)
@@ -0,0 +1,201 @@
+"""
+曲线逐个节点移动的情景缓存。
+
+native的KeyRateDuration/FrtbGirrDeltas在每个产品内部重新移动并构造曲线，
+整个组合的曲线构造次数是节点数 x 产品数。这里每条基准曲线的每个节点、
+每个移动量只构造一次移动后的曲线，之后所有产品共用:
+
+    curves = bump_cache.bumped_curves(swap_curve, 0.0001)       # 每个节点一条
+    deltas = bump_cache.pillar_deltas(bond, "Price", [bond_curve], bond_curve)
+    deltas = bump_cache.pillar_deltas(swap, "NPV", [], swap_curve)   # 曲线在构造参数中
+
+移动的是曲线的输入: McpYieldCurve的ZeroRates，McpSwapCurve的Coupons，
+McpBondCurve的YieldsOrDirtyPrice(IsYield为True时)/ZeroRates/ParYields。
+曲线在产品的构造参数中时(互换、期权...)，产品用移动后的曲线重新构造。
+缓存按基准曲线对象(弱引用)保存，曲线的构造参数raw_args变化后重新构造。
+"""
+
+import json
+import threading
+import weakref
+
+import numpy as np
+
+from mcp.wrapper import find_named_arg, named_raw_args, replace_raw_args
+
+default_shift = 0.0001
+
+# 类名 -> 可以移动的输入字段(按顺序取第一个非空的)
+bump_fields = {
+    "McpYieldCurve": ["ZeroRates"],
+    "McpSwapCurve": ["Coupons"],
+    "McpBondCurve": ["YieldsOrDirtyPrice", "ZeroRates", "ParYields"],
+}
+
+# 节点标签字段
+label_fields = ["Tenors", "Dates", "MaturityDates", "TimeToMaturities"]
+
+
+def _is_wrapper(obj):
+    return hasattr(obj, "is_mcp_wrapper")
+
+
+def _load_list(value):
+    """构造参数中的列表可能是JSON字符串"""
+    if isinstance(value, str):
+        value = value.strip()
+        return (json.loads(value) if value else []), True
+    if value is None:
+        return [], False
+    return list(np.asarray(value).ravel().tolist()), False
+
+
+class CurveScenarios:
+    """一条基准曲线的输入字段和已经构造的移动后曲线"""
+
+    def __init__(self, curve, raw_args, named):
+        self.curve_ref = weakref.ref(curve)
+        self.raw_args = raw_args
+        self.named = named
+        self.field = None
+        self.values = []
+        self.is_json = False
+        for name in bump_fields.get(curve.__class__.__name__, []):
+            if name == "YieldsOrDirtyPrice" and not find_named_arg(named, "IsYield", True):
+                continue
+            values, is_json = _load_list(find_named_arg(named, name))
+            if len(values) > 0:
+                self.field = name
+                self.values, self.is_json = [float(v) for v in values], is_json
+                break
+        # (节点, 移动量) -> 曲线
+        self.bumped = {}
+
+    @property
+    def pillar_count(self):
+        return len(self.values)
+
+    def labels(self):
+        for name in label_fields:
+            values, _ = _load_list(find_named_arg(self.named, name))
+            if len(values) == self.pillar_count and len(values) > 0:
+                return values
+        return list(range(1, self.pillar_count + 1))
+
+    def build(self, pillar, shift):
+        curve = self.curve_ref()
+        if self.field is None:
+            raise Exception(f"{curve.__class__.__name__}: no bumpable input in {list(self.named.keys())}")
+        values = list(self.values)
+        values[pillar] += shift
+        return replace_raw_args(curve, {self.field: json.dumps(values) if self.is_json else values})
+
+
+class BumpCache:
+
+    def __init__(self):
+        # 基准曲线 -> CurveScenarios
+        self.curves = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+        self.builds = 0
+        self.hits = 0
+
+    def scenarios(self, curve):
+        with self._lock:
+            scenarios = self.curves.get(curve)
+            if scenarios is None or scenarios.raw_args is not curve.raw_args:
+                scenarios = CurveScenarios(curve, curve.raw_args, named_raw_args(curve))
+                self.curves[curve] = scenarios
+            return scenarios
+
+    def bumped_curve(self, curve, pillar, shift=default_shift):
+        scenarios = self.scenarios(curve)
+        key = (pillar, float(shift))
+        with self._lock:
+            bumped = scenarios.bumped.get(key)
+            if bumped is not None:
+                self.hits += 1
+                return bumped
+        # 构造曲线不持有锁，同时构造同一条曲线时保留先完成的
+        bumped = scenarios.build(pillar, shift)
+        with self._lock:
+            self.builds += 1
+            return scenarios.bumped.setdefault(key, bumped)
+
+    def bumped_curves(self, curve, shift=default_shift):
+        return [self.bumped_curve(curve, i, shift) for i in range(self.scenarios(curve).pillar_count)]
+
+    def pillar_labels(self, curve):
+        return self.scenarios(curve).labels()
+
+    def substitute(self, obj, old, new, memo=None):
+        """
+        obj的构造参数中(递归，包括关键字构造的字典和列表参数)出现old时，用new代替old
+        重新构造obj，否则返回obj本身。obj是字典、列表或元组时返回替换后的副本(没有变化时是obj本身)
+        """
+        if obj is old:
+            return new
+        memo = {} if memo is None else memo
+        if isinstance(obj, dict):
+            items = {key: self.substitute(value, old, new, memo) for key, value in obj.items()}
+            changed = any(items[key] is not value for key, value in obj.items())
+            return items if changed else obj
+        if isinstance(obj, (list, tuple)):
+            items = [self.substitute(value, old, new, memo) for value in obj]
+            changed = any(item is not value for item, value in zip(items, obj))
+            if not changed:
+                return obj
+            return items if isinstance(obj, list) else tuple(items)
+        if not _is_wrapper(obj) or getattr(obj, "raw_args", None) is None:
+            return obj
+        if id(obj) in memo:
+            return memo[id(obj)]
+        raw_args = tuple(obj.raw_args)
+        args = self.substitute(raw_args, old, new, memo)
+        result = obj if args is raw_args else obj.__class__(*args)
+        memo[id(obj)] = result
+        return result
+
+    def pillar_deltas(self, instrument, method, args, curve, shift=default_shift, base=None):
+        """
+        曲线每个节点的输入移动shift后instrument.method(*args)的变化，折算为每1bp。
+        args和instrument构造参数中的curve都换成移动后的曲线，两者中都没有curve时报错
+        (否则重新定价的还是原来的产品，所有节点的变化都是0)。
+        :param base: 基准值，None时调用instrument.method(*args)
+        :return: numpy数组，每个节点一个值
+        """
+        if base is None:
+            base = getattr(instrument, method)(*args)
+        deltas = []
+        for bumped in self.bumped_curves(curve, shift):
+            memo = {}
+            obj = self.substitute(instrument, curve, bumped, memo)
+            call_args = [self.substitute(arg, curve, bumped, memo) for arg in args]
+            if obj is instrument and all(new is old for new, old in zip(call_args, args)):
+                raise Exception(f"{curve.__class__.__name__} is not used by {instrument.__class__.__name__}"
+                                f" or the {method} arguments")
+            deltas.append(getattr(obj, method)(*call_args) - base)
+        return np.array(deltas) * (default_shift / shift)
+
+    def key_rate_durations(self, instrument, method, args, curve, shift=default_shift):
+        """-(V_k - V) / (V * 1bp)，V为instrument.method(*args)"""
+        base = getattr(instrument, method)(*args)
+        if base == 0:
+            raise Exception("Key rate duration of zero value is undefined")
+        return -self.pillar_deltas(instrument, method, args, curve, shift, base) / (base * default_shift)
+
+    def clear(self):
+        with self._lock:
+            self.curves = weakref.WeakKeyDictionary()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "curves": len(self.curves),
+                "bumped": sum(len(s.bumped) for s in self.curves.values()),
+                "builds": self.builds,
+                "hits": self.hits,
+            }
+
+
+bump_cache = BumpCache()
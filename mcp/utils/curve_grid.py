@@ -0,0 +1,179 @@
+"""
+曲线的批量查询。
+
+贴现因子和零息利率按日期缓存在每条曲线的有序数组中，每个日期只向native
+取一次，之后整列查询是一次searchsorted:
+
+    grid = curve_grid(curve)
+    grid.discount_factors(dates)                 # numpy数组
+    grid.zero_rates(dates)
+    grid.forward_rates(start_dates, end_dates)   # 由贴现因子计算
+    grid.discount_factors_at(times)              # 年化期限(ACT/365)
+
+曲线wrapper的DiscountFactorArray/ZeroRateArray/ForwardRateArray使用这里的缓存。
+曲线有核对过native的快照(McpYieldCurve.Snapshot()，见mcp.utils.curve_snapshot)时，
+参考日之后的日期直接由快照整列插值，不调用native；零息利率只在快照的ZeroRate
+约定与native一致(zero_supported)时使用快照。其他情况按日期缓存native的结果。
+日期查询的结果与native逐个调用相同；年化期限落在两个日期之间时，
+贴现因子按对数线性、零息利率按线性在相邻两天之间插值。
+"""
+
+import threading
+import weakref
+
+import numpy as np
+
+from mcp.utils.date_array import to_datetime64
+from mcp.utils.holiday_index import to_date_strings
+
+days_of_year = 365.0
+
+
+class CurveGrid:
+    """
+    一条曲线的日期 -> 贴现因子/零息利率缓存
+    """
+
+    def __init__(self, curve):
+        self.curve_ref = weakref.ref(curve)
+        self.raw_args = getattr(curve, "raw_args", None)
+        self._reference_date = None
+        # 名称 -> (日期数组(int64天数)，值数组)，日期递增
+        self.tables = {
+            "DiscountFactor": (np.array([], dtype=np.int64), np.array([], dtype=float)),
+            "ZeroRate": (np.array([], dtype=np.int64), np.array([], dtype=float)),
+        }
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_checked = False
+        self.native_calls = 0
+        self.snapshot_calls = 0
+
+    @property
+    def reference_date(self):
+        if self._reference_date is None:
+            curve = self.curve_ref()
+            if hasattr(curve, "GetRefDate"):
+                ref = curve.GetRefDate()
+            else:
+                # McpBondCurve没有GetRefDate，第一个构造参数是SettlementDate
+                ref = self.raw_args[0]
+            self._reference_date = to_datetime64([ref])[0]
+        return self._reference_date
+
+    def snapshot(self):
+        """曲线的快照(只有McpYieldCurve有)，没有或与native不一致时为None"""
+        if not self._snapshot_checked:
+            func = getattr(self.curve_ref(), "Snapshot", None)
+            self._snapshot = func() if func is not None else None
+            self._snapshot_checked = True
+        return self._snapshot
+
+    def _lookup(self, name, days):
+        """days: int64天数(可以重复)，参考日之后的日期有快照时由快照计算，其余用native的缓存"""
+        snapshot = self.snapshot()
+        if snapshot is not None and (name == "DiscountFactor" or snapshot.zero_supported):
+            after = days > snapshot.reference_date.astype(np.int64)
+            if after.all():
+                return self._snapshot_values(snapshot, name, days)
+            result = np.empty(len(days))
+            result[after] = self._snapshot_values(snapshot, name, days[after])
+            result[~after] = self._native_lookup(name, days[~after])
+            return result
+        return self._native_lookup(name, days)
+
+    def _snapshot_values(self, snapshot, name, days):
+        self.snapshot_calls += 1
+        dates = days.astype("datetime64[D]")
+        if name == "DiscountFactor":
+            return snapshot.discount_factors(dates)
+        return snapshot.zero_rates(dates)
+
+    def _native_lookup(self, name, days):
+        """缺少的日期调用native补齐"""
+        if len(days) == 0:
+            return np.array([], dtype=float)
+        with self._lock:
+            keys, values = self.tables[name]
+            wanted = np.unique(days)
+            missing = wanted[~np.isin(wanted, keys)]
+            if len(missing) > 0:
+                func = getattr(self.curve_ref(), name)
+                dates = missing.astype("datetime64[D]")
+                new_values = np.array([func(d) for d in to_date_strings(dates)], dtype=float)
+                self.native_calls += len(missing)
+                keys = np.concatenate([keys, missing])
+                values = np.concatenate([values, new_values])
+                order = np.argsort(keys, kind="stable")
+                keys, values = keys[order], values[order]
+                self.tables[name] = (keys, values)
+        return values[np.searchsorted(keys, days)]
+
+    def _values(self, name, dates):
+        dates = to_datetime64(np.ravel(dates))
+        result = np.full(dates.shape, np.nan)
+        valid = ~np.isnat(dates)
+        if valid.any():
+            result[valid] = self._lookup(name, dates[valid].astype(np.int64))
+        return result
+
+    def discount_factors(self, dates):
+        return self._values("DiscountFactor", dates)
+
+    def zero_rates(self, dates):
+        return self._values("ZeroRate", dates)
+
+    def forward_rates(self, start_dates, end_dates, compounding="simple"):
+        """
+        start_dates/end_dates之间的远期利率，期限ACT/365:
+        compounding="simple"时 (DF(s)/DF(e) - 1) / t，"continuous"时 ln(DF(s)/DF(e)) / t
+        """
+        starts = to_datetime64(np.ravel(start_dates))
+        ends = to_datetime64(np.ravel(end_dates))
+        if starts.shape != ends.shape:
+            raise Exception(f"{len(starts)} start dates, {len(ends)} end dates")
+        ratio = self.discount_factors(starts) / self.discount_factors(ends)
+        t = (ends - starts).astype(np.int64) / days_of_year
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if compounding == "simple":
+                return np.where(t > 0, (ratio - 1.0) / t, np.nan)
+            if compounding == "continuous":
+                return np.where(t > 0, np.log(ratio) / t, np.nan)
+        raise Exception(f"Invalid compounding: {compounding}")
+
+    def _at(self, name, times):
+        days = self.reference_date.astype(np.int64) + np.asarray(times, dtype=float).ravel() * days_of_year
+        lower = np.floor(days).astype(np.int64)
+        upper = np.ceil(days).astype(np.int64)
+        v0, v1 = self._lookup(name, lower), self._lookup(name, upper)
+        w = days - lower
+        if name == "DiscountFactor":
+            return np.exp(np.log(v0) * (1.0 - w) + np.log(v1) * w)
+        return v0 * (1.0 - w) + v1 * w
+
+    def discount_factors_at(self, times):
+        return self._at("DiscountFactor", times)
+
+    def zero_rates_at(self, times):
+        return self._at("ZeroRate", times)
+
+    def stats(self):
+        stats = {name: len(keys) for name, (keys, _) in self.tables.items()}
+        stats["native_calls"] = self.native_calls
+        stats["snapshot"] = self._snapshot is not None
+        stats["snapshot_calls"] = self.snapshot_calls
+        return stats
+
+
+_grids = weakref.WeakKeyDictionary()
+_grids_lock = threading.Lock()
+
+
+def curve_grid(curve):
+    """curve的CurveGrid，曲线对象或其构造参数raw_args变化后重新创建"""
+    with _grids_lock:
+        grid = _grids.get(curve)
+        if grid is None or grid.raw_args is not getattr(curve, "raw_args", None):
+            grid = CurveGrid(curve)
+            _grids[curve] = grid
+        return grid
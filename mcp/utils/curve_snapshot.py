@@ -0,0 +1,417 @@
+"""
+Python端的收益率曲线快照。
+
+从McpYieldCurve的构造参数(节点日期、零息利率、插值方法、插值变量、日期
+计算方式)得到节点期限和节点值，用NumPy整列计算贴现因子、零息利率和
+远期利率，不需要native库，可以发送给工作进程:
+
+    snapshot = CurveSnapshot.from_curve(curve)    # 与native不一致时返回None
+    snapshot.discount_factors(dates)
+    snapshot.zero_rates(dates)
+    data = snapshot.to_dict()                    # 只有列表和数字
+    snapshot = CurveSnapshot.from_dict(data)     # 工作进程中
+
+支持的插值方法: FLAT、CLOSEST、LINEAR、LOGLINEAR、CUBICSPLINES(自然三次
+样条)；插值变量: ZERORATES(输入利率)、SIMPLERATES、CONTINUOUSRATES、
+DISCOUNTFACTORS；日期计算: Act360、Act365Fixed、ActActISDA、30E/360、30U/360。
+节点之外利率水平外推，贴现因子在参考日为1。
+
+构造参数没有给出的约定(利率复利方式、单位、日期计算方式)逐个尝试，
+from_curve用native的DiscountFactor核对节点、节点中点和节点之外的日期，
+全部一致才返回快照；ZeroRate的复利方式与native对不上时zero_rates报错
+(zero_supported为False)，不返回与native不同的结果。
+"""
+
+import json
+import threading
+import weakref
+from enum import Enum
+
+import numpy as np
+
+from mcp.utils.date_array import to_datetime64
+from mcp.utils.enums import DayCounter, Frequency, InterpolatedVariable, InterpolationMethod, enum_wrapper
+from mcp.utils.holiday_index import tenor_dates, to_date_strings
+
+supported_methods = [
+    InterpolationMethod.FLATINTERPOLATION,
+    InterpolationMethod.CLOSESTINTERPOLATION,
+    InterpolationMethod.LINEARINTERPOLATION,
+    InterpolationMethod.LOGLINEAR,
+    InterpolationMethod.CUBICSPLINES,
+]
+
+supported_variables = [
+    InterpolatedVariable.ZERORATES,
+    InterpolatedVariable.SIMPLERATES,
+    InterpolatedVariable.CONTINUOUSRATES,
+    InterpolatedVariable.DISCOUNTFACTORS,
+]
+
+# 核对native结果的容差
+check_tolerance = 1e-10
+
+
+def _ymd(dates):
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    y = dates.astype("datetime64[Y]")
+    m = dates.astype("datetime64[M]")
+    year = y.astype(np.int64) + 1970
+    month = (m - y.astype("datetime64[M]")).astype(np.int64) + 1
+    day = (dates - m.astype("datetime64[D]")).astype(np.int64) + 1
+    return year, month, day
+
+
+def _days_in_year(year):
+    return np.where((year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0)), 366.0, 365.0)
+
+
+def year_fractions(start, dates, day_counter):
+    """start(一个日期)到dates(数组)的年化期限"""
+    start = np.datetime64(start, "D")
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    days = (dates - start).astype(np.int64).astype(float)
+    if day_counter == DayCounter.Act360:
+        return days / 360.0
+    if day_counter == DayCounter.Act365Fixed:
+        return days / 365.0
+    if day_counter == DayCounter.ActActISDA:
+        y1, _, _ = _ymd(start)
+        y2, _, _ = _ymd(dates)
+        next_year = (start.astype("datetime64[Y]") + 1).astype("datetime64[D]")
+        first_part = (next_year - start).astype(np.int64) / _days_in_year(y1)
+        year_start = dates.astype("datetime64[Y]").astype("datetime64[D]")
+        last_part = (dates - year_start).astype(np.int64) / _days_in_year(y2)
+        return np.where(y2 == y1, days / _days_in_year(y1), first_part + (y2 - y1 - 1) + last_part)
+    if day_counter in (DayCounter.ThirtyE360, DayCounter.ThirtyU360):
+        y1, m1, d1 = _ymd(start)
+        y2, m2, d2 = _ymd(dates)
+        d1 = np.minimum(d1, 30)
+        if day_counter == DayCounter.ThirtyE360:
+            d2 = np.minimum(d2, 30)
+        else:
+            d2 = np.where((d2 == 31) & (d1 >= 30), 30, d2)
+        return (360.0 * (y2 - y1) + 30.0 * (m2 - m1) + (d2 - d1)) / 360.0
+    raise Exception(f"Unsupported day counter: {enum_wrapper.name_of(DayCounter, day_counter, day_counter)}")
+
+
+def rates_to_discount_factors(rates, t, compounding, frequency=1):
+    """compounding: "continuous"、"simple"或"compounded"(每年frequency次)"""
+    rates = np.asarray(rates, dtype=float)
+    t = np.asarray(t, dtype=float)
+    if compounding == "continuous":
+        return np.exp(-rates * t)
+    if compounding == "simple":
+        return 1.0 / (1.0 + rates * t)
+    if compounding == "compounded":
+        return (1.0 + rates / frequency) ** (-frequency * t)
+    raise Exception(f"Invalid compounding: {compounding}")
+
+
+def discount_factors_to_rates(df, t, compounding, frequency=1):
+    df = np.asarray(df, dtype=float)
+    t = np.asarray(t, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if compounding == "continuous":
+            rates = -np.log(df) / t
+        elif compounding == "simple":
+            rates = (1.0 / df - 1.0) / t
+        elif compounding == "compounded":
+            rates = frequency * (df ** (-1.0 / (frequency * t)) - 1.0)
+        else:
+            raise Exception(f"Invalid compounding: {compounding}")
+    return np.where(t > 0, rates, np.nan)
+
+
+def natural_cubic_spline(x, y):
+    """返回节点的二阶导数(两端为0)"""
+    n = len(x)
+    second = np.zeros(n)
+    if n < 3:
+        return second
+    h = np.diff(x)
+    a = np.zeros((n - 2, n - 2))
+    b = 6.0 * (np.diff(y[1:]) / h[1:] - np.diff(y[:-1]) / h[:-1])
+    for i in range(n - 2):
+        a[i, i] = 2.0 * (h[i] + h[i + 1])
+        if i > 0:
+            a[i, i - 1] = h[i]
+        if i < n - 3:
+            a[i, i + 1] = h[i + 1]
+    second[1:-1] = np.linalg.solve(a, b)
+    return second
+
+
+def interpolate(x, y, t, method, second=None):
+    """节点(x, y)在t处插值，节点之外取端点的值"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    t = np.asarray(t, dtype=float)
+    if len(x) == 1:
+        return np.full(t.shape, y[0])
+    tc = np.clip(t, x[0], x[-1])
+    if method == InterpolationMethod.LINEARINTERPOLATION:
+        return np.interp(tc, x, y)
+    if method == InterpolationMethod.LOGLINEAR:
+        return np.exp(np.interp(tc, x, np.log(y)))
+    if method == InterpolationMethod.FLATINTERPOLATION:
+        return y[np.clip(np.searchsorted(x, tc, side="right") - 1, 0, len(x) - 1)]
+    if method == InterpolationMethod.CLOSESTINTERPOLATION:
+        right = np.clip(np.searchsorted(x, tc), 1, len(x) - 1)
+        left = right - 1
+        return np.where(tc - x[left] <= x[right] - tc, y[left], y[right])
+    if method == InterpolationMethod.CUBICSPLINES:
+        if second is None:
+            second = natural_cubic_spline(x, y)
+        right = np.clip(np.searchsorted(x, tc, side="right"), 1, len(x) - 1)
+        left = right - 1
+        h = x[right] - x[left]
+        a = (x[right] - tc) / h
+        b = (tc - x[left]) / h
+        return a * y[left] + b * y[right] + ((a ** 3 - a) * second[left] + (b ** 3 - b) * second[right]) * h * h / 6.0
+    raise Exception(f"Unsupported interpolation method: "
+                    f"{enum_wrapper.name_of(InterpolationMethod, method, method)}")
+
+
+def _load_list(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return json.loads(value) if value else []
+    if value is None:
+        return []
+    return list(np.asarray(value).ravel().tolist())
+
+
+def _enum(value, enum_name, default):
+    if value is None or value == "":
+        return default
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    parsed = enum_wrapper.value_of_key(str(value), enum_name)
+    if parsed is None:
+        raise Exception(f"Invalid {enum_name}: {value}")
+    return parsed
+
+
+class CurveSnapshot:
+    """
+    reference_date: 参考日
+    pillar_dates/rates: 节点日期和零息利率(小数)
+    compounding/frequency: 输入利率的复利方式
+    zero_compounding/zero_frequency: zero_rates返回的利率的复利方式，默认与输入相同
+    zero_scale: zero_rates返回的利率的单位，100为百分数
+    zero_supported: False时zero_rates报错(与native的ZeroRate核对不一致)
+    """
+
+    def __init__(self, reference_date, pillar_dates, rates,
+                 method=InterpolationMethod.LINEARINTERPOLATION,
+                 variable=InterpolatedVariable.SIMPLERATES,
+                 day_counter=DayCounter.Act365Fixed,
+                 compounding="continuous", frequency=1,
+                 zero_compounding=None, zero_frequency=None, zero_scale=1.0, zero_supported=True):
+        if method not in supported_methods:
+            raise Exception(f"Unsupported interpolation method: "
+                            f"{enum_wrapper.name_of(InterpolationMethod, method, method)}")
+        if variable not in supported_variables:
+            raise Exception(f"Unsupported interpolated variable: "
+                            f"{enum_wrapper.name_of(InterpolatedVariable, variable, variable)}")
+        self.reference_date = np.datetime64(to_datetime64([reference_date])[0], "D")
+        dates = to_datetime64(pillar_dates)
+        rates = np.asarray(rates, dtype=float)
+        if len(dates) != len(rates) or len(dates) == 0:
+            raise Exception(f"{len(dates)} pillar dates, {len(rates)} rates")
+        order = np.argsort(dates, kind="stable")
+        self.pillar_dates = dates[order]
+        self.rates = rates[order]
+        self.method = method
+        self.variable = variable
+        self.day_counter = day_counter
+        self.compounding = compounding
+        self.frequency = frequency
+        self.zero_compounding = zero_compounding or compounding
+        self.zero_frequency = zero_frequency or frequency
+        self.zero_scale = zero_scale
+        self.zero_supported = zero_supported
+        self.times = year_fractions(self.reference_date, self.pillar_dates, day_counter)
+        pillar_df = rates_to_discount_factors(self.rates, self.times, compounding, frequency)
+        x, y = self.times, self.to_variable(pillar_df, self.times, self.rates)
+        if variable == InterpolatedVariable.DISCOUNTFACTORS and x[0] > 0:
+            # 参考日的贴现因子为1
+            x, y = np.concatenate([[0.0], x]), np.concatenate([[1.0], y])
+        self.x, self.y = x, y
+        self.second = natural_cubic_spline(x, y) if method == InterpolationMethod.CUBICSPLINES else None
+
+    def to_variable(self, df, t, rates=None):
+        v = self.variable
+        if v == InterpolatedVariable.DISCOUNTFACTORS:
+            return df
+        if v == InterpolatedVariable.ZERORATES:
+            values = discount_factors_to_rates(df, t, self.compounding, self.frequency)
+        elif v == InterpolatedVariable.CONTINUOUSRATES:
+            values = discount_factors_to_rates(df, t, "continuous")
+        else:
+            values = discount_factors_to_rates(df, t, "simple")
+        # 期限为0的节点没有隐含利率，取输入利率
+        return np.where(np.isnan(values), rates if rates is not None else 0.0, values)
+
+    def from_variable(self, y, t):
+        v = self.variable
+        if v == InterpolatedVariable.DISCOUNTFACTORS:
+            return y
+        if v == InterpolatedVariable.ZERORATES:
+            return rates_to_discount_factors(y, t, self.compounding, self.frequency)
+        if v == InterpolatedVariable.CONTINUOUSRATES:
+            return rates_to_discount_factors(y, t, "continuous")
+        return rates_to_discount_factors(y, t, "simple")
+
+    def discount_factors_at(self, times):
+        t = np.asarray(times, dtype=float).ravel()
+        df = self.from_variable(interpolate(self.x, self.y, t, self.method, self.second), t)
+        return np.where(t > 0, df, 1.0)
+
+    def zero_rates_at(self, times):
+        if not self.zero_supported:
+            raise Exception("CurveSnapshot: native ZeroRate convention not matched, use the curve's ZeroRate")
+        t = np.asarray(times, dtype=float).ravel()
+        rates = discount_factors_to_rates(self.discount_factors_at(t), t, self.zero_compounding, self.zero_frequency)
+        return rates * self.zero_scale
+
+    def year_fractions(self, dates):
+        return year_fractions(self.reference_date, to_datetime64(np.ravel(dates)), self.day_counter)
+
+    def discount_factors(self, dates):
+        return self.discount_factors_at(self.year_fractions(dates))
+
+    def zero_rates(self, dates):
+        return self.zero_rates_at(self.year_fractions(dates))
+
+    def forward_rates(self, start_dates, end_dates, compounding="simple"):
+        """start_dates/end_dates之间的远期利率，期限按曲线的日期计算方式"""
+        t1 = self.year_fractions(start_dates)
+        t2 = self.year_fractions(end_dates)
+        if t1.shape != t2.shape:
+            raise Exception(f"{len(t1)} start dates, {len(t2)} end dates")
+        df = self.discount_factors_at(t2) / self.discount_factors_at(t1)
+        return discount_factors_to_rates(df, t2 - t1, compounding)
+
+    def to_dict(self):
+        return {
+            "ReferenceDate": str(self.reference_date),
+            "Dates": to_date_strings(self.pillar_dates),
+            "ZeroRates": self.rates.tolist(),
+            "Method": int(self.method),
+            "Variable": int(self.variable),
+            "DayCounter": int(self.day_counter),
+            "Compounding": self.compounding,
+            "Frequency": self.frequency,
+            "ZeroCompounding": self.zero_compounding,
+            "ZeroFrequency": self.zero_frequency,
+            "ZeroScale": self.zero_scale,
+            "ZeroSupported": self.zero_supported,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["ReferenceDate"], data["Dates"], data["ZeroRates"], data["Method"], data["Variable"],
+                   data["DayCounter"], data["Compounding"], data["Frequency"],
+                   data["ZeroCompounding"], data["ZeroFrequency"], data["ZeroScale"],
+                   data.get("ZeroSupported", True))
+
+    @staticmethod
+    def sample_dates(reference_date, pillar_dates):
+        """节点、相邻节点的中点、第一个节点之前和最后一个节点之后的日期"""
+        ref = np.datetime64(reference_date, "D")
+        pillars = np.unique(pillar_dates)
+        middles = pillars[:-1] + (pillars[1:] - pillars[:-1]) // 2
+        extra = np.array([ref + 7, pillars[0] - 1, pillars[-1] + 365], dtype="datetime64[D]")
+        dates = np.unique(np.concatenate([pillars, middles, extra]))
+        return dates[dates > ref]
+
+    @classmethod
+    def from_curve(cls, curve):
+        """
+        McpYieldCurve -> CurveSnapshot，用native的结果核对，不一致或不支持时返回None
+        """
+        from mcp.wrapper import find_named_arg, named_raw_args
+        try:
+            named = named_raw_args(curve)
+            ref = find_named_arg(named, "ReferenceDate", find_named_arg(named, "SettlementDate"))
+            ref = np.datetime64(to_datetime64([ref])[0], "D")
+            rates = np.asarray(_load_list(find_named_arg(named, "ZeroRates")), dtype=float)
+            dates = _load_list(find_named_arg(named, "Dates"))
+            if len(dates) > 0:
+                dates = to_datetime64(dates)
+            else:
+                value_date = find_named_arg(named, "ValueDate")
+                start = ref if value_date in (None, "") else np.datetime64(to_datetime64([value_date])[0], "D")
+                dates = tenor_dates(start, _load_list(find_named_arg(named, "Tenors")))
+            method = _enum(find_named_arg(named, "Method", find_named_arg(named, "InterpolationMethod")),
+                           "InterpolationMethod", InterpolationMethod.LINEARINTERPOLATION)
+            variable = find_named_arg(named, "Variable", find_named_arg(named, "InterpolatedVariable"))
+            day_counter = find_named_arg(named, "DayCounter")
+            frequency = find_named_arg(named, "Frequency")
+            if method not in supported_methods:
+                return None
+            variables = [_enum(variable, "InterpolatedVariable", None)] if variable not in (None, "") \
+                else supported_variables
+            if variables[0] not in supported_variables:
+                return None
+            day_counters = [_enum(day_counter, "DayCounter", None)] if day_counter not in (None, "") \
+                else [DayCounter.Act365Fixed, DayCounter.ActActISDA, DayCounter.Act360]
+            frequency = _enum(frequency, "Frequency", None)
+            if frequency in (None, Frequency.NoFrequency):
+                quotes = [("continuous", 1), ("simple", 1), ("compounded", 1)]
+            elif frequency == Frequency.Continuous:
+                quotes = [("continuous", 1)]
+            elif frequency == Frequency.Once:
+                quotes = [("simple", 1)]
+            else:
+                quotes = [("compounded", frequency)]
+
+            samples = cls.sample_dates(ref, dates)
+            sample_strings = to_date_strings(samples)
+            native_df = np.array([curve.DiscountFactor(d) for d in sample_strings], dtype=float)
+            for scale in (1.0, 0.01):
+                for dc in day_counters:
+                    for var in variables:
+                        for compounding, freq in quotes:
+                            snapshot = cls(ref, dates, rates * scale, method, var, dc, compounding, freq)
+                            if np.max(np.abs(snapshot.discount_factors(samples) - native_df)) <= check_tolerance:
+                                return snapshot.check_zero_rates(curve, samples, sample_strings)
+        except Exception as e:
+            print(f"CurveSnapshot.from_curve except: {e}")
+        return None
+
+    def check_zero_rates(self, curve, samples, sample_strings):
+        """确定native ZeroRate的复利方式，找不到时zero_rates报错(zero_supported为False)"""
+        native = np.array([curve.ZeroRate(d) for d in sample_strings], dtype=float)
+        t = self.year_fractions(samples)
+        df = self.discount_factors_at(t)
+        for scale in (1.0, 100.0):
+            for compounding, freq in [(self.compounding, self.frequency), ("continuous", 1), ("simple", 1),
+                                      ("compounded", 1), ("compounded", 2), ("compounded", 4)]:
+                if np.max(np.abs(discount_factors_to_rates(df, t, compounding, freq) * scale - native)) \
+                        <= check_tolerance * scale:
+                    self.zero_compounding, self.zero_frequency, self.zero_scale = compounding, freq, scale
+                    return self
+        print("CurveSnapshot: native ZeroRate convention not matched, zero_rates disabled")
+        self.zero_supported = False
+        return self
+
+
+_snapshots = weakref.WeakKeyDictionary()
+_snapshots_lock = threading.Lock()
+
+
+def curve_snapshot(curve):
+    """curve的CurveSnapshot(核对过native)，不支持时为None，结果按曲线对象缓存"""
+    with _snapshots_lock:
+        cached = _snapshots.get(curve)
+        if cached is not None and cached[0] is curve.raw_args:
+            return cached[1]
+    snapshot = CurveSnapshot.from_curve(curve)
+    with _snapshots_lock:
+        _snapshots[curve] = (curve.raw_args, snapshot)
+    return snapshot
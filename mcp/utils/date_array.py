@@ -0,0 +1,128 @@
+"""
+整列日期转换。
+
+Excel序列号、datetime和字符串混合的一列日期一次转换为datetime64[D]或
+ISO字符串(YYYY-MM-DD)：
+
+    to_datetime64([45000, "2024-11-29", datetime(2024, 1, 5)])
+    to_iso_strings(values, column="TradeDate")
+
+字符串按列检测格式(column给定时检测结果按列缓存)，用pandas一次解析；
+检测不出格式或解析失败的值逐个交给parse_date_string(pd.to_datetime，
+带LRU缓存)，结果与逐个单元格转换相同。
+"""
+
+import functools
+import re
+from datetime import date, datetime
+
+import numpy as np
+from mcp.utils.lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
+NaT = np.datetime64("NaT", "D")
+# 1900-03-01之后的Excel序列号以1899-12-30为起点(Excel把1900年当作闰年)
+EXCEL_EPOCH = np.datetime64("1899-12-30", "D")
+EXCEL_EPOCH_BEFORE_LEAP_BUG = np.datetime64("1899-12-31", "D")
+
+# (正则, 格式)，只收录没有日/月歧义的格式
+DATE_FORMATS = [
+    (re.compile(r"^\d{8}$"), "%Y%m%d"),
+    (re.compile(r"^\d{4}-\d{1,2}-\d{1,2}$"), "%Y-%m-%d"),
+    (re.compile(r"^\d{4}/\d{1,2}/\d{1,2}$"), "%Y/%m/%d"),
+    (re.compile(r"^\d{4}\.\d{1,2}\.\d{1,2}$"), "%Y.%m.%d"),
+]
+
+# 列名 -> 检测到的格式
+column_formats = {}
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_date_string(s):
+    """单个日期字符串，pd.to_datetime的缓存版本"""
+    return pd.to_datetime(s)
+
+
+def excel_serials_to_datetime64(serials):
+    serials = np.floor(np.asarray(serials, dtype=float))
+    result = np.full(serials.shape, NaT)
+    valid = np.isfinite(serials)
+    days = serials[valid].astype(np.int64)
+    result[valid] = np.where(days >= 60, EXCEL_EPOCH + days, EXCEL_EPOCH_BEFORE_LEAP_BUG + days)
+    return result
+
+
+def detect_format(strings, sample_size=20):
+    samples = [s for s in strings if s != ""][:sample_size]
+    if len(samples) == 0:
+        return None
+    for pattern, fmt in DATE_FORMATS:
+        if all(pattern.match(s) for s in samples):
+            return fmt
+    return None
+
+
+def strings_to_datetime64(strings, column=None):
+    strings = [str(s).strip() for s in strings]
+    fmt = column_formats.get(column) if column is not None else None
+    if fmt is None:
+        fmt = detect_format(strings)
+        if fmt is not None and column is not None:
+            column_formats[column] = fmt
+    if fmt is not None:
+        parsed = pd.to_datetime(pd.Series(strings, dtype=object), format=fmt, errors="coerce")
+        result = parsed.values.astype("datetime64[D]")
+    else:
+        result = np.full(len(strings), NaT)
+    for i in np.flatnonzero(np.isnat(result)):
+        if strings[i] == "":
+            continue
+        try:
+            result[i] = scalar_to_datetime64(parse_date_string(strings[i]))
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return result
+
+
+def scalar_to_datetime64(value):
+    if value is None or value is pd.NaT:
+        return NaT
+    if isinstance(value, (datetime, date, np.datetime64)):
+        return np.datetime64(pd.Timestamp(value).date(), "D")
+    return np.datetime64(value, "D")
+
+
+def to_datetime64(values, column=None):
+    """
+    一列日期转为datetime64[D]，None和无法解析的值为NaT。
+    values: 一维序列(二维的Excel区域先展开)，元素可以是Excel序列号、datetime/date或字符串
+    column: 列名，给定时字符串格式的检测结果按列缓存
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        return excel_serials_to_datetime64(values.ravel())
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.ravel().astype("datetime64[D]")
+    # 列表按元素的Python类型分类，不能让np.asarray把数字和字符串混合的列表转成字符串数组
+    arr = np.asarray(values, dtype=object).ravel()
+    result = np.full(arr.shape, NaT)
+    is_str = np.array([isinstance(v, str) for v in arr], dtype=bool)
+    is_num = np.array([isinstance(v, (int, float, np.integer, np.floating)) for v in arr], dtype=bool)
+    if is_num.any():
+        result[is_num] = excel_serials_to_datetime64(arr[is_num].astype(float))
+    if is_str.any():
+        result[is_str] = strings_to_datetime64(arr[is_str], column)
+    for i in np.flatnonzero(~(is_str | is_num)):
+        try:
+            result[i] = scalar_to_datetime64(arr[i])
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return result
+
+
+def to_iso_strings(values, column=None, fill=""):
+    """一列日期转为"YYYY-MM-DD"字符串列表，无法解析的值为fill"""
+    dts = to_datetime64(values, column)
+    strings = np.datetime_as_string(dts, unit="D")
+    strings = np.where(np.isnat(dts), fill, strings)
+    return strings.tolist()
@@ -1,3 +1,7 @@
+import functools
+from types import MappingProxyType
+
+
 class DayCounter:
     NONE = -1
     Act360 = 0
@@ -564,6 +568,10 @@ class EnumWrapper():
         self.field_dict = {}
         self.enum_kv = {}
         self.enum_vk = {}
+        # 枚举类 -> {值: 名称}，按类定义顺序，只读
+        self.reverse_maps = {}
+        # parse2的用户输入缓存
+        self.parse_name = functools.lru_cache(maxsize=4096)(self._parse_name)
         enum_list = [DayCounter(),
                      Frequency(),
                      PaymentType(),
@@ -626,6 +634,7 @@ class EnumWrapper():
                      ]
         for item in enum_list:
             self.parse_enum(item)
+            self.reverse_map(item.__class__)
 
     def parse_enum(self, item):
         name, kv = key_value_of_enum(item)
@@ -664,14 +673,27 @@ class EnumWrapper():
             return efv.get(enum_name)
         return None
 
-    def parse2(self, field_name: str, enum_name=None):
-        if isinstance(field_name, int) or isinstance(field_name, float):
-            return int(field_name)
+    def reverse_map(self, enum_cls):
+        """{值: 名称}，与{v: k for k, v in enum_cls.__dict__.items() if not k.startswith('__')}相同"""
+        if enum_cls not in self.reverse_maps:
+            self.reverse_maps[enum_cls] = MappingProxyType(
+                {v: k for k, v in enum_cls.__dict__.items() if not k.startswith('__')})
+        return self.reverse_maps[enum_cls]
+
+    def name_of(self, enum_cls, value, default=None):
+        return self.reverse_map(enum_cls).get(value, default)
+
+    def _parse_name(self, field_name, enum_name):
         field_name_lower = field_name.lower().strip()
-        result = None
         if field_name_lower in self.field_dict:
             efv: EnumFieldValue = self.field_dict[field_name_lower]
-            result = efv.get(enum_name)
+            return efv.get(enum_name)
+        return None
+
+    def parse2(self, field_name: str, enum_name=None):
+        if isinstance(field_name, int) or isinstance(field_name, float):
+            return int(field_name)
+        result = self.parse_name(field_name, enum_name)
         if result is not None:
             return result
         else:
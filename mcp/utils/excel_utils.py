@@ -3,9 +3,11 @@ import time
 from datetime import datetime, timedelta, date
 
 import numpy
-import pandas as pd
-from pandas import DataFrame
+from mcp.utils.lazy_import import lazy_module, is_instance
 
+pd = lazy_module("pandas")
+
+from mcp.utils.date_array import to_datetime64
 from mcp.utils.enums import enum_wrapper
 from mcp.utils.mcp_utils import mcp_dt, mcp_const
 from mcp.wrapper import is_mcp_wrapper
@@ -138,6 +140,7 @@ class FieldName():
     DeltaRHS = "DeltaRHS"
     Tolerance = "Tolerance"
     MaxNumIterations = "MaxNumIterations"
+    GuessMethod = "GuessMethod"
 
     OptionExpiryNature = "OptionExpiryNature"
     PricingMethod = "PricingMethod"
@@ -355,9 +358,19 @@ def fmt_xls_array(val):
     return val
 
 
+def pf_date_column(vals):
+    # 整列转换，与逐个pf_date结果相同
+    dts = to_datetime64(vals)
+    for i in numpy.flatnonzero(numpy.isnat(dts)):
+        if vals[i] is not None:
+            raise Exception("Parse date Exception: " + str(vals[i]))
+    strings = numpy.datetime_as_string(dts, unit="D").tolist()
+    return ["" if val is None else s for val, s in zip(vals, strings)]
+
+
 def pf_array_date(val):
     temp = fmt_xls_array(val)
-    temp = [pf_date(item) for item in temp]
+    temp = pf_date_column(temp)
     return temp
 
 
@@ -367,7 +380,7 @@ def pf_array(val):
 
 def pf_array_date_json(val):
     temp = fmt_xls_array(val)
-    temp = [pf_date(item) for item in temp]
+    temp = pf_date_column(temp)
     return json.dumps(temp)
 
 
@@ -381,7 +394,7 @@ def parse_dict_list(args):
         for key in args:
             result.append([key, args[key]])
         return result
-    elif isinstance(args, DataFrame):
+    elif is_instance(args, "pandas", "DataFrame"):
         result = []
         cols = args.columns.tolist()
         for col in cols:
@@ -766,14 +779,21 @@ class KeyValueWrapperEx(KeyValueWrapper):
                 args_dict[str(kv[i][0]).lower()] = args[i]
         return self._parse_kv(args_dict, kv)
 
+    def compile_kv_list(self, kv_list):
+        return [KvSchema(kvs, self.parse_func) for kvs in kv_list]
+
     def parse_args_dict(self, args_dict, kv_list):
+        """kv_list: 字段定义列表，或compile_kv_list编译后的KvSchema列表"""
         lack_keys = None
         result = None
         lower_args = {}
         for key in args_dict:
             lower_args[str(key).lower()] = args_dict[key]
         for kv in kv_list:
-            result1, lack_keys1 = self._parse_kv(lower_args, kv)
+            if isinstance(kv, KvSchema):
+                result1, lack_keys1 = kv.parse(lower_args, self.raise_parse_exception)
+            else:
+                result1, lack_keys1 = self._parse_kv(lower_args, kv)
             if lack_keys is None or len(lack_keys1) < len(lack_keys):
                 result, lack_keys = (result1, lack_keys1)
                 # print(f"parse_args_dict lack_keys: {lack_keys1}, {kv}")
@@ -820,6 +840,52 @@ class KeyValueWrapperEx(KeyValueWrapper):
         return result, lack_keys
 
 
+class KvSchema:
+    """
+    一组字段定义(kvs)的预编译结果: 小写键、解析函数和默认值只计算一次，
+    parse与KeyValueWrapperEx._parse_kv结果相同。
+    """
+
+    def __init__(self, kvs, parse_func):
+        self.kvs = kvs
+        self.fields = []
+        for kv in kvs:
+            f = parse_func(kv[1])
+            default = kv[2] if len(kv) >= 3 else None
+            self.fields.append((kv[0], str(kv[0]).lower(), f, f == pf_const, default))
+
+    def parse(self, args_dict, raise_exception=True):
+        lack_keys = []
+        dt = {}
+        lt = []
+        keys = []
+        for name, key, f, is_const, default in self.fields:
+            val = None
+            if key in args_dict:
+                raw_val = args_dict[key]
+                try:
+                    if is_const:
+                        val = pf_const(raw_val, key)
+                    else:
+                        val = f(raw_val)
+                except Exception as e:
+                    if raise_exception:
+                        raise e
+            if val is None:
+                val = default
+            if val is not None:
+                keys.append(name)
+            else:
+                lack_keys.append(name)
+            dt[key] = val
+            lt.append(val)
+        return {
+            "keys": keys,
+            "vals": lt,
+            "dict": dt,
+        }, lack_keys
+
+
 class ArgsParser:
 
     def __init__(self, parse_func_dict):
@@ -0,0 +1,325 @@
+"""
+Python端节假日日历索引。
+
+从Holidays.txt(CALENDAR_C;HOLIDAY_D;GLOBAL_F)一次读入每个币种排好序的
+节假日，多币种联合日历取并集，用numpy.busdaycalendar整列计算:
+
+    index = holiday_index()
+    index.is_business_day(dates, "USD,CNY")
+    index.add_business_days(dates, 2, "USDCNY")
+    index.adjust(dates, DateAdjusterRule.ModifiedFollowing, "CNY")
+    index.add_period(dates, "3M", DateAdjusterRule.ModifiedFollowing, False, "CNY")
+
+native的MCalendar仍是标准答案: checked_index(cal, calendar_codes)返回的索引
+在每个年份第一次用到时用MCalendar核对该年的样本日期(节假日、周末、普通工作日)，
+不一致的年份(包括节假日文件没有覆盖的年份)索引的方法返回None；不能识别币种时
+checked_index返回None。两种情况调用方都逐个日期调用MCalendar。
+"""
+
+import json
+import os
+import re
+import weakref
+
+import numpy as np
+
+from mcp.utils.enums import DateAdjusterRule
+
+default_holidays_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     "control", "Holidays.txt")
+
+roll_of_rule = {
+    DateAdjusterRule.Following: "following",
+    DateAdjusterRule.Preceding: "preceding",
+    DateAdjusterRule.ModifiedFollowing: "modifiedfollowing",
+    DateAdjusterRule.ModifiedPreceding: "modifiedpreceding",
+    DateAdjusterRule.Actual: None,
+}
+
+
+def load_holidays(path):
+    holidays = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            items = line.strip().split(";")
+            if len(items) < 2 or items[0].strip() == "CALENDAR_C":
+                continue
+            code = items[0].strip().upper()
+            holidays.setdefault(code, []).append(items[1].strip())
+    return {code: np.unique(np.array(dates, dtype="datetime64[D]")) for code, dates in holidays.items()}
+
+
+def parse_tenor(tenor):
+    """"3M" -> [(3, "M")]，"1Y6M" -> [(1, "Y"), (6, "M")]"""
+    t = str(tenor).strip().upper()
+    parts = re.findall(r"(-?\d+)([DWMY])", t)
+    if len(parts) == 0 or "".join(n + u for n, u in parts) != t:
+        raise ValueError(f"Unsupported tenor: {tenor}")
+    return [(int(n), u) for n, u in parts]
+
+
+def add_months(dates, months, end_of_month=False):
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    month_start = dates.astype("datetime64[M]")
+    day = (dates - month_start.astype("datetime64[D]")).astype(np.int64)
+    target = month_start + np.asarray(months, dtype=np.int64)
+    last_day = ((target + 1).astype("datetime64[D]") - target.astype("datetime64[D]")).astype(np.int64) - 1
+    if end_of_month:
+        at_month_end = dates == ((month_start + 1).astype("datetime64[D]") - 1)
+        day = np.where(at_month_end, last_day, day)
+    return target.astype("datetime64[D]") + np.minimum(day, last_day)
+
+
+def tenor_dates(reference_date, tenors):
+    """期限 -> 日期(不调整工作日)，如"3M"、"1Y6M"、"2W" """
+    ref = np.datetime64(reference_date, "D")
+    dates = []
+    for tenor in tenors:
+        date = ref
+        for n, unit in parse_tenor(tenor):
+            if unit == "D":
+                date = date + n
+            elif unit == "W":
+                date = date + 7 * n
+            else:
+                date = add_months(date, n * 12 if unit == "Y" else n)
+        dates.append(np.datetime64(date, "D"))
+    return np.array(dates, dtype="datetime64[D]")
+
+
+class HolidayIndex:
+
+    def __init__(self, holidays, weekmask="1111100"):
+        self.holidays = holidays
+        self.weekmask = weekmask
+        self.calendars = {}
+
+    @classmethod
+    def from_file(cls, path=None, weekmask="1111100"):
+        if path is None:
+            path = default_holidays_path
+        return cls(load_holidays(path), weekmask)
+
+    def codes(self, calendar_codes):
+        """"USD,CNY" / "USDCNY" / ["USD", "CNY"] -> ("CNY", "USD")"""
+        if isinstance(calendar_codes, (list, tuple)):
+            items = [str(code) for code in calendar_codes]
+        else:
+            items = re.split(r"[^A-Za-z]+", str(calendar_codes))
+        codes = set()
+        for item in items:
+            item = item.upper()
+            if item in self.holidays:
+                codes.add(item)
+            elif len(item) > 0 and len(item) % 3 == 0:
+                for i in range(0, len(item), 3):
+                    if item[i:i + 3] not in self.holidays:
+                        raise KeyError(f"No holidays of {item[i:i + 3]}")
+                    codes.add(item[i:i + 3])
+            elif len(item) > 0:
+                raise KeyError(f"No holidays of {item}")
+        if len(codes) == 0:
+            raise KeyError(f"Invalid calendar codes: {calendar_codes}")
+        return tuple(sorted(codes))
+
+    def calendar(self, calendar_codes):
+        codes = self.codes(calendar_codes)
+        if codes not in self.calendars:
+            holidays = np.unique(np.concatenate([self.holidays[code] for code in codes]))
+            self.calendars[codes] = np.busdaycalendar(weekmask=self.weekmask, holidays=holidays)
+        return self.calendars[codes]
+
+    def is_business_day(self, dates, calendar_codes):
+        return np.is_busday(np.asarray(dates, dtype="datetime64[D]"), busdaycal=self.calendar(calendar_codes))
+
+    def adjust(self, dates, rule, calendar_codes):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if rule not in roll_of_rule:
+            raise ValueError(f"Unsupported date adjuster rule: {rule}")
+        roll = roll_of_rule[rule]
+        if roll is None:
+            return dates
+        return np.busday_offset(dates, 0, roll=roll, busdaycal=self.calendar(calendar_codes))
+
+    def add_business_days(self, dates, count, calendar_codes):
+        # 从非工作日出发时，向前数先回到前一个工作日，向后数先到下一个工作日
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        count = np.asarray(count, dtype=np.int64)
+        cal = self.calendar(calendar_codes)
+        forward = np.busday_offset(dates, count, roll="preceding", busdaycal=cal)
+        backward = np.busday_offset(dates, count, roll="following", busdaycal=cal)
+        return np.where(count > 0, forward, np.where(count < 0, backward, dates))
+
+    def add_period(self, dates, tenor, rule=DateAdjusterRule.Actual, end_of_month=False, calendar_codes=""):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        result = dates
+        for n, unit in parse_tenor(tenor):
+            if unit == "D":
+                result = result + np.timedelta64(n, "D")
+            elif unit == "W":
+                result = result + np.timedelta64(7 * n, "D")
+            elif unit == "M":
+                result = add_months(result, n, end_of_month)
+            else:
+                result = add_months(result, 12 * n, end_of_month)
+        return self.adjust(result, rule, calendar_codes)
+
+    def add_periods(self, date, tenors, rule=DateAdjusterRule.Actual, end_of_month=False, calendar_codes=""):
+        date = np.datetime64(date, "D")
+        return np.array([self.add_period(date, tenor, rule, end_of_month, calendar_codes) for tenor in tenors],
+                        dtype="datetime64[D]")
+
+
+_holiday_index = None
+
+
+def holiday_index(path=None):
+    global _holiday_index
+    if path is not None:
+        return HolidayIndex.from_file(path)
+    if _holiday_index is None:
+        _holiday_index = HolidayIndex.from_file()
+    return _holiday_index
+
+
+def calendar_codes_of(cal):
+    """McpCalendar(code) / McpFCalendar(json ccys, path, True)的币种，其他构造方式返回None"""
+    args = getattr(cal, "raw_args", None)
+    if args is None or len(args) == 0 or not isinstance(args[0], str):
+        return None
+    if len(args) == 1:
+        return args[0]
+    if len(args) == 3 and args[2] is True:
+        try:
+            return json.loads(args[0])
+        except ValueError:
+            return None
+    return None
+
+
+def to_date_strings(dates):
+    return np.datetime_as_string(np.asarray(dates, dtype="datetime64[D]"), unit="D").tolist()
+
+
+class CheckedIndexes:
+    """
+    日历对象 -> 索引(或None)，按日历对象弱引用保存，日历对象释放后结果随之释放。
+    索引按年份在用到时与MCalendar核对(见IndexView)。
+    """
+
+    def __init__(self, sample_size=40):
+        self.sample_size = sample_size
+        # cal -> {calendar_codes: IndexView或None}
+        self.results = weakref.WeakKeyDictionary()
+
+    def get(self, cal, calendar_codes=""):
+        try:
+            views = self.results.setdefault(cal, {})
+        except TypeError:
+            # 不能弱引用的对象不缓存，调用方逐个调用MCalendar
+            return None
+        key = str(calendar_codes)
+        if key not in views:
+            views[key] = self.check(cal, calendar_codes)
+        return views[key]
+
+    def check(self, cal, calendar_codes):
+        codes = calendar_codes if calendar_codes else calendar_codes_of(cal)
+        if codes is None or codes == "" or codes == []:
+            return None
+        try:
+            index = holiday_index()
+            index.calendar(codes)
+        except Exception:
+            return None
+        return IndexView(index, codes, cal, calendar_codes, self.sample_size)
+
+
+class IndexView:
+    """
+    HolidayIndex绑定一组币种。只在核对过的年份内使用索引: 每个年份第一次用到时
+    用MCalendar核对该年的节假日(最多sample_size个，均匀抽取)和一周的普通日期，
+    核对IsBusinessDay、AddBusinessDays(+/-2)。输入或结果日期落在不一致的年份时返回None，
+    调用方逐个调用MCalendar。
+    """
+
+    def __init__(self, index, codes, cal, calendar_codes="", sample_size=40):
+        self.index = index
+        self.codes = codes
+        # 弱引用，避免CheckedIndexes中的值引用键
+        self.cal_ref = weakref.ref(cal)
+        self.calendar_codes = calendar_codes
+        self.sample_size = sample_size
+        # 年份 -> 是否与MCalendar一致
+        self.years = {}
+
+    def covers(self, *dates):
+        values = np.concatenate([np.asarray(d, dtype="datetime64[D]").ravel() for d in dates])
+        for year in np.unique(values[~np.isnat(values)].astype("datetime64[Y]").astype(np.int64) + 1970).tolist():
+            if year not in self.years:
+                self.years[year] = self.check_year(year)
+            if not self.years[year]:
+                return False
+        return True
+
+    def sample_dates(self, year):
+        start = np.datetime64(f"{year:04d}-01-01", "D")
+        end = np.datetime64(f"{year + 1:04d}-01-01", "D")
+        holidays = self.index.calendar(self.codes).holidays
+        in_year = holidays[(holidays >= start) & (holidays < end)]
+        if len(in_year) == 0 and len(holidays) > 0:
+            # 节假日文件没有覆盖的年份
+            return None
+        if len(in_year) > self.sample_size:
+            in_year = in_year[np.unique(np.linspace(0, len(in_year) - 1, self.sample_size).round().astype(int))]
+        return np.unique(np.concatenate([in_year, start + 180 + np.arange(7)]))
+
+    def check_year(self, year):
+        cal = self.cal_ref()
+        if cal is None:
+            return False
+        try:
+            samples = self.sample_dates(year)
+            if samples is None:
+                return False
+            strings = to_date_strings(samples)
+            expected = [bool(cal.IsBusinessDay(s, self.calendar_codes)) for s in strings]
+            if self.index.is_business_day(samples, self.codes).tolist() != expected:
+                return False
+            for count in (2, -2):
+                expected = [cal.AddBusinessDays(s, count, self.calendar_codes) for s in strings]
+                if to_date_strings(self.index.add_business_days(samples, count, self.codes)) != expected:
+                    return False
+        except Exception:
+            return False
+        return True
+
+    def is_business_day(self, dates):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        return self.index.is_business_day(dates, self.codes) if self.covers(dates) else None
+
+    def adjust(self, dates, rule):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        result = self.index.adjust(dates, rule, self.codes)
+        return result if self.covers(dates, result) else None
+
+    def add_business_days(self, dates, count):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        result = self.index.add_business_days(dates, count, self.codes)
+        return result if self.covers(dates, result) else None
+
+    def add_period(self, dates, tenor, rule=DateAdjusterRule.Actual, end_of_month=False):
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        result = self.index.add_period(dates, tenor, rule, end_of_month, self.codes)
+        return result if self.covers(dates, result) else None
+
+    def add_periods(self, date, tenors, rule=DateAdjusterRule.Actual, end_of_month=False):
+        result = self.index.add_periods(date, tenors, rule, end_of_month, self.codes)
+        return result if self.covers(date, result) else None
+
+
+checked_indexes = CheckedIndexes()
+
+
+def checked_index(cal, calendar_codes=""):
+    return checked_indexes.get(cal, calendar_codes)
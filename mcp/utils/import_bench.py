@@ -0,0 +1,88 @@
+"""
+插件启动导入耗时检查。
+
+每个模块在新的子进程里用python -X importtime导入，统计累计耗时以及导入
+过程中是否加载了延迟导入的重量级依赖(pandas、scipy、matplotlib...)。
+超过预算或加载了重量级依赖时返回非0，可以放在发布前的检查脚本中:
+
+    python -m mcp.utils.import_bench
+    python -m mcp.utils.import_bench --budget 0.8 mcp.utils.excel_utils mcp.tools
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+default_modules = [
+    "mcp.utils.lazy_import",
+    "mcp.utils.date_array",
+    "mcp.utils.mcp_utils",
+    "mcp.utils.excel_utils",
+    "mcp.tool.args_parser",
+    "mcp.mdp_data",
+]
+
+# 这些依赖在模块导入时不应该被加载
+heavy_modules = ["pandas", "scipy", "sklearn", "matplotlib", "markdown", "requests", "mdp"]
+
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(module, python=None):
+    """
+    :return: (累计耗时秒数, 加载的重量级依赖列表)
+    """
+    python = python or sys.executable
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([root_dir, env.get("PYTHONPATH", "")])
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=root_dir, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise Exception(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    total = 0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue
+        name = parts[2].strip()
+        if name == module:
+            total = int(parts[1])
+        top = name.split(".")[0]
+        if top in heavy_modules:
+            loaded.add(top)
+    return total / 1e6, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check add-in module import time")
+    parser.add_argument("modules", nargs="*", default=default_modules)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per module")
+    parser.add_argument("--allow-heavy", action="store_true", help="do not fail on heavy imports")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        try:
+            seconds, loaded = measure(module)
+        except Exception as e:
+            print(f"{module:40s} ERROR {e}")
+            failed = True
+            continue
+        status = "ok"
+        if seconds > args.budget:
+            status = f"SLOW (> {args.budget:.3f}s)"
+            failed = True
+        if loaded and not args.allow_heavy:
+            status = f"HEAVY {','.join(loaded)}"
+            failed = True
+        print(f"{module:40s} {seconds:8.3f}s  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
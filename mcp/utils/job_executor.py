@@ -0,0 +1,265 @@
+"""
+后台任务执行。
+
+JobExecutor把任务交给工作线程(native计算释放GIL时适用)或进程池
+(Monte Carlo等重计算)执行:
+
+    executor = JobExecutor("thread", 4, dispatch="least_loaded")
+    job = executor.submit(f, callback, key=("BdtOptionOAS", id(bdt), market_price))
+    executor.cancel(job, callback)
+
+key相同且还没有完成的任务只执行一次，结果回调给所有提交者；所有提交者
+都取消后，还没开始执行的任务不再执行。stats()返回每个工作线程的负载和
+任务等待/执行耗时。
+"""
+
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+
+def async_execute_enabled():
+    """MCP_ASYNC_EXECUTE=1时RTD函数在后台执行，默认在计算线程中同步执行"""
+    return os.environ.get("MCP_ASYNC_EXECUTE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def ensure_python_executable():
+    """
+    在Excel中(PyXLL)sys.executable是EXCEL.EXE，子进程需要指定python解释器
+    """
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return
+    for name in ("pythonw.exe", "python.exe", "python"):
+        path = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(path):
+            multiprocessing.set_executable(path)
+            return
+
+
+class Job:
+
+    def __init__(self, job_id, func, args, key):
+        self.id = job_id
+        self.func = func
+        self.args = args
+        self.key = key
+        self.callbacks = []
+        # pending -> running -> done，或pending -> cancelled
+        self.state = "pending"
+        self.submit_time = time.perf_counter()
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+
+    @property
+    def wait_seconds(self):
+        if self.start_time is None:
+            return None
+        return self.start_time - self.submit_time
+
+    @property
+    def run_seconds(self):
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+
+class WorkerLane:
+    """一个工作线程及其任务队列"""
+
+    def __init__(self, name, executor):
+        self.name = name
+        self.executor = executor
+        self.queue = queue.Queue()
+        # 排队和执行中的任务数
+        self.load = 0
+        self._thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            self.executor.run_job(job, self)
+
+
+class JobExecutor:
+    """
+    kind: "thread"工作线程，"process"进程池(func和args需要可以pickle)
+    workers: 线程/进程数
+    dispatch: 线程任务的分配方式，"least_loaded"或"round_robin"；进程池由Pool自己分配
+    """
+
+    def __init__(self, kind="thread", workers=2, dispatch="least_loaded"):
+        if kind not in ("thread", "process"):
+            raise Exception(f"Invalid executor kind: {kind}")
+        if dispatch not in ("least_loaded", "round_robin"):
+            raise Exception(f"Invalid dispatch: {dispatch}")
+        self.kind = kind
+        self.workers = max(int(workers), 1)
+        self.dispatch = dispatch
+        self._lock = threading.RLock()
+        self._lanes = None
+        self._pool = None
+        self._round_robin = -1
+        self._job_id_seed = 0
+        # key -> 还没有完成的Job
+        self._inflight = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.coalesced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def _get_lanes(self):
+        if self._lanes is None:
+            self._lanes = [WorkerLane(f"JobExecutor.thread{i + 1}", self) for i in range(self.workers)]
+        return self._lanes
+
+    def _get_pool(self):
+        if self._pool is None:
+            ensure_python_executable()
+            self._pool = multiprocessing.Pool(self.workers)
+        return self._pool
+
+    def _pick_lane(self):
+        lanes = self._get_lanes()
+        if self.dispatch == "round_robin":
+            self._round_robin = (self._round_robin + 1) % len(lanes)
+            return lanes[self._round_robin]
+        return min(lanes, key=lambda lane: lane.load)
+
+    def submit(self, func, callback=None, args=(), key=None):
+        """
+        :param func: 任务函数，func(*args)
+        :param callback: callback(result)，失败时result为错误信息字符串
+        :param key: 合并相同请求的键，None表示不合并
+        :return: Job
+        """
+        with self._lock:
+            job = self._inflight.get(key) if key is not None else None
+            if job is not None:
+                if callback is not None:
+                    job.callbacks.append(callback)
+                self.coalesced += 1
+                return job
+            self._job_id_seed += 1
+            job = Job(f"job_{self._job_id_seed}", func, tuple(args), key)
+            if callback is not None:
+                job.callbacks.append(callback)
+            if key is not None:
+                self._inflight[key] = job
+            self.submitted += 1
+            if self.kind == "thread":
+                lane = self._pick_lane()
+                lane.load += 1
+                lane.queue.put(job)
+                return job
+        # 进程池: 进程内开始执行的时间不可知，按提交时间计算
+        job.state = "running"
+        job.start_time = job.submit_time
+        self._get_pool().apply_async(func, job.args,
+                                     callback=lambda result: self.finish_job(job, result, None),
+                                     error_callback=lambda e: self.finish_job(job, None, e))
+        return job
+
+    def run_job(self, job, lane):
+        with self._lock:
+            if job.state == "cancelled":
+                lane.load -= 1
+                return
+            job.state = "running"
+            job.start_time = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = job.func(*job.args)
+        except Exception as e:
+            traceback.print_exc()
+            error = e
+        with self._lock:
+            lane.load -= 1
+        self.finish_job(job, result, error)
+
+    def finish_job(self, job, result, error):
+        with self._lock:
+            job.state = "done"
+            job.end_time = time.perf_counter()
+            job.error = error
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            wait, run = job.wait_seconds, job.run_seconds
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_run += run
+            self.max_run = max(self.max_run, run)
+            callbacks = list(job.callbacks)
+        if error is not None:
+            result = f"{type(error).__name__}: {error}"
+        for callback in callbacks:
+            try:
+                callback(result)
+            except:
+                traceback.print_exc()
+
+    def cancel(self, job, callback=None):
+        """
+        取消callback对job结果的等待(callback为None时取消全部)。没有等待者时，
+        还没开始的任务不再执行；已经在执行的任务执行完后丢弃结果。
+        :return: 任务是否被取消
+        """
+        with self._lock:
+            if callback is None:
+                job.callbacks.clear()
+            elif callback in job.callbacks:
+                job.callbacks.remove(callback)
+            if len(job.callbacks) > 0 or job.state != "pending":
+                return False
+            job.state = "cancelled"
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            self.cancelled += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "dispatch": self.dispatch,
+                "loads": [lane.load for lane in self._lanes] if self._lanes is not None else [],
+                "inflight": len(self._inflight),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "coalesced": self.coalesced,
+                "avg_wait": self.total_wait / finished if finished > 0 else 0.0,
+                "max_wait": self.max_wait,
+                "avg_run": self.total_run / finished if finished > 0 else 0.0,
+                "max_run": self.max_run,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            lanes, self._lanes = self._lanes, None
+            pool, self._pool = self._pool, None
+        if lanes is not None:
+            for lane in lanes:
+                lane.queue.put(None)
+        if pool is not None:
+            pool.close()
@@ -0,0 +1,156 @@
+"""
+延迟导入。
+
+重量级依赖(pandas、scipy、matplotlib...)在第一次使用时才导入，导入本模块
+的文件在加载Excel插件时不再等待它们:
+
+    pd = lazy_module("pandas")
+    plt = lazy_module("matplotlib.pyplot")
+    minimize = lazy_attr("scipy.optimize", "minimize")
+
+模块级的延迟对象(需要初始化或有副作用的单例)用lazy_globals，基于模块
+__getattr__(PEP 562):
+
+    __getattr__ = lazy_globals(__name__, {"mdp_data_wrapper": create_mdp_data_wrapper})
+
+按键注册、第一次取值时才创建的字典用LazyDict:
+
+    items = LazyDict()
+    items.register("McpYieldCurve", DefMcpYieldCurve)
+    items["McpYieldCurve"]  # 此时才调用DefMcpYieldCurve()
+"""
+
+import importlib
+import sys
+import threading
+import types
+from collections.abc import MutableMapping
+
+
+class LazyModule(types.ModuleType):
+    """第一次访问属性时导入真正的模块，之后直接转发"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name):
+    """已经导入的模块直接返回，否则返回LazyModule代理"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def lazy_attr(module_name, attr_name):
+    """函数/类的延迟引用，调用时才导入module_name"""
+
+    def proxy(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), attr_name)(*args, **kwargs)
+
+    proxy.__name__ = attr_name
+    proxy.__qualname__ = attr_name
+    proxy.__doc__ = f"Lazy reference to {module_name}.{attr_name}"
+    return proxy
+
+
+def lazy_globals(module_name, factories):
+    """
+    返回模块级__getattr__: factories中的名字第一次访问时调用工厂函数创建，
+    并写入模块全局变量，之后不再经过__getattr__。
+    """
+
+    def __getattr__(name):
+        if name in factories:
+            value = factories[name]()
+            setattr(sys.modules[module_name], name, value)
+            return value
+        raise AttributeError(f"module '{module_name}' has no attribute '{name}'")
+
+    return __getattr__
+
+
+def is_instance(obj, module_name, class_name):
+    """
+    isinstance(obj, module_name.class_name)，不触发导入:
+    module_name还没有导入时obj不可能是它的实例，直接返回False
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        return False
+    return isinstance(obj, getattr(module, class_name))
+
+
+class LazyDict(MutableMapping):
+    """
+    键 -> 工厂函数，第一次取值时调用工厂函数创建并保存。
+    遍历、len、in只看键，不会创建值；items()/values()会创建全部的值。
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._values = {}
+        self._factories = {}
+        self._lock = threading.RLock()
+
+    def register(self, key, factory):
+        with self._lock:
+            self._keys[key] = None
+            self._values.pop(key, None)
+            self._factories[key] = factory
+
+    def is_loaded(self, key):
+        return key in self._values
+
+    def loaded_keys(self):
+        return [key for key in self._keys if key in self._values]
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._values:
+                factory = self._factories[key]
+                self._values[key] = factory()
+                del self._factories[key]
+            return self._values[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._keys[key] = None
+            self._factories.pop(key, None)
+            self._values[key] = value
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._keys[key]
+            self._values.pop(key, None)
+            self._factories.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
@@ -1,7 +1,12 @@
+import functools
 import json
 from datetime import datetime, timedelta
 import re
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
+
+from mcp.utils.date_array import parse_date_string
+
+pd = lazy_module("pandas")
 
 debug_del_info = False
 debug_args_info = False
@@ -55,7 +60,6 @@ def parse_date(date):
     return dt
 
 ## 返回excel日期格式
-import pandas as pd
 from datetime import datetime
 
 def parse_excel_date(date_str):
@@ -72,7 +76,17 @@ def parse_excel_date(date_str):
     # 如果输入是 datetime.datetime 类型，直接转换为 pd.Timestamp
     if isinstance(date_str, datetime):
         return pd.Timestamp(date_str)
-    
+    if isinstance(date_str, (str, int, float)):
+        return parse_excel_date_cached(date_str)
+    return _parse_excel_date(date_str)
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_excel_date_cached(date_str):
+    return _parse_excel_date(date_str)
+
+
+def _parse_excel_date(date_str):
     # 尝试多种日期格式
     formats = [
         "%Y-%m-%d",  # 2024-11-29
@@ -193,6 +207,8 @@ class McpDateTime():
         #     return None
         # dt = datetime.strptime(s[0:8], "%Y%m%d")
         # return dt
+        if isinstance(s, str):
+            return parse_date_string(s)
         return pd.to_datetime(s)
 
     def parse_date2(self, s):
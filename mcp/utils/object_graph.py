@@ -0,0 +1,226 @@
+"""
+Mcp对象图的二进制序列化。
+
+进程池任务把对象(曲线、曲面、产品...)发送给子进程时使用，代替trace_args/
+create_object的JSON:
+
+    data = dumps(mcp_object)        # 父进程，encode(mcp_object)同时返回根节点哈希
+    mcp_object = loads(data)        # 子进程，worker_cache中已有的节点不再重新创建
+
+每个对象是一个节点: (模块, 类名, 构造参数)，参数中的Mcp对象替换为子节点的
+内容哈希，同一个对象图中被多处引用的对象只序列化一次。子进程按哈希缓存
+已经创建的对象，重复的任务使用相同的市场对象时不再重新构造。
+
+格式: MAGIC + 版本 + 标志 + marshal(version 2，结果确定)数据，超过
+compress_min_size字节时用zlib压缩。
+"""
+
+import hashlib
+import importlib
+import marshal
+import pickle
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from enum import Enum
+
+import numpy as np
+
+MAGIC = b"MCPG"
+VERSION = 1
+FLAG_ZLIB = 1
+MARSHAL_VERSION = 2
+compress_min_size = 64 * 1024
+
+
+def is_graph_node(obj):
+    # 与mcp.wrapper.is_mcp_wrapper相同
+    return hasattr(obj, "is_mcp_wrapper")
+
+
+class GraphEncoder:
+    """
+    对象 -> (哈希, 节点)。对象的编码结果按对象缓存(弱引用，不能弱引用的
+    对象不缓存)，构造参数raw_args不变时同一个对象只编码一次。
+    """
+
+    def __init__(self):
+        self.encoded = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def encode_value(self, value, nodes):
+        if value is None or isinstance(value, (bool, str, bytes)):
+            return value
+        if isinstance(value, Enum):
+            return "e", type(value).__module__, type(value).__qualname__, value.value
+        if isinstance(value, (int, float)):
+            return value
+        if is_graph_node(value):
+            return "r", self.encode_node(value, nodes)
+        if isinstance(value, list):
+            return [self.encode_value(item, nodes) for item in value]
+        if isinstance(value, tuple):
+            return "t", [self.encode_value(item, nodes) for item in value]
+        if isinstance(value, dict):
+            return "d", [[self.encode_value(k, nodes), self.encode_value(v, nodes)] for k, v in value.items()]
+        if isinstance(value, np.ndarray) and value.dtype.kind in "biufcM":
+            return "a", value.dtype.str, list(value.shape), np.ascontiguousarray(value).tobytes()
+        if isinstance(value, np.generic):
+            return value.item()
+        return "p", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def encode_node(self, obj, nodes):
+        """编码obj及其引用的对象，子节点在前加入nodes，返回obj的哈希"""
+        raw_args = getattr(obj, "raw_args", None)
+        if raw_args is None:
+            raise Exception(f"{obj.__class__.__name__} has no raw_args, cannot be serialized")
+        with self._lock:
+            try:
+                cached = self.encoded.get(obj)
+            except TypeError:
+                cached = None
+        if cached is not None and cached[0] is raw_args:
+            _, digest, sub_nodes = cached
+            for node_digest, node_data in sub_nodes:
+                nodes.setdefault(node_digest, node_data)
+            return digest
+        sub_nodes = OrderedDict()
+        args = [self.encode_value(arg, sub_nodes) for arg in raw_args]
+        node_data = marshal.dumps((obj.__class__.__module__, obj.__class__.__name__, args), MARSHAL_VERSION)
+        digest = hashlib.sha1(node_data).digest()
+        sub_nodes[digest] = node_data
+        sub_nodes = list(sub_nodes.items())
+        with self._lock:
+            try:
+                self.encoded[obj] = (raw_args, digest, sub_nodes)
+            except TypeError:
+                pass
+        for node_digest, data in sub_nodes:
+            nodes.setdefault(node_digest, data)
+        return digest
+
+    def graph(self, obj):
+        """
+        :return: (根节点哈希, 哈希 -> 节点数据)，子节点在前
+        """
+        nodes = OrderedDict()
+        root = self.encode_node(obj, nodes)
+        return root, nodes
+
+    @staticmethod
+    def pack(root, nodes, exclude=None):
+        """exclude: 接收方已经有的节点哈希，这些节点不再发送"""
+        items = [(digest, data) for digest, data in nodes.items() if exclude is None or digest not in exclude]
+        body = marshal.dumps((VERSION, root, items), MARSHAL_VERSION)
+        flags = 0
+        if len(body) >= compress_min_size:
+            body = zlib.compress(body, 1)
+            flags |= FLAG_ZLIB
+        return MAGIC + bytes([VERSION, flags]) + body
+
+    def encode(self, obj, exclude=None):
+        """
+        :return: (根节点哈希的十六进制字符串, 数据)
+        """
+        root, nodes = self.graph(obj)
+        return root.hex(), self.pack(root, nodes, exclude)
+
+
+class GraphDecoder:
+    """
+    哈希 -> 已经创建的对象，最多保存max_items个(LRU)。
+    子进程中使用一个全局实例，同一个市场对象在多个任务之间只创建一次。
+    """
+
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self.objects = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def decode_value(self, value, built):
+        if isinstance(value, list):
+            return [self.decode_value(item, built) for item in value]
+        if not isinstance(value, tuple):
+            return value
+        tag = value[0]
+        if tag == "r":
+            return built[value[1]]
+        if tag == "t":
+            return tuple(self.decode_value(item, built) for item in value[1])
+        if tag == "d":
+            return {self.decode_value(k, built): self.decode_value(v, built) for k, v in value[1]}
+        if tag == "a":
+            _, dtype, shape, data = value
+            return np.frombuffer(data, dtype=np.dtype(dtype)).reshape(shape).copy()
+        if tag == "e":
+            _, module_name, qualname, enum_value = value
+            cls = importlib.import_module(module_name)
+            for name in qualname.split("."):
+                cls = getattr(cls, name)
+            return cls(enum_value)
+        if tag == "p":
+            return pickle.loads(value[1])
+        raise Exception(f"Invalid object graph value tag: {tag}")
+
+    def get(self, digest):
+        with self._lock:
+            obj = self.objects.get(digest)
+            if obj is not None:
+                self.objects.move_to_end(digest)
+            return obj
+
+    def put(self, digest, obj):
+        with self._lock:
+            self.objects[digest] = obj
+            self.objects.move_to_end(digest)
+            while len(self.objects) > self.max_items:
+                self.objects.popitem(last=False)
+
+    def loads(self, data, pinned=None):
+        """
+        pinned: 哈希 -> 对象，发送方排除的节点从这里取，新创建的节点也加入其中
+        """
+        if data[:len(MAGIC)] != MAGIC:
+            raise Exception("Invalid object graph data")
+        version, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+        if version != VERSION:
+            raise Exception(f"Unsupported object graph version: {version}")
+        body = data[len(MAGIC) + 2:]
+        if flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        _, root, nodes = marshal.loads(body)
+        built = pinned if pinned is not None else {}
+        for digest, node_data in nodes:
+            obj = self.get(digest)
+            if obj is None:
+                self.misses += 1
+                module_name, class_name, args = marshal.loads(node_data)
+                cls = getattr(importlib.import_module(module_name), class_name)
+                obj = cls(*[self.decode_value(arg, built) for arg in args])
+                self.put(digest, obj)
+            else:
+                self.hits += 1
+            built[digest] = obj
+        return built[root]
+
+    def stats(self):
+        return {"items": len(self.objects), "hits": self.hits, "misses": self.misses}
+
+
+graph_encoder = GraphEncoder()
+worker_cache = GraphDecoder()
+
+
+def encode(obj, exclude=None):
+    return graph_encoder.encode(obj, exclude)
+
+
+def dumps(obj):
+    return graph_encoder.encode(obj)[1]
+
+
+def loads(data):
+    return worker_cache.loads(data)
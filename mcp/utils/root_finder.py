@@ -0,0 +1,216 @@
+"""
+Scalar root finding for the strike-from-price solvers.
+
+Every function evaluation here is a full (and expensive) reprice of a
+structured product, so the solvers are written to use as few evaluations
+as possible: Brent's method on a bracket, optionally narrowed around a
+warm-start guess, with Illinois false position as the simple fallback.
+
+Convergence is measured on the function value (price difference), the
+same criterion the old bisection used.
+"""
+
+import time
+
+
+class RootResult:
+
+    def __init__(self, root, converged, iterations, evaluations, elapsed, method):
+        self.root = root
+        self.converged = converged
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.elapsed = elapsed
+        self.method = method
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "converged": self.converged,
+            "iterations": self.iterations,
+            "evaluations": self.evaluations,
+            "time": self.elapsed,
+            "method": self.method,
+        }
+
+    def __repr__(self):
+        return (f"RootResult(root={self.root}, converged={self.converged}, iterations={self.iterations}, "
+                f"evaluations={self.evaluations}, time={self.elapsed:.6f}s, method={self.method})")
+
+
+class CountingFunc:
+    """
+    Wrap a function, count its evaluations and remember the values so a
+    point (e.g. a bracket end) is never priced twice within one solve.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.count = 0
+        self.values = {}
+
+    def __call__(self, x):
+        x = float(x)
+        if x not in self.values:
+            self.count += 1
+            self.values[x] = self.func(x)
+        return self.values[x]
+
+
+def _brent(f, a, b, fa, fb, tol, max_iter, xtol):
+    if abs(fa) <= tol:
+        return a, True, 0
+    if abs(fb) <= tol:
+        return b, True, 0
+    c, fc = a, fa
+    d = e = b - a
+    for i in range(1, max_iter + 1):
+        if fb * fc > 0:
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        m = 0.5 * (c - b)
+        step_tol = 2.0 * xtol * max(abs(b), 1.0)
+        if abs(fb) <= tol:
+            return b, True, i - 1
+        if abs(m) <= step_tol:
+            return b, False, i - 1
+        if abs(e) >= step_tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # secant
+                p = 2.0 * m * s
+                q = 1.0 - s
+            else:
+                # inverse quadratic interpolation
+                q = fa / fc
+                r = fb / fc
+                p = s * (2.0 * m * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2.0 * p < min(3.0 * m * q - abs(step_tol * q), abs(e * q)):
+                e = d
+                d = p / q
+            else:
+                d = m
+                e = m
+        else:
+            d = m
+            e = m
+        a, fa = b, fb
+        if abs(d) > step_tol:
+            b += d
+        else:
+            b += step_tol if m > 0 else -step_tol
+        fb = f(b)
+    return b, abs(fb) <= tol, max_iter
+
+
+def _illinois(f, a, b, fa, fb, tol, max_iter):
+    if abs(fa) <= tol:
+        return a, True, 0
+    if abs(fb) <= tol:
+        return b, True, 0
+    side = 0
+    x = a
+    for i in range(1, max_iter + 1):
+        x = (a * fb - b * fa) / (fb - fa)
+        fx = f(x)
+        if abs(fx) <= tol:
+            return x, True, i
+        if fx * fb > 0:
+            b, fb = x, fx
+            if side == -1:
+                fa *= 0.5
+            side = -1
+        else:
+            a, fa = x, fx
+            if side == 1:
+                fb *= 0.5
+            side = 1
+    return x, False, max_iter
+
+
+def _bisect(f, a, b, fa, fb, tol, max_iter):
+    # Same steps as the original guess_strike bisection, used when the
+    # bracket ends do not have opposite signs
+    for i in range(1, max_iter + 1):
+        mid = (a + b) / 2
+        f_mid = f(mid)
+        if abs(f_mid) <= tol:
+            return mid, True, i
+        if f_mid * fb > 0:
+            b, fb = mid, f_mid
+        else:
+            a = mid
+    return None, False, max_iter
+
+
+def narrow_bracket(f, low, high, f_low, f_high, guess, width):
+    """
+    Shrink [low, high] around a warm-start guess.  The guess and one
+    neighbour at distance `width` are evaluated; when they bracket the root
+    the much smaller interval is returned, otherwise the best half of the
+    original bracket.
+    """
+    if guess is None or not (low < guess < high) or width <= 0:
+        return low, high, f_low, f_high
+    f_guess = f(guess)
+    if f_guess == 0:
+        return guess, guess, f_guess, f_guess
+    if f_guess * f_low < 0:
+        lo, f_lo = max(low, guess - width), None
+        if lo > low:
+            f_lo = f(lo)
+            if f_lo * f_guess < 0:
+                return lo, guess, f_lo, f_guess
+        return low, guess, f_low, f_guess
+    if f_guess * f_high < 0:
+        hi, f_hi = min(high, guess + width), None
+        if hi < high:
+            f_hi = f(hi)
+            if f_hi * f_guess < 0:
+                return guess, hi, f_guess, f_hi
+        return guess, high, f_guess, f_high
+    return low, high, f_low, f_high
+
+
+def find_root(func, low, high, tol, max_iter, guess=None, method="brent", xtol=1e-12):
+    """
+    Solve func(x) = 0 on [low, high] to |func(x)| <= tol.
+
+    Args:
+        func: scalar function, usually "price(strike) - target"
+        low, high: search bracket
+        tol: absolute tolerance on the function value
+        max_iter: maximum number of iterations (not counting the bracket ends)
+        guess: optional warm start, e.g. the strike of the previous solve
+        method: "brent", "illinois" or "bisect"
+        xtol: relative tolerance on x below which the bracket is considered collapsed
+
+    Returns:
+        RootResult: root is None when the solver did not converge
+    """
+    t_start = time.perf_counter()
+    f = CountingFunc(func)
+    f_low = f(low)
+    f_high = f(high)
+    method = str(method).lower()
+    if f_low * f_high > 0 or method == "bisect":
+        root, converged, iterations = _bisect(f, low, high, f_low, f_high, tol, max_iter)
+        used = "bisect"
+    else:
+        a, b, fa, fb = narrow_bracket(f, low, high, f_low, f_high, guess, (high - low) * 0.02)
+        if method == "illinois":
+            root, converged, iterations = _illinois(f, a, b, fa, fb, tol, max_iter)
+        else:
+            root, converged, iterations = _brent(f, a, b, fa, fb, tol, max_iter, xtol)
+        used = method
+    if not converged:
+        root = None
+    return RootResult(root, converged, iterations, f.count, time.perf_counter() - t_start, used)
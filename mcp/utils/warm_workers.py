@@ -0,0 +1,310 @@
+"""
+常驻的预热工作进程。
+
+工作进程在插件加载时启动，市场对象(曲线、曲面...)用publish广播一次，
+之后的定价请求只发送产品和参数，已经发布的对象按哈希引用，不再重新构造:
+
+    warm_pool.start()
+    version = warm_pool.publish({"CNY": cny_curve, "USDCNY.VOL": vol_surface})
+    job = warm_pool.submit(option, "Price", [], callback)     # option引用的曲线不再发送
+    job = warm_pool.submit("CNY", "ZeroRate", ["2025-01-02"], callback)   # 直接调用已发布的对象
+
+每次publish版本号加1，所有工作进程按顺序收到快照后再处理之后的请求；
+快照同时带有当前仍然发布的节点哈希，工作进程释放不再引用的对象。
+工作进程退出时自动重启并重新发送当前快照；快照失败的工作进程不再分配请求。
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from collections import ChainMap
+
+from mcp.utils import object_graph
+from mcp.utils.job_executor import Job, ensure_python_executable
+
+
+def warm_workers_count():
+    """MCP_WARM_WORKERS=N时插件加载时启动N个工作进程，默认不启动"""
+    try:
+        return max(int(os.environ.get("MCP_WARM_WORKERS", "0")), 0)
+    except ValueError:
+        return 0
+
+
+def warm_worker_main(conn):
+    """工作进程主循环"""
+    version = 0
+    # 哈希 -> 已发布的对象(包括它们引用的对象)
+    pinned = {}
+    # 名称 -> 哈希
+    names = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        cmd = msg[0]
+        if cmd == "stop":
+            break
+        if cmd == "snapshot":
+            _, snapshot_version, graphs, replace, live = msg
+            try:
+                if replace:
+                    pinned, names = {}, {}
+                for name, (root, data) in graphs.items():
+                    object_graph.worker_cache.loads(data, pinned)
+                    names[name] = root
+                # 重新发布的名称不再引用的节点
+                pinned = {digest: obj for digest, obj in pinned.items() if digest in live}
+                version = snapshot_version
+                conn.send(("snapshot", snapshot_version, None))
+            except Exception as e:
+                traceback.print_exc()
+                conn.send(("snapshot", snapshot_version, f"{type(e).__name__}: {e}"))
+        elif cmd == "call":
+            _, job_id, call_version, target, method, args = msg
+            try:
+                if call_version != version:
+                    raise Exception(f"Market data version {version}, expected {call_version}")
+                kind, value = target
+                if kind == "name":
+                    obj = pinned[names[value]]
+                else:
+                    obj = object_graph.worker_cache.loads(value, ChainMap({}, pinned))
+                args = [object_graph.worker_cache.loads(arg[1], ChainMap({}, pinned))
+                        if isinstance(arg, tuple) and len(arg) == 2 and arg[0] == "graph" else arg
+                        for arg in args]
+                result = getattr(obj, method)(*args)
+                conn.send(("result", job_id, result, None))
+            except Exception as e:
+                traceback.print_exc()
+                conn.send(("result", job_id, None, f"{type(e).__name__}: {e}"))
+
+
+class WarmWorker:
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=warm_worker_main, args=(child_conn,), name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.send_lock = threading.Lock()
+        # job_id -> Job
+        self.pending = {}
+        self.version = 0
+        # 最近一次失败的快照版本，之后的快照成功时清除
+        self.failed_version = None
+        self.is_alive = True
+        self._thread = threading.Thread(target=self.recv_thread, name=f"{name}.recv", daemon=True)
+        self._thread.start()
+
+    def send(self, msg):
+        with self.send_lock:
+            self.conn.send(msg)
+
+    def recv_thread(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == "snapshot":
+                _, version, error = msg
+                if error is None:
+                    self.version = version
+                    self.failed_version = None
+                else:
+                    self.failed_version = version
+                    print(f"{self.name} snapshot {version} failed: {error}")
+            elif msg[0] == "result":
+                _, job_id, result, error = msg
+                job = self.pending.pop(job_id, None)
+                if job is not None:
+                    self.pool.finish_job(job, result, error)
+        self.is_alive = False
+        self.pool.on_worker_exit(self)
+
+    def stop(self):
+        try:
+            self.send(("stop",))
+        except (OSError, ValueError):
+            pass
+
+
+class WarmWorkerPool:
+    """
+    workers: 工作进程数
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.worker_list = []
+        self.is_running = False
+        self.version = 0
+        # 名称 -> (根节点哈希, 对象图数据)，新启动的工作进程用来恢复状态
+        self.graphs = {}
+        # 名称 -> 对象图的所有节点哈希
+        self.graph_nodes = {}
+        # 当前发布的所有节点哈希，请求中这些节点不再发送
+        self.pinned_digests = frozenset()
+        # 名称 -> 根节点哈希
+        self.name_digests = {}
+        self._lock = threading.RLock()
+        self._job_id_seed = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def start(self):
+        with self._lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            ensure_python_executable()
+            for i in range(self.workers):
+                self.worker_list.append(self._start_worker(i))
+
+    def _start_worker(self, index):
+        worker = WarmWorker(f"McpWarmWorker{index + 1}", self)
+        if len(self.graphs) > 0:
+            worker.send(("snapshot", self.version, dict(self.graphs), True, self.pinned_digests))
+        return worker
+
+    def on_worker_exit(self, worker):
+        with self._lock:
+            pending = list(worker.pending.values())
+            worker.pending.clear()
+            if self.is_running and worker in self.worker_list:
+                index = self.worker_list.index(worker)
+                print(f"{worker.name} exited, restart")
+                self.restarts += 1
+                self.worker_list[index] = self._start_worker(index)
+        for job in pending:
+            self.finish_job(job, None, f"{worker.name} exited")
+
+    def stop(self):
+        with self._lock:
+            self.is_running = False
+            workers, self.worker_list = self.worker_list, []
+        for worker in workers:
+            worker.stop()
+
+    def publish(self, objects, replace=False):
+        """
+        广播市场对象。内容没有变化时不广播。
+        :param objects: 名称 -> Mcp对象
+        :param replace: True时替换全部已发布的对象，否则增量更新
+        :return: 版本号
+        """
+        graphs = {}
+        digests = {}
+        graph_nodes = {}
+        for name, obj in objects.items():
+            root, nodes = object_graph.graph_encoder.graph(obj)
+            digests[name] = root
+            graph_nodes[name] = frozenset(nodes.keys())
+            graphs[name] = (root, object_graph.graph_encoder.pack(root, nodes))
+        with self._lock:
+            if not replace and all(self.name_digests.get(name) == digest for name, digest in digests.items()):
+                return self.version
+            self.version += 1
+            if replace:
+                self.graphs, self.name_digests, self.graph_nodes = {}, {}, {}
+            self.graphs.update(graphs)
+            self.name_digests.update(digests)
+            self.graph_nodes.update(graph_nodes)
+            # 只保留当前发布的对象图的节点，重新发布的名称原来的节点不再排除
+            self.pinned_digests = frozenset().union(*self.graph_nodes.values())
+            for worker in self.worker_list:
+                worker.send(("snapshot", self.version, graphs, replace, self.pinned_digests))
+            return self.version
+
+    def _pick_worker(self):
+        alive = [worker for worker in self.worker_list if worker.is_alive and worker.failed_version is None]
+        if len(alive) == 0:
+            raise Exception("No warm worker is running with the current market data")
+        return min(alive, key=lambda worker: len(worker.pending))
+
+    def _target(self, target):
+        if isinstance(target, str):
+            if target not in self.name_digests:
+                raise Exception(f"Not published: {target}")
+            return "name", target
+        return "graph", object_graph.encode(target, self.pinned_digests)[1]
+
+    def submit(self, target, method, args, callback=None):
+        """
+        :param target: 已发布对象的名称，或Mcp对象(已发布的节点不再发送)
+        :param callback: callback(result)，失败时result为错误信息字符串
+        :return: Job
+        """
+        if not self.is_running:
+            self.start()
+        with self._lock:
+            target = self._target(target)
+            args = [("graph", object_graph.encode(arg, self.pinned_digests)[1])
+                    if object_graph.is_graph_node(arg) else arg for arg in args]
+            self._job_id_seed += 1
+            job = Job(f"warm_{self._job_id_seed}", method, args, None)
+            if callback is not None:
+                job.callbacks.append(callback)
+            job.state = "running"
+            job.start_time = job.submit_time
+            worker = self._pick_worker()
+            worker.pending[job.id] = job
+            worker.send(("call", job.id, self.version, target, method, args))
+        return job
+
+    def cancel(self, job, callback=None):
+        """请求已经发送给工作进程，取消只丢弃结果"""
+        with self._lock:
+            if callback is None:
+                job.callbacks.clear()
+            elif callback in job.callbacks:
+                job.callbacks.remove(callback)
+
+    def finish_job(self, job, result, error):
+        with self._lock:
+            job.state = "done"
+            job.end_time = time.perf_counter()
+            job.error = error
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.total_run += job.run_seconds
+            self.max_run = max(self.max_run, job.run_seconds)
+            callbacks = list(job.callbacks)
+        if error is not None:
+            result = error
+        for callback in callbacks:
+            try:
+                callback(result)
+            except:
+                traceback.print_exc()
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "running": self.is_running,
+                "version": self.version,
+                "published": len(self.name_digests),
+                "workers": [{"name": worker.name, "alive": worker.is_alive, "version": worker.version,
+                             "failed_version": worker.failed_version, "pending": len(worker.pending)}
+                            for worker in self.worker_list],
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "avg_run": self.total_run / finished if finished > 0 else 0.0,
+                "max_run": self.max_run,
+            }
+
+
+warm_pool = WarmWorkerPool(max(warm_workers_count(), 1))
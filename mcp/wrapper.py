@@ -6,15 +6,19 @@ import traceback
 from datetime import datetime
 from enum import Enum, IntEnum
 
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 
 import mcp.mcp
 from mcp.utils.enums import enum_wrapper, FXInterpolationType, InterpolatedVariable, CalculateTarget, CallPut
 from mcp.utils.mcp_utils import debug_del_info, mcp_dt, mcp_const, lower_key_dict
 from mcp.utils.svi import MSurfaceVol
+from mcp.utils.curve_grid import curve_grid
+from mcp.utils.curve_snapshot import curve_snapshot
 
 from mcp.mcp import *
 
+pd = lazy_module("pandas")
+
 def is_mcp_wrapper(obj):
     return hasattr(obj, "is_mcp_wrapper")
     # or hasattr(obj, "getHandler")
@@ -92,6 +96,49 @@ def trace_args(obj, tool_def=None):
     }
 
 
+def named_raw_args(obj, tool_def=None):
+    """
+    构造参数 -> {参数名: 值}。raw_args是一个字典(关键字构造)时返回它的副本，
+    否则按args_def中参数个数匹配的定义命名
+    """
+    raw_args = obj.raw_args
+    if len(raw_args) == 1 and isinstance(raw_args[0], dict):
+        return dict(raw_args[0])
+    if tool_def is None:
+        tool_def = mcp_wrapper_utils.tool_def
+    kv, _ = find_args_def_kv(tool_def, obj.__class__.__name__, len(raw_args), raw_args)
+    if not kv or len(kv) != len(raw_args):
+        raise Exception(f"{obj.__class__.__name__}: unknown arguments {len(raw_args)}")
+    return {item[0]: value for item, value in zip(kv, raw_args)}
+
+
+def find_named_arg(named, name, default=None):
+    """按参数名取值，不区分大小写"""
+    if name in named:
+        return named[name]
+    lower = name.lower()
+    for key, value in named.items():
+        if str(key).lower() == lower:
+            return value
+    return default
+
+
+def replace_raw_args(obj, changes, tool_def=None):
+    """用changes({参数名: 新值})代替部分构造参数，重新构造obj"""
+    raw_args = obj.raw_args
+    if len(raw_args) == 1 and isinstance(raw_args[0], dict):
+        args = dict(raw_args[0])
+        keys = {str(key).lower(): key for key in args}
+        for name, value in changes.items():
+            args[keys.get(name.lower(), name)] = value
+        return obj.__class__(args)
+    names = [name.lower() for name in named_raw_args(obj, tool_def)]
+    args = list(raw_args)
+    for name, value in changes.items():
+        args[names.index(name.lower())] = value
+    return obj.__class__(*args)
+
+
 cls_dict = {}
 
 
@@ -332,6 +379,20 @@ class McpYieldCurve(mcp.mcp.MYieldCurve):
         #     dates = json.loads(dates)
         return [self.ZeroRate(date) for date in dates]
 
+    def DiscountFactorArray(self, dates):
+        return curve_grid(self).discount_factors(dates)
+
+    def ZeroRateArray(self, dates):
+        return curve_grid(self).zero_rates(dates)
+
+    def ForwardRateArray(self, startDates, endDates, compounding="simple"):
+        return curve_grid(self).forward_rates(startDates, endDates, compounding)
+
+    def Snapshot(self):
+        """Python端的曲线快照(mcp.utils.curve_snapshot)，贴现因子与native不一致时为None，
+        零息利率的约定与native不一致时snapshot.zero_rates报错"""
+        return curve_snapshot(self)
+
     def __del__(self):
         del self.raw_args
         # self.Dispose()
@@ -1436,6 +1497,15 @@ class McpSwapCurve(mcp.mcp.MSwapCurve):
         # print(f"McpSwapCurve mcp_args: {args}")
         super().__init__(*mcp_args)
 
+    def DiscountFactorArray(self, dates):
+        return curve_grid(self).discount_factors(dates)
+
+    def ZeroRateArray(self, dates):
+        return curve_grid(self).zero_rates(dates)
+
+    def ForwardRateArray(self, startDates, endDates, compounding="simple"):
+        return curve_grid(self).forward_rates(startDates, endDates, compounding)
+
 
 class McpParametricCurve(mcp.mcp.MParametricCurve):
 
@@ -1462,6 +1532,15 @@ class McpBondCurve(mcp.mcp.MBondCurve):
         self.is_mcp_wrapper = True
         mcp_args = to_mcp_args(args)
         super().__init__(*mcp_args)
+
+    def DiscountFactorArray(self, dates):
+        return curve_grid(self).discount_factors(dates)
+
+    def ZeroRateArray(self, dates):
+        return curve_grid(self).zero_rates(dates)
+
+    def ForwardRateArray(self, startDates, endDates, compounding="simple"):
+        return curve_grid(self).forward_rates(startDates, endDates, compounding)
     
         # try:
         #     # print('McpBondCurve raw args:', args)
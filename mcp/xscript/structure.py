@@ -1,7 +1,9 @@
 import json
 import logging
+import pickle
 import re
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 import pandas as pd
@@ -15,6 +17,7 @@ from mcp.tools import *
 from mcp.wrapper import to_mcp_args
 from mcp.xscript.asset import McpAsset, McpAssetFactory
 from mcp.xscript.utils import SttUtils, xss_utils
+from mcp.utils.job_executor import ensure_python_executable
 from mcp.utils.mcp_utils import *
 
 from scipy.optimize import root_scalar, minimize_scalar
@@ -416,6 +419,8 @@ class McpStructureDef:
         if is_exist:
             raise Exception(f"Duplicate PackageName:  {pkg_name}, define in {cur_caller}")
         self.pkg_name = pkg_name
+        # 构造参数，用于在其他进程中重建定义
+        self.def_args = (pkg_name, structure, schedules, payoff, caller)
         self.structure = SttStructure(SttUtils.parse_excel_kv_dict(structure))
         self.schedules = []
         for item in schedules:
@@ -929,15 +934,22 @@ def find_root(func, target, bracket, tol=1e-6, max_iter=20):
     raise ValueError("Failed to converge")
 
 class Solver:
-    def __init__(self, priceObj):
+    def __init__(self, priceObj, reuse=True):
         self.rawargs = priceObj.get_rawargs()
+        self.structure_def = getattr(priceObj, 'structure', None)
         # 用于求解目标为Upper/Lower Barriers
         self.midX = self.rawargs['Spot']
         #self.priceObj = priceObj
-
-    def objFunc_Premium(self, targetFields, x, isAnnualized = False):
+        # reuse=True: 同一个x只定价一次（root_scalar的区间端点、minimize_scalar与后续求根共用），
+        # 同一个x上的Premium和Delta共用一次Monte Carlo
+        self.reuse = reuse
+        self.points = {}
+        self.last_obj = None
+        self.last_key = None
+        self.evaluations = 0
+
+    def target_args(self, targetFields, x):
         _args = dict(self.rawargs)
-
         if len(targetFields) == 2:
             if targetFields[0] in _args:
                 _args[targetFields[0]] = self.midX - x
@@ -952,14 +964,38 @@ class Solver:
                 _args[targetFields[0]] = x
             else:
                 raise Exception(f"Error: {targetFields} is not a key in args.")
-        
-        new_obj = McpXScriptStructure(_args)
-        #print(_args)
+        return _args
+
+    def target_obj(self, targetFields, x):
+        key = (tuple(targetFields), float(x), self.midX)
+        if self.reuse and self.last_key == key:
+            return self.last_obj
+        new_obj = McpXScriptStructure(self.target_args(targetFields, x))
+        self.evaluations += 1
+        if self.reuse:
+            self.last_key = key
+            self.last_obj = new_obj
+        return new_obj
+
+    def evaluate(self, name, targetFields, x, func):
+        key = (name, tuple(targetFields), float(x), self.midX)
+        if self.reuse and key in self.points:
+            return self.points[key]
+        value = func(self.target_obj(targetFields, x))
+        if self.reuse:
+            self.points[key] = value
+        return value
+
+    def clear(self):
+        self.points.clear()
+        self.last_obj = None
+        self.last_key = None
+
+    def objFunc_Premium(self, targetFields, x, isAnnualized = False):
         if (isAnnualized):
-            premium = new_obj.AnnualizedPrice()
+            return self.evaluate('AnnualizedPrice', targetFields, x, lambda obj: obj.AnnualizedPrice())
         else:
-            premium = new_obj.Premium(True,True)
-        return premium
+            return self.evaluate('Premium', targetFields, x, lambda obj: obj.Premium(True, True))
 
  
     def SoverFromPremium(self, premium, targetField, x0=1.0, bracket=(-100, 100), method='bisect', options={'maxiter': 10, 'xtol': 1e-5}, isAnnualized=False):
@@ -994,27 +1030,8 @@ class Solver:
             raise Exception(f"Target {targetField} root finding failed.")
 
     def objFunc_Delta(self, targetFields, x, isCCY2=False, isAmount=True):
-        _args = dict(self.rawargs)
-
-        if len(targetFields) == 2:
-            if targetFields[0] in _args:
-                _args[targetFields[0]] = self.midX - x
-            else:
-                raise Exception(f"Error: {targetFields} is not a key in args.")
-            if targetFields[1] in _args:
-                _args[targetFields[1]] = self.midX + x
-            else:
-                raise Exception(f"Error: {targetFields} is not a key in args.")
-        else:
-            if targetFields[0] in _args:
-                _args[targetFields[0]] = x
-            else:
-                raise Exception(f"Error: {targetFields} is not a key in args.")
-        
-        new_obj = McpXScriptStructure(_args)
-        #print(_args)
-        premium = new_obj.Delta(isCCY2, isAmount)
-        return premium
+        return self.evaluate(('Delta', isCCY2, isAmount), targetFields, x,
+                             lambda obj: obj.Delta(isCCY2, isAmount))
 
  
 #   def SoverFromDelta(self, delta, targetField, x0=1.0, bracket=(-100, 100), method='bisect', options={'maxiter': 10, 'xtol': 1e-5}, isCCY2=False, isAmount=True):
@@ -1257,7 +1274,11 @@ class Solver:
                 bracket=(-100, 100),
                 num_points=20,
                 isCCY2=False,
-                isAmount=True
+                isAmount=True,
+                workers=None,
+                refine=0,
+                target=None,
+                callback=None
             ):
             """
             生成Delta值的绘图数据
@@ -1268,6 +1289,12 @@ class Solver:
                 num_points: 数据点数量，默认为20
                 isCCY2: 是否使用CCY2，默认为False
                 isAmount: 是否使用金额，默认为True
+                workers: 进程数，大于1时各点在进程池中并行计算（每个进程用get_rawargs()重建结构），
+                         参数无法序列化（如含有native曲线等对象）时退回到当前进程顺序计算，
+                         进程中计算失败的点在当前进程重算
+                refine: 自适应加密的轮数，每轮在变号区间（指定target时）或极值点两侧插入中点
+                target: 加密时使用的目标Delta
+                callback: callback(x, delta)，每个点算完立即回调
                 
             返回:
                 包含两个数组的元组: (x_values, y_values)
@@ -1288,21 +1315,27 @@ class Solver:
                 # 3. 计算步长(使用浮点数运算)
                 step = (end - start) / (num_points - 1) if num_points > 1 else 0
                 
-                x_values = []
-                y_values = []
-                
-                _args = dict(self.rawargs)
-
-                # 4. 生成数据点(使用range的整数迭代)
-                for i in range(num_points):
-                    x = start + i * step
-                    x_values.append(x)
-                    
-                    _args[targetField] = x
-                    new_obj = McpXScriptStructure(_args)
-                    delta = new_obj.Delta(isCCY2, isAmount)
-                    y_values.append(delta)
-                
+                # 局部副本，不修改self.rawargs
+                args = dict(self.rawargs)
+                args.setdefault(targetField, None)
+
+                # 4. 生成数据点
+                xs = [start + i * step for i in range(num_points)]
+                points = {}
+                pool = self.plot_pool(workers, len(xs), args)
+                try:
+                    self.plot_points(pool, args, targetField, xs, isCCY2, isAmount, points, callback)
+                    for _ in range(int(refine)):
+                        xs = refine_points(points, target)
+                        if len(xs) == 0:
+                            break
+                        self.plot_points(pool, args, targetField, xs, isCCY2, isAmount, points, callback)
+                finally:
+                    if pool is not None:
+                        pool.shutdown()
+
+                x_values = sorted(points)
+                y_values = [points[x] for x in x_values]
                 return x_values, y_values
                 
             except TypeError as te:
@@ -1315,6 +1348,84 @@ class Solver:
                 print(f"计算过程中发生意外错误: {str(e)}")
                 raise
 
+    def plot_pool(self, workers, count, args):
+        if workers is None or workers <= 1 or count <= 1:
+            return None
+        if self.structure_def is None or not hasattr(self.structure_def, 'def_args'):
+            return None
+        try:
+            blob = pickle.dumps((self.structure_def.def_args, args))
+        except Exception:
+            logging.info("DeltaPlot: args are not picklable, run in process")
+            return None
+        ensure_python_executable()
+        return ProcessPoolExecutor(max_workers=min(workers, count), initializer=_plot_worker_init, initargs=(blob,))
+
+    def plot_point(self, args, targetField, x, isCCY2, isAmount):
+        if targetField in self.rawargs:
+            return self.objFunc_Delta([targetField], x, isCCY2, isAmount)
+        return plot_delta(args, targetField, x, isCCY2, isAmount)
+
+    def plot_points(self, pool, args, targetField, xs, isCCY2, isAmount, points, callback):
+        if pool is None:
+            for x in xs:
+                points[x] = self.plot_point(args, targetField, x, isCCY2, isAmount)
+                if callback is not None:
+                    callback(x, points[x])
+            return
+        futures = {pool.submit(_plot_worker_delta, targetField, x, isCCY2, isAmount): x for x in xs}
+        for future in as_completed(futures):
+            x = futures[future]
+            try:
+                points[x] = future.result()
+            except Exception as e:
+                logging.info("DeltaPlot: worker failed at %s (%s), run in process", x, e)
+                points[x] = self.plot_point(args, targetField, x, isCCY2, isAmount)
+            if callback is not None:
+                callback(x, points[x])
+
+
+def refine_points(points, target=None):
+    """
+    加密点: 指定target时取 (delta - target) 变号的区间，否则取极值点两侧的区间，返回区间中点
+    """
+    xs = sorted(points)
+    if len(xs) < 2:
+        return []
+    ys = [points[x] for x in xs]
+    intervals = set()
+    if target is not None:
+        for i in range(len(xs) - 1):
+            if (ys[i] - target) * (ys[i + 1] - target) <= 0:
+                intervals.add(i)
+    else:
+        i_min = min(range(len(ys)), key=lambda i: ys[i])
+        i_max = max(range(len(ys)), key=lambda i: ys[i])
+        for i in (i_min, i_max):
+            if 0 < i < len(xs) - 1:
+                intervals.update([i - 1, i])
+    return [(xs[i] + xs[i + 1]) / 2 for i in sorted(intervals)]
+
+
+_plot_args = None
+
+
+def _plot_worker_init(blob):
+    global _plot_args
+    def_args, _plot_args = pickle.loads(blob)
+    if stt_def_manager.stt().get(def_args[0]) is None:
+        McpStructureDef(*def_args)
+
+
+def _plot_worker_delta(targetField, x, isCCY2, isAmount):
+    return plot_delta(_plot_args, targetField, x, isCCY2, isAmount)
+
+
+def plot_delta(args, targetField, x, isCCY2, isAmount):
+    _args = dict(args)
+    _args[targetField] = x
+    return McpXScriptStructure(_args).Delta(isCCY2, isAmount)
+
 
 
 from scipy import interpolate
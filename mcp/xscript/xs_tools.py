@@ -1,10 +1,7 @@
 import logging
 import os
 
-import markdown
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
-
+from mcp.utils.lazy_import import lazy_module, lazy_attr
 from mcp.xscript.utils import xss_utils
 
 import re
@@ -12,6 +9,11 @@ import ast
 import math
 import numpy as np
 
+# markdown/matplotlib在生成报告时才导入
+markdown = lazy_module("markdown")
+plt = lazy_module("matplotlib.pyplot")
+GridSpec = lazy_attr("matplotlib.gridspec", "GridSpec")
+
 class XssLVPlot:
 
     @staticmethod
@@ -12,11 +12,13 @@ Provides Excel functions related to fixed rate bonds, including:
 import datetime
 import json
 import logging
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 from typing import Any, Dict, List, Optional, Union
 
 from pyxll import xl_func, xl_arg, xl_return, RTD
 
+pd = lazy_module("pandas")
+
 # Simplified imports to avoid circular dependencies
 try:
     from mcp import mcp
@@ -866,7 +868,8 @@ def BdtOptionOAS(bdt, marketPrice, tolerance=0.000001, maxNumIterations=100):
         # rtd.value = val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtOptionOAS", id(bdt), marketPrice, tolerance, maxNumIterations))
     return None
     # return ThreadFuncRtd(async_callback)
 
@@ -888,7 +891,8 @@ def BdtDiscountSpread(bdt, marketPrice, tolerance=0.000001, maxNumIterations=100
         return val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtDiscountSpread", id(bdt), marketPrice, tolerance, maxNumIterations))
     return None
 
 
@@ -913,7 +917,9 @@ def BdtOasDuration(bdt, marketPrice, delta=0.0001, tolerance=0.000001, maxNumIte
         return val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtOasDuration", id(bdt), marketPrice, delta,
+                                              tolerance, maxNumIterations))
     return None
 
 
@@ -934,7 +940,9 @@ def BdtOasConvexity(bdt, marketPrice, delta=0.0001, tolerance=0.000001, maxNumIt
         return val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtOasConvexity", id(bdt), marketPrice, delta,
+                                              tolerance, maxNumIterations))
     return None
 
 
@@ -955,7 +963,8 @@ def BdtOasPVBP(bdt, marketPrice, delta=0.0001, tolerance=0.000001, maxNumIterati
         return val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtOasPVBP", id(bdt), marketPrice, delta, tolerance, maxNumIterations))
     return None
 
 
@@ -977,7 +986,9 @@ def BdtOasDV01(bdt, marketPrice, delta=0.0001, faceValue=100, tolerance=0.000001
         return val
 
     if async_func_manager:
-        return async_func_manager.create(async_callback)
+        return async_func_manager.create(async_callback,
+                                         key=("BdtOasDV01", id(bdt), marketPrice, delta,
+                                              faceValue, tolerance, maxNumIterations))
     return None
 
 @xl_func(macro=False,recalc_on_open=True)
@@ -35,6 +35,7 @@ from mcp.utils.excel_utils import (
 )
 from mcp.mcp import MVanillaSwap  # noqa: F401 Reserved
 from mcp.utils.mcp_utils import mcp_dt
+from mcp.utils.bump_cache import bump_cache
 from mcp.tool.args_def import tool_def
 from mcp.wrapper import McpSwapCurve, trace_args
 from mcp_calendar import date_to_string, plain_date
@@ -1189,3 +1190,59 @@ def ForwardCurve2ForwardRate(curve, endDate, bidMidAsk):
         logging.warning(s, exc_info=True)
         return s
 
+
+
+# =========================
+# Bumped Curve Scenarios
+# =========================
+# 类名 -> (默认方法, 曲线是否作为方法参数)
+pillar_delta_methods = {
+    "McpFixedRateBond": ("Price", True),
+    "McpVanillaSwap": ("NPV", False),
+}
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg("instrument", "object")
+@xl_arg("curve", "object")
+@xl_arg("method", "str")
+@xl_arg("shift", "float")
+def CurvePillarDeltas(instrument, curve, method="", shift=0.0001):
+    """
+    Value change per 1bp bump of each curve pillar input, the bumped curves are
+    built once and shared by all instruments
+    Parameters: instrument - Mcp object, curve - McpYieldCurve/McpSwapCurve/McpBondCurve,
+                method - Pricing method (default Price(curve) for bonds, NPV() for swaps), shift - Bump size
+    Returns: Pillar, delta per row
+    """
+    try:
+        default_method, pass_curve = pillar_delta_methods.get(instrument.__class__.__name__, ("", False))
+        method = method or default_method
+        if not method:
+            raise Exception(f"method is required for {instrument.__class__.__name__}")
+        args = [curve] if pass_curve and method == default_method else []
+        deltas = bump_cache.pillar_deltas(instrument, method, args, curve, shift)
+        return [[label, delta] for label, delta in zip(bump_cache.pillar_labels(curve), deltas.tolist())]
+    except Exception as e:
+        s = f"CurvePillarDeltas except: {e}"
+        logging.warning(s, exc_info=True)
+        return s
+
+
+@xl_func(macro=False, auto_resize=True)
+def CurveBumpCacheStats():
+    """
+    Status of the bumped curve cache
+    Returns: Base curves, bumped curves, curve builds and cache hits
+    """
+    stats = bump_cache.stats()
+    return [[key, value] for key, value in stats.items()]
+
+
+@xl_func(macro=False)
+def CurveBumpCacheClear():
+    """
+    Drop all cached bumped curves, call at the start of a risk run after market data changes
+    """
+    bump_cache.clear()
+    return True
@@ -30,9 +30,11 @@ except Exception:
 # =========================
 # Third Party
 # =========================
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 from pyxll import RTD, xl_arg, xl_app, xl_func, xl_return, xlfCaller  # noqa: F401
 
+pd = lazy_module("pandas")
+
 # =========================
 # Project Internal
 # =========================
@@ -44,6 +46,7 @@ from mcp.mcp import MDateFuntion  # noqa: F401 Reserved (if MDateFunction needs
 from mcp.tool.args_def import tool_def
 from mcp.utils.enums import DateAdjusterRule, enum_wrapper
 from mcp.utils.excel_utils import pf_date
+from mcp.utils.holiday_index import checked_index, parse_tenor
 from mcp.utils.mcp_utils import mcp_dt, parse_excel_date
 
 
@@ -263,9 +266,44 @@ def CalendarAddPeriod(
     return string_to_date(result)
 
 
-@xl_func("object cal, datetime date, str[] tenors: datetime[]", macro=False, recalc_on_open=True, auto_resize=True)
-def CalendarAddPeriods(cal, date, tenors):
-    """批量 Date + Tenor"""
+def index_add_periods(cal, date, tenors, rule):
+    """
+    用节假日索引整列计算 Date + Tenor，调整规则由调用方给出；
+    含 D 的 Tenor（native 的天数规则可能不是自然日）、不支持的 Tenor，
+    或与 cal.AddPeriod 在任何一个抽查的 Tenor 上不一致时返回 None
+    """
+    view = checked_index(cal)
+    valid = [str(tenor).strip() for tenor in tenors if str(tenor).strip() != ""]
+    if view is None or len(valid) == 0:
+        return None
+    try:
+        if any(unit == "D" for tenor in valid for _, unit in parse_tenor(tenor)):
+            return None
+        dts = view.add_periods(date, valid, rule)
+    except (ValueError, KeyError):
+        return None
+    if dts is None:
+        return None
+    s = date_to_string(date)
+    # 首尾和中间一个 Tenor 与 native 对照
+    for i in sorted({0, len(valid) // 2, len(valid) - 1}):
+        if str(dts[i]) != cal.AddPeriod(s, valid[i], rule):
+            return None
+    it = iter(dts.tolist())
+    return [date if str(tenor).strip() == "" else datetime.datetime.combine(next(it), datetime.time())
+            for tenor in tenors]
+
+
+@xl_func("object cal, datetime date, str[] tenors, var dateAdjustRule: datetime[]", macro=False,
+         recalc_on_open=True, auto_resize=True)
+def CalendarAddPeriods(cal, date, tenors, dateAdjustRule=None):
+    """批量 Date + Tenor；给出 dateAdjustRule 时用节假日索引整列计算，否则逐个调用 native（日历默认规则）"""
+    rule = None
+    if dateAdjustRule is not None and str(dateAdjustRule).strip() != "":
+        rule = enum_wrapper.parse2(dateAdjustRule, "DateAdjusterRule")
+        result = index_add_periods(cal, date, tenors, rule)
+        if result is not None:
+            return result
     result = []
     for tenor in tenors:
         t = str(tenor).strip()
@@ -273,7 +311,7 @@ def CalendarAddPeriods(cal, date, tenors):
             result.append(date)
         else:
             s = date_to_string(date)
-            s = cal.AddPeriod(s, t)
+            s = cal.AddPeriod(s, t) if rule is None else cal.AddPeriod(s, t, rule)
             result.append(string_to_date(s))
     return result
 
@@ -374,6 +412,43 @@ def CalendarIsBusinessDay(cal, date, calendarCodes=""):
     return result
 
 
+@xl_func("object cal, datetime[] dates, var count, str calendarCodes: datetime[]", macro=False, recalc_on_open=False,
+         auto_resize=True)
+def CalendarAddBusinessDaysArray(cal, dates, count, calendarCodes=""):
+    """整列加工作日"""
+    view = checked_index(cal, calendarCodes)
+    dts = None if view is None else view.add_business_days(dates, int(count))
+    if dts is None:
+        return [CalendarAddBusinessDays(cal, date, count, calendarCodes) for date in dates]
+    return [datetime.datetime.combine(dt, datetime.time()) for dt in dts.tolist()]
+
+
+@xl_func("object cal, datetime[] dates, var rule, str calendarCodes: datetime[]", macro=False, recalc_on_open=False,
+         auto_resize=True)
+def CalendarAdjustArray(cal, dates, rule, calendarCodes=""):
+    """整列按调整规则调整日期"""
+    view = checked_index(cal, calendarCodes)
+    n = enum_wrapper.parse2(rule, DateAdjusterRule().__class__.__name__)
+    try:
+        dts = None if view is None else view.adjust(dates, n)
+        if dts is not None:
+            return [datetime.datetime.combine(dt, datetime.time()) for dt in dts.tolist()]
+    except ValueError:
+        pass
+    return [CalendarAdjust(cal, date, rule, calendarCodes) for date in dates]
+
+
+@xl_func("object cal, datetime[] dates, str calendarCodes: bool[]", macro=False, recalc_on_open=False,
+         auto_resize=True)
+def CalendarIsBusinessDays(cal, dates, calendarCodes=""):
+    """整列判定是否工作日"""
+    view = checked_index(cal, calendarCodes)
+    result = None if view is None else view.is_business_day(dates)
+    if result is None:
+        return [CalendarIsBusinessDay(cal, date, calendarCodes) for date in dates]
+    return result.tolist()
+
+
 # =========================
 # 日计数法 & 期限运算
 # =========================
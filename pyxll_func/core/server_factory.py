@@ -734,4 +734,24 @@ def McpFXForwardPointsCurves2Data_Svr(mcpFXForwardPointsCurves2, flag=False):
 @xl_arg("flag", "bool")
 def McpFixedRateBondsData_Svr(mcpFixedRateBond, flag=False):
     obj = mcp_server.object_data_cache[mcpFixedRateBond]
-    return decode(obj, flag)
\ No newline at end of file
+    return decode(obj, flag)
+
+@xl_func(macro=False, auto_resize=True)
+def McpSvrCacheStats():
+    """
+    Statistics of the server object/data cache
+    Returns: Items, bytes, hits, misses and evictions per cache
+    """
+    return mcp_server.McpSvrCacheStats()
+
+
+@xl_func(macro=False)
+@xl_arg("class_name", "str")
+@xl_arg("identifier", "str")
+def McpSvrCacheClear(class_name='', identifier=''):
+    """
+    Invalidate cached server objects and data
+    Parameters: class_name - Class name (empty for all), identifier - Identifier (empty for all)
+    Returns: Number of removed entries
+    """
+    return mcp_server.McpSvrCacheClear(class_name, identifier)
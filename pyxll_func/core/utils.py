@@ -16,13 +16,15 @@ from math import log, sqrt, exp
 from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
-from pyxll import xl_func, xl_arg, xl_return
+from pyxll import xl_func, xl_arg, xl_return, xl_on_open, xl_on_close
 
 from mcp.utils.excel_utils import mcp_kv_wrapper, mcp_method_args_cache
 from mcp.tool.args_def import tool_def
 from mcp.wrapper import *
 from mcp.utils.mcp_utils import mcp_dt, as_2d_array, as_array, debug_args_info, trans_2d_array
 from mcp.utils.enums import enum_wrapper, Frequency, DayCounter
+from mcp.utils.bs_engine import bs_prices, bs_greeks, greeks_table, implied_vols, Model_BS, Model_Black76
+from mcp.utils.warm_workers import warm_pool, warm_workers_count
 from mcp_calendar import plain_date, date_to_string
 
 
@@ -127,6 +129,10 @@ def future_implied_volatility(market_price: float, F: float, K: float, T: float,
     if market_price < price_low or market_price > price_high:
         raise ValueError(f"Market price {market_price} is outside the price range corresponding to implied volatility search range "
                          f"[{price_low:.4f}, {price_high:.4f}]")
+    vols, converged, _ = implied_vols(market_price, F, K, T, r, 0.0, option, Model_Black76, tol, max_iter, low, high)
+    if converged:
+        return float(vols)
+    # Not converged within max_iter: keep the old behaviour and return the bisection midpoint
     for i in range(max_iter):
         mid = 0.5 * (low + high)
         price_mid = future_black76_price(F, K, T, r, mid, option)
@@ -240,21 +246,11 @@ def implied_volatility(S, K, r, T, option_price, option_type, precision=0.0001,
     float, implied volatility
     """
 
-    lower_volatility = 0.001  # Lower bound of volatility
-    upper_volatility = 1.0  # Upper bound of volatility
-
-    for _ in range(max_iterations):
-        current_volatility = (lower_volatility + upper_volatility) / 2
-        option_price_calculated = black_scholes(S, K, r, T, current_volatility, option_type)
-
-        if abs(option_price_calculated - option_price) < precision:
-            return current_volatility
-        elif option_price_calculated < option_price:
-            lower_volatility = current_volatility
-        else:
-            upper_volatility = current_volatility
-
-    return None
+    vols, converged, _ = implied_vols(option_price, S, K, T, r, 0.0, option_type, Model_BS,
+                                      precision, max_iterations)
+    if not converged:
+        return None
+    return float(vols)
 
 
 @xl_func(macro=False, recalc_on_open=True)
@@ -285,6 +281,141 @@ def impliedQ(S, F, r, T):
     return - (math.log(F / S) - r * T) / T
 
 
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('S', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('q', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('sigma', 'float[]')
+@xl_arg('option_type', 'var[]')
+def black_scholes_prices(S, K, r, q, T, sigma, option_type):
+    """
+    Vectorized version of black_scholes, prices a whole column of options in one call.
+
+    Every argument is a range (a single cell is broadcast to all rows).
+
+    Returns:
+        var[][]: one price per row
+    """
+    prices = bs_prices(S, K, T, r, q, sigma, option_type, Model_BS)
+    return [[v] for v in np.ravel(prices).tolist()]
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('S', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('q', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('sigma', 'float[]')
+@xl_arg('option_type', 'var[]')
+@xl_arg('with_header', 'bool')
+def black_scholes_greeks(S, K, r, q, T, sigma, option_type, with_header=True):
+    """
+    Price and Greeks (Price, Delta, Gamma, Vega, Theta, Rho) for a column of options.
+
+    Returns:
+        var[][]: one row per option, optionally preceded by a header row
+    """
+    greeks = bs_greeks(S, K, T, r, q, sigma, option_type, Model_BS)
+    return greeks_table(greeks, with_header=with_header)
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('F', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('sigma', 'float[]')
+@xl_arg('option_type', 'var[]')
+def future_black76_prices(F, K, r, T, sigma, option_type):
+    """
+    Vectorized Black 76 prices for a column of futures options.
+
+    Returns:
+        var[][]: one price per row
+    """
+    prices = bs_prices(F, K, T, r, 0.0, sigma, option_type, Model_Black76)
+    return [[v] for v in np.ravel(prices).tolist()]
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('F', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('sigma', 'float[]')
+@xl_arg('option_type', 'var[]')
+@xl_arg('with_header', 'bool')
+def future_black76_greeks(F, K, r, T, sigma, option_type, with_header=True):
+    """
+    Black 76 price and Greeks for a column of futures options.
+
+    Returns:
+        var[][]: one row per option, optionally preceded by a header row
+    """
+    greeks = bs_greeks(F, K, T, r, 0.0, sigma, option_type, Model_Black76)
+    return greeks_table(greeks, with_header=with_header)
+
+
+def implied_vols_table(vols, converged, with_flags):
+    result = []
+    for vol, ok in zip(np.ravel(vols).tolist(), np.ravel(converged).tolist()):
+        row = [vol if ok else "#N/A"]
+        if with_flags:
+            row.append(ok)
+        result.append(row)
+    return result
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('option_price', 'float[]')
+@xl_arg('S', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('q', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('option_type', 'var[]')
+@xl_arg('precision', 'float')
+@xl_arg('max_iterations', 'int')
+@xl_arg('with_flags', 'bool')
+def black_scholes_implied_vols(option_price, S, K, r, q, T, option_type, precision=1e-8, max_iterations=50,
+                               with_flags=False):
+    """
+    Implied volatilities for a column of options, solved together in a few vector iterations.
+
+    Returns:
+        var[][]: one volatility per row (#N/A if not converged), plus a converged flag column if with_flags
+    """
+    vols, converged, _ = implied_vols(option_price, S, K, T, r, q, option_type, Model_BS,
+                                      precision, max_iterations)
+    return implied_vols_table(vols, converged, with_flags)
+
+
+@xl_func(macro=False, recalc_on_open=True, auto_resize=True)
+@xl_arg('market_price', 'float[]')
+@xl_arg('F', 'float[]')
+@xl_arg('K', 'float[]')
+@xl_arg('r', 'float[]')
+@xl_arg('T', 'float[]')
+@xl_arg('option_type', 'var[]')
+@xl_arg('precision', 'float')
+@xl_arg('max_iterations', 'int')
+@xl_arg('with_flags', 'bool')
+def future_implied_vols(market_price, F, K, r, T, option_type, precision=1e-8, max_iterations=50,
+                        with_flags=False):
+    """
+    Black 76 implied volatilities for a column of futures options.
+
+    Returns:
+        var[][]: one volatility per row (#N/A if not converged), plus a converged flag column if with_flags
+    """
+    vols, converged, _ = implied_vols(market_price, F, K, T, r, 0.0, option_type, Model_Black76,
+                                      precision, max_iterations)
+    return implied_vols_table(vols, converged, with_flags)
+
+
 @xl_func
 def abc():
     return "xuy"
@@ -548,4 +679,44 @@ def McpParseList(list_in, parse_dates=True):
 
     # 3. 返回二维列表，每个元素占一行一列
     #    Excel 会根据 auto_resize=True 自动展开
-    return [[v] for v in result]
\ No newline at end of file
+    return [[v] for v in result]
+
+
+@xl_on_open
+def McpWarmWorkersStart(import_info):
+    """MCP_WARM_WORKERS=N时插件加载后启动预热工作进程"""
+    if warm_workers_count() > 0:
+        warm_pool.start()
+
+
+@xl_on_close
+def McpWarmWorkersStop():
+    warm_pool.stop()
+
+
+@xl_func(macro=False)
+@xl_arg("name", "str")
+@xl_arg("obj", "object")
+def McpWarmPublish(name, obj):
+    """
+    Publish a market object (curve, surface...) to the warm worker processes
+    Parameters: name - Name of the object, obj - Mcp object
+    Returns: Market data version
+    """
+    return warm_pool.publish({name: obj})
+
+
+@xl_func(macro=False, auto_resize=True)
+def McpWarmWorkerStats():
+    """
+    Status of the warm worker processes
+    Returns: Name, alive, market data version and pending jobs per worker
+    """
+    stats = warm_pool.stats()
+    rows = [['Worker', 'Alive', 'Version', 'Pending']]
+    for worker in stats['workers']:
+        rows.append([worker['name'], worker['alive'], worker['version'], worker['pending']])
+    rows.append(['Published', stats['published'], stats['version'], ''])
+    rows.append(['Completed', stats['completed'], 'Failed', stats['failed']])
+    rows.append(['AvgRun', stats['avg_run'], 'MaxRun', stats['max_run']])
+    return rows
@@ -22,7 +22,7 @@ import logging
 # Third Party Libraries
 # =========================
 import numpy as np
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 from pyxll import xl_arg, xl_func, xl_return
 
 # =========================
@@ -37,6 +37,8 @@ from mcp.utils.svi import MSurfaceVol
 from mcp.utils.excel_utils import *
 from mcp_calendar import date_to_string
 
+pd = lazy_module("pandas")
+
 # =========================
 # Utility Functions
 # =========================
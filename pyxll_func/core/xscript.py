@@ -18,7 +18,7 @@ import os
 # Third Party Library Imports (alphabetical order)
 # =========================
 import numpy as np
-import pandas as pd
+from mcp.utils.lazy_import import lazy_module
 import pyxll
 from pyxll import RTD, xl_arg, xl_app, xl_func, xl_return, xlfCaller  # noqa: F401
 
@@ -51,6 +51,8 @@ from mcp.utils.mcp_utils import (
 )
 from mcp.xscript.xs_tools import XssLVPlot, XssMCPlot
 
+pd = lazy_module("pandas")
+
 
 # =========================
 # Excel/PyXLL Binding Functions
@@ -553,6 +555,8 @@ def xssSolverFromDelta(
 @xl_arg("bracket", "float[]")
 @xl_arg("isCCY2", "bool")
 @xl_arg("isAmount", "bool")
+@xl_arg("workers", "int")
+@xl_arg("refine", "int")
 def xssDeltaPlot(
     priceObj,
     targetField,
@@ -560,6 +564,8 @@ def xssDeltaPlot(
     num_points=20,
     isCCY2=False,
     isAmount=True,
+    workers=None,
+    refine=0,
 ):
     """
     绘制目标参数与 Delta 的关系（返回二维数组，已转置以便 Excel 作图）。
@@ -567,7 +573,7 @@ def xssDeltaPlot(
     if not isinstance(targetField, str):
         raise ValueError("targetField not valid!")
     rf = xsst.Solver(priceObj)
-    result = rf.DeltaPlot(targetField, bracket, num_points, isCCY2, isAmount)
+    result = rf.DeltaPlot(targetField, bracket, num_points, isCCY2, isAmount, workers, refine)
     array_data = np.array(result)
     transposed = array_data.transpose()
     return transposed
\ No newline at end of file